@@ -3,12 +3,15 @@ Social Media Lead Generator API
 Main Flask application with Gemini Pro integration
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 import logging
 import json
+import time
+import threading
+import contextvars
 from datetime import datetime
 
 # Load environment variables
@@ -34,6 +37,8 @@ from services.facebook_service import FacebookService
 from services.youtube_service import YouTubeService
 from utils.simple_excel_service import SimpleExcelService as ExcelService
 from services.scheduler_service import scheduler_service
+from services import rate_governor
+from services import pipeline
 
 # Initialize services
 gemini_service = GeminiService()
@@ -42,13 +47,51 @@ facebook_service = FacebookService()
 youtube_service = YouTubeService()
 excel_service = ExcelService()
 
+# Scrape -> pre-filter -> analysis -> persistence stages that overlap, with bounded queues between them
+lead_pipelines = pipeline.LeadPipelineFactory(gemini_service)
+
+def run_lead_pipeline(name, source, item_kind='post'):
+    """Run scraped items through the lead pipeline; returns (leads, pipeline stats)"""
+    lead_pipeline = lead_pipelines.build(name, source, item_kind)
+    leads = list(lead_pipeline.run())
+    return leads, lead_pipeline.get_stats()
+
+def start_platform_run(platform, lead_pipeline):
+    """Run one platform's pipeline on its own thread, collecting leads as they arrive"""
+    run = {'leads': [], 'error': None, 'started_at': time.time(), 'finished_at': None, 'done': threading.Event()}
+    
+    def consume():
+        try:
+            for lead in lead_pipeline.run():
+                run['leads'].append(lead)
+        except Exception as e:
+            logging.error(f"{platform} scraping error: {e}")
+            run['error'] = str(e)
+        finally:
+            run['finished_at'] = time.time()
+            run['done'].set()
+    
+    # A copy of the request context keeps Gemini usage attributed to the scheduler scan
+    threading.Thread(
+        target=contextvars.copy_context().run, args=(consume,), name=f"scrape-all-{platform}", daemon=True
+    ).start()
+    return run
+
+@app.before_request
+def attribute_gemini_usage():
+    """Attribute Gemini usage to the scheduler scan that sent the request"""
+    gemini_service.set_scan(request.headers.get('X-Scan-Id'))
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    gemini_circuit = gemini_service.get_circuit_status()
+    
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if gemini_circuit['state'] == 'closed' else 'degraded',
         'message': 'Social Media Lead Generator API is running',
         'version': '1.0.0',
+        'gemini_circuit': gemini_circuit,
         'timestamp': datetime.now().isoformat()
     })
 
@@ -75,20 +118,136 @@ def test_gemini():
             'error': str(e)
         }), 500
 
+@app.route('/api/gemini/stats', methods=['GET'])
+def get_gemini_stats():
+    """Get Gemini cache and rate limiter statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': gemini_service.get_stats()
+        })
+        
+    except Exception as e:
+        logging.error(f"Gemini stats error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/gemini/usage', methods=['GET'])
+def get_gemini_usage():
+    """Get Gemini token and cost usage per call type, platform, scan and day"""
+    try:
+        return jsonify({
+            'success': True,
+            'usage': gemini_service.get_usage(request.args.get('scan_id'))
+        })
+    
+    except Exception as e:
+        logging.error(f"Gemini usage error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/gemini/cache', methods=['GET'])
+def get_gemini_cache_stats():
+    """Get Gemini analysis cache statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'cache': gemini_service.get_cache_stats()
+        })
+        
+    except Exception as e:
+        logging.error(f"Gemini cache stats error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/gemini/cache', methods=['DELETE'])
+def invalidate_gemini_cache():
+    """Invalidate cached Gemini analyses (optionally for one prompt kind)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        kind = data.get('kind') or request.args.get('kind')
+        
+        removed = gemini_service.invalidate_cache(kind)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Removed {removed} cached analyses',
+            'removed': removed
+        })
+        
+    except Exception as e:
+        logging.error(f"Gemini cache invalidation error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/scrape/governor', methods=['GET'])
+def get_scrape_governor():
+    """Get adaptive scrape pacing per platform (and wait time of one scan with ?scan_id=)"""
+    try:
+        result = {
+            'success': True,
+            'governors': rate_governor.get_stats(),
+            'instagram': instagram_service.get_stats()
+        }
+        scan_id = request.args.get('scan_id')
+        if scan_id:
+            result['scan_wait_seconds'] = rate_governor.scan_wait_seconds(scan_id)
+        return jsonify(result)
+    
+    except Exception as e:
+        logging.error(f"Scrape governor stats error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/pipeline/stats', methods=['GET'])
+def get_pipeline_stats():
+    """Get per-stage throughput, queue depth and latency of running and recent pipelines (?scan_id= for one scan)"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': pipeline.get_stats(request.args.get('scan_id'))
+        })
+    
+    except Exception as e:
+        logging.error(f"Pipeline stats error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/scrape/instagram', methods=['POST'])
 def scrape_instagram():
     """Scrape Instagram for leads"""
     try:
         data = request.json or {}
         hashtags = data.get('hashtags', ['gurgaonproperty', 'realestate'])
+        max_posts = int(data.get('max_posts') or 10)
         
         logging.info(f"Starting Instagram scraping for hashtags: {hashtags}")
         
-        # Scrape Instagram
-        posts = instagram_service.scrape_hashtags(hashtags)
+        # Each post comes back once, its 'hashtags' listing every hashtag it matched
+        matched_hashtags = []
+        
+        def source(cancel):
+            # Up to max_posts new posts per hashtag (everything unless "incremental": false)
+            for post in instagram_service.iter_posts(hashtags, max_posts, incremental=data.get('incremental'), cancel=cancel):
+                matched_hashtags.append(post['hashtags'])
+                yield post
+        
+        if data.get('stream') or request.args.get('stream') == 'true':
+            # NDJSON: one line per lead as soon as it is analyzed and persisted, then a summary line
+            def generate():
+                lead_pipeline = lead_pipelines.build('instagram', source)
+                total = 0
+                for lead in lead_pipeline.run():
+                    total += 1
+                    yield json.dumps({'lead': lead, 'total_found': total}, ensure_ascii=False, default=str) + '\n'
+                yield json.dumps({
+                    'success': True,
+                    'done': True,
+                    'total_found': total,
+                    'duplicates_skipped': sum(len(matched) - 1 for matched in matched_hashtags),
+                    'platform': 'instagram',
+                    'hashtags_scraped': hashtags,
+                    'pipeline': lead_pipeline.get_stats(),
+                    'timestamp': datetime.now().isoformat()
+                }) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
         
-        # AI analysis with Gemini
-        leads = gemini_service.analyze_posts_for_leads(posts)
+        leads, pipeline_stats = run_lead_pipeline('instagram', source)
         
         # Save results to logs
         logging.info(f"Instagram scraping completed. Found {len(leads)} leads")
@@ -99,6 +258,8 @@ def scrape_instagram():
             'total_found': len(leads),
             'platform': 'instagram',
             'hashtags_scraped': hashtags,
+            'duplicates_skipped': sum(len(matched) - 1 for matched in matched_hashtags),
+            'pipeline': pipeline_stats,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -119,11 +280,10 @@ def scrape_facebook():
         
         logging.info(f"Starting Facebook scraping for groups: {groups}")
         
-        # Scrape Facebook
-        posts = facebook_service.scrape_groups(groups)
-        
-        # AI analysis with Gemini
-        leads = gemini_service.analyze_posts_for_leads(posts)
+        # Scrape Facebook, analyzing posts while later groups are still loading
+        leads, pipeline_stats = run_lead_pipeline(
+            'facebook', lambda cancel: facebook_service.iter_groups(groups, cancel=cancel)
+        )
         
         logging.info(f"Facebook scraping completed. Found {len(leads)} leads")
         
@@ -133,6 +293,7 @@ def scrape_facebook():
             'total_found': len(leads),
             'platform': 'facebook',
             'groups_scraped': groups,
+            'pipeline': pipeline_stats,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -153,11 +314,10 @@ def scrape_youtube():
         
         logging.info(f"Starting YouTube scraping for videos: {video_ids}")
         
-        # Scrape YouTube
-        comments = youtube_service.scrape_comments(video_ids)
-        
-        # AI analysis with Gemini
-        leads = gemini_service.analyze_comments_for_leads(comments)
+        # Scrape YouTube, analyzing comments while later pages are still downloading
+        leads, pipeline_stats = run_lead_pipeline(
+            'youtube', lambda cancel: youtube_service.iter_comments(video_ids, cancel=cancel), item_kind='comment'
+        )
         
         logging.info(f"YouTube scraping completed. Found {len(leads)} leads")
         
@@ -167,6 +327,7 @@ def scrape_youtube():
             'total_found': len(leads),
             'platform': 'youtube',
             'videos_scraped': video_ids,
+            'pipeline': pipeline_stats,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -180,59 +341,75 @@ def scrape_youtube():
 
 @app.route('/api/scrape/all', methods=['POST'])
 def scrape_all():
-    """Scrape all platforms and return combined leads"""
+    """Scrape all platforms concurrently and return combined leads"""
     try:
         data = request.json or {}
         
-        logging.info("Starting comprehensive social media scraping")
+        # Sources come from the request, falling back to the scheduler's configuration
+        sources = {
+            'instagram': data.get('hashtags') or scheduler_service.config['hashtags'],
+            'facebook': data.get('groups') or scheduler_service.config['facebook_groups'],
+            'youtube': data.get('video_ids') or scheduler_service.config['youtube_videos']
+        }
+        builders = {
+            'instagram': lambda: lead_pipelines.build(
+                'instagram', lambda cancel: instagram_service.iter_posts(sources['instagram'], cancel=cancel)
+            ),
+            'facebook': lambda: lead_pipelines.build(
+                'facebook', lambda cancel: facebook_service.iter_groups(sources['facebook'], cancel=cancel)
+            ),
+            'youtube': lambda: lead_pipelines.build(
+                'youtube', lambda cancel: youtube_service.iter_comments(sources['youtube'], cancel=cancel),
+                item_kind='comment'
+            )
+        }
         
-        all_leads = []
-        results = {}
+        # Per-platform timeouts in seconds: a number for all platforms or {"instagram": 120, ...}
+        timeouts = data.get('timeouts', {})
+        default_timeout = float(os.getenv('SCRAPE_ALL_TIMEOUT', 240))
+        if not isinstance(timeouts, dict):
+            default_timeout, timeouts = float(timeouts), {}
         
-        # Instagram scraping
-        try:
-            instagram_posts = instagram_service.scrape_hashtags(['gurgaonproperty', 'realestate'])
-            instagram_leads = gemini_service.analyze_posts_for_leads(instagram_posts)
-            all_leads.extend(instagram_leads)
-            results['instagram'] = {
-                'success': True,
-                'leads_count': len(instagram_leads)
-            }
-        except Exception as e:
-            results['instagram'] = {
-                'success': False,
-                'error': str(e)
-            }
+        logging.info("Starting comprehensive social media scraping")
+        started_at = time.time()
         
-        # Facebook scraping
-        try:
-            facebook_posts = facebook_service.scrape_groups(['gurgaonproperty'])
-            facebook_leads = gemini_service.analyze_posts_for_leads(facebook_posts)
-            all_leads.extend(facebook_leads)
-            results['facebook'] = {
-                'success': True,
-                'leads_count': len(facebook_leads)
-            }
-        except Exception as e:
-            results['facebook'] = {
-                'success': False,
-                'error': str(e)
-            }
+        # The platforms scrape concurrently; each one's governor still paces its own requests
+        runs = {}
+        results = {}
+        for platform, build in builders.items():
+            if not sources[platform]:
+                results[platform] = {'success': False, 'status': 'skipped', 'leads_count': 0, 'sources': []}
+                continue
+            try:
+                lead_pipeline = build()
+                runs[platform] = (lead_pipeline, start_platform_run(platform, lead_pipeline))
+            except Exception as e:
+                results[platform] = {'success': False, 'status': 'failed', 'error': str(e), 'leads_count': 0,
+                                     'sources': sources[platform]}
         
-        # YouTube scraping
-        try:
-            youtube_comments = youtube_service.scrape_comments(['real_estate_video_id'])
-            youtube_leads = gemini_service.analyze_comments_for_leads(youtube_comments)
-            all_leads.extend(youtube_leads)
-            results['youtube'] = {
-                'success': True,
-                'leads_count': len(youtube_leads)
-            }
-        except Exception as e:
-            results['youtube'] = {
-                'success': False,
-                'error': str(e)
+        all_leads = []
+        for platform, (lead_pipeline, run) in runs.items():
+            timeout = float(timeouts.get(platform, default_timeout))
+            timed_out = not run['done'].wait(max(0.0, run['started_at'] + timeout - time.time()))
+            if timed_out:
+                # Keep what arrived so far; the scraper stops after its current request
+                lead_pipeline.cancel()
+                logging.warning(f"{platform} scraping timed out after {timeout:.0f}s, returning partial results")
+            
+            leads = list(run['leads'])
+            all_leads.extend(leads)
+            status = 'timed_out' if timed_out else ('failed' if run['error'] else 'completed')
+            results[platform] = {
+                'success': status == 'completed',
+                'status': status,
+                'leads_count': len(leads),
+                'duration_seconds': round((run['finished_at'] or time.time()) - run['started_at'], 3),
+                'timeout_seconds': timeout,
+                'sources': sources[platform],
+                'pipeline': lead_pipeline.get_stats()
             }
+            if run['error']:
+                results[platform]['error'] = run['error']
         
         logging.info(f"Comprehensive scraping completed. Total leads found: {len(all_leads)}")
         
@@ -240,7 +417,8 @@ def scrape_all():
             'success': True,
             'leads': all_leads,
             'total_found': len(all_leads),
-            'platforms': results,
+            'platforms': {platform: results[platform] for platform in builders},
+            'duration_seconds': round(time.time() - started_at, 3),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -264,8 +442,32 @@ def analyze_leads():
                 'error': 'No leads provided for analysis'
             }), 400
         
+        batch_size = data.get('batch_size')
+        batch_size = int(batch_size) if batch_size else None
+        
+        if data.get('stream') or request.args.get('stream') == 'true':
+            # NDJSON: one line per scored chunk, then a summary line
+            def generate():
+                processed = 0
+                for index, chunk in enumerate(gemini_service.iter_lead_quality(leads, batch_size=batch_size)):
+                    processed += len(chunk)
+                    yield json.dumps({
+                        'chunk': index,
+                        'analyzed_leads': chunk,
+                        'processed': processed,
+                        'total': len(leads)
+                    }, ensure_ascii=False, default=str) + '\n'
+                yield json.dumps({
+                    'success': True,
+                    'done': True,
+                    'total_analyzed': processed,
+                    'timestamp': datetime.now().isoformat()
+                }) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
         # Analyze leads with Gemini
-        analyzed_leads = gemini_service.analyze_lead_quality(leads)
+        analyzed_leads = gemini_service.analyze_lead_quality(leads, batch_size=batch_size)
         
         return jsonify({
             'success': True,
@@ -281,6 +483,29 @@ def analyze_leads():
             'error': str(e)
         }), 500
 
+@app.route('/api/leads/reprocess', methods=['POST'])
+def reprocess_parked_leads():
+    """Analyze posts parked while Gemini was unavailable"""
+    try:
+        data = request.get_json(silent=True) or {}
+        limit = int(data.get('limit', 500))
+        
+        result = gemini_service.reprocess_parked(limit)
+        leads = result['leads']
+        
+        return jsonify({
+            'success': True,
+            'leads': leads,
+            'total_found': len(leads),
+            'retracted_provisional_ids': result['retracted_provisional_ids'],
+            'gemini_circuit': gemini_service.get_circuit_status(),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logging.error(f"Parked lead reprocessing error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/leads/export/excel', methods=['POST'])
 def export_leads_to_excel():
     """Export leads to Excel file"""
@@ -0,0 +1,228 @@
+"""
+Analysis Cache Service
+Persistent SQLite cache for Gemini analyses, keyed by content hash, prompt version and model
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+class AnalysisCache:
+    def __init__(self, db_path: str = None, ttl_hours: float = None, max_entries: int = None):
+        """Initialize the on-disk analysis cache"""
+        self.db_path = db_path or os.getenv('GEMINI_CACHE_PATH', '../data/cache/gemini_cache.db')
+        self.enabled = os.getenv('GEMINI_CACHE_ENABLED', 'True').lower() == 'true'
+        
+        if ttl_hours is None:
+            ttl_hours = float(os.getenv('GEMINI_CACHE_TTL_HOURS', 168))
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries or int(os.getenv('GEMINI_CACHE_MAX_ENTRIES', 50000))
+        
+        # Counters for this process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes_since_eviction = 0
+        
+        self._lock = threading.Lock()
+        self._conn = None
+        
+        if self.enabled:
+            try:
+                self._open()
+            except Exception as e:
+                logging.error(f"Analysis cache unavailable, continuing without it: {e}")
+                self.enabled = False
+        
+        logging.info(f"Analysis Cache initialized (enabled={self.enabled})")
+    
+    def _open(self):
+        """Open the SQLite database and create the schema"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_analyses_last_access ON analyses (last_access)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_analyses_kind ON analyses (kind, prompt_version)')
+        self._conn.commit()
+    
+    @staticmethod
+    def normalize_content(content: str) -> str:
+        """Normalize content so trivially different copies share a cache entry"""
+        content = unicodedata.normalize('NFKC', content or '')
+        return _WHITESPACE_RE.sub(' ', content).strip()
+    
+    @classmethod
+    def make_key(cls, kind: str, content: str, prompt_version: str, model_name: str) -> str:
+        """Build the content-addressed cache key"""
+        material = '\x1f'.join([kind, str(prompt_version), model_name, cls.normalize_content(content)])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+    
+    def get(self, kind: str, content: str, prompt_version: str, model_name: str) -> Optional[Any]:
+        """Return the cached analysis, or None on a miss"""
+        return self.get_by_key(self.make_key(kind, content, prompt_version, model_name))
+    
+    def get_by_key(self, key: str) -> Optional[Any]:
+        """Return the analysis stored under a key from make_key, or None on a miss"""
+        if not self.enabled:
+            return None
+        
+        now = time.time()
+        
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT result, created_at FROM analyses WHERE key = ?', (key,)
+                ).fetchone()
+                
+                if row and now - row[1] <= self.ttl_seconds:
+                    self._conn.execute('UPDATE analyses SET last_access = ? WHERE key = ?', (now, key))
+                    self._conn.commit()
+                    self.hits += 1
+                    return json.loads(row[0])
+                
+                if row:
+                    # Expired entry
+                    self._conn.execute('DELETE FROM analyses WHERE key = ?', (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                
+                self.misses += 1
+                return None
+        
+        except Exception as e:
+            logging.error(f"Analysis cache read error: {e}")
+            return None
+    
+    def set(self, kind: str, content: str, prompt_version: str, model_name: str, result: Any):
+        """Store an analysis result"""
+        if not self.enabled:
+            return
+        
+        key = self.make_key(kind, content, prompt_version, model_name)
+        now = time.time()
+        
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO analyses '
+                    '(key, kind, prompt_version, model, content, result, created_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key, kind, str(prompt_version), model_name, self.normalize_content(content),
+                     json.dumps(result, ensure_ascii=False), now, now)
+                )
+                self._conn.commit()
+                
+                # Size-based eviction is checked periodically rather than on every write
+                self._writes_since_eviction += 1
+                if self._writes_since_eviction >= 100:
+                    self._writes_since_eviction = 0
+                    self._evict_locked()
+        
+        except Exception as e:
+            logging.error(f"Analysis cache write error: {e}")
+    
+    def _evict_locked(self):
+        """Drop expired entries, then least recently used ones above max_entries"""
+        cutoff = time.time() - self.ttl_seconds
+        removed = self._conn.execute('DELETE FROM analyses WHERE created_at < ?', (cutoff,)).rowcount
+        
+        count = self._conn.execute('SELECT COUNT(*) FROM analyses').fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            removed += self._conn.execute(
+                'DELETE FROM analyses WHERE key IN '
+                '(SELECT key FROM analyses ORDER BY last_access ASC LIMIT ?)',
+                (overflow,)
+            ).rowcount
+        
+        self._conn.commit()
+        self.evictions += removed
+    
+    def evict(self):
+        """Run TTL and size-based eviction now"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._evict_locked()
+    
+    def invalidate(self, kind: str = None) -> int:
+        """Remove all entries, or only those of one analysis kind"""
+        if not self.enabled:
+            return 0
+        
+        with self._lock:
+            if kind:
+                removed = self._conn.execute('DELETE FROM analyses WHERE kind = ?', (kind,)).rowcount
+            else:
+                removed = self._conn.execute('DELETE FROM analyses').rowcount
+            self._conn.commit()
+        
+        logging.info(f"Analysis cache invalidated {removed} entries (kind={kind or 'all'})")
+        return removed
+    
+    def purge_stale_versions(self, current_versions: Dict[str, Any]) -> int:
+        """Remove entries written by prompt versions that are no longer current (one or a list per kind)"""
+        if not self.enabled:
+            return 0
+        
+        removed = 0
+        with self._lock:
+            for kind, versions in current_versions.items():
+                versions = [str(versions)] if isinstance(versions, str) else [str(version) for version in versions]
+                placeholders = ','.join('?' * len(versions))
+                removed += self._conn.execute(
+                    f'DELETE FROM analyses WHERE kind = ? AND prompt_version NOT IN ({placeholders})',
+                    [kind] + versions
+                ).rowcount
+            self._conn.commit()
+        
+        if removed:
+            logging.info(f"Analysis cache purged {removed} entries from outdated prompt versions")
+        return removed
+    
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        stats = {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / (self.hits + self.misses), 3) if (self.hits + self.misses) else 0.0,
+            'evictions': self.evictions,
+            'ttl_hours': self.ttl_seconds / 3600,
+            'max_entries': self.max_entries
+        }
+        
+        if self.enabled:
+            try:
+                with self._lock:
+                    rows = self._conn.execute('SELECT kind, COUNT(*) FROM analyses GROUP BY kind').fetchall()
+                stats['entries'] = sum(count for _, count in rows)
+                stats['entries_by_kind'] = dict(rows)
+            except Exception as e:
+                logging.error(f"Analysis cache stats error: {e}")
+        
+        return stats
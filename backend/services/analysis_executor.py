@@ -0,0 +1,90 @@
+"""
+Analysis Executor
+Runs Gemini analysis work concurrently with a bounded thread pool and a process-wide cap on model calls
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+# Every pool, request thread and pipeline worker shares one cap on in-flight model calls
+_call_slots = None
+_call_slots_lock = threading.Lock()
+
+def call_slots() -> threading.BoundedSemaphore:
+    """Process-wide semaphore allowing GEMINI_MAX_CONCURRENCY model calls at once"""
+    global _call_slots
+    with _call_slots_lock:
+        if _call_slots is None:
+            _call_slots = threading.BoundedSemaphore(max(1, int(os.getenv('GEMINI_MAX_CONCURRENCY', 4))))
+        return _call_slots
+
+class AnalysisExecutor:
+    def __init__(self, max_workers: int = None):
+        """Initialize executor with a concurrency limit"""
+        self.max_workers = max_workers or int(os.getenv('GEMINI_MAX_CONCURRENCY', 4))
+        self.slots = call_slots()
+        
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.total_wait_seconds = 0.0
+        
+        logging.info(f"Analysis Executor initialized (max_workers={self.max_workers})")
+    
+    @contextmanager
+    def model_call(self):
+        """Hold one of the process-wide model call slots for the duration of a call"""
+        start = time.time()
+        with self.slots:
+            with self._lock:
+                self.calls += 1
+                self.total_wait_seconds += time.time() - start
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+    
+    def map(self, func: Callable[[Any], Any], items: List[Any], label: str = 'item') -> List[Any]:
+        """Apply func to every item concurrently, preserving input order (failed items yield None)"""
+        items = list(items)
+        if not items:
+            return []
+        
+        workers = min(self.max_workers, len(items))
+        if workers <= 1:
+            return [self._run_isolated(func, item, label) for item in items]
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analysis') as executor:
+            # Each task runs in a copy of the caller's context (scan/platform usage attribution)
+            futures = [executor.submit(contextvars.copy_context().run, self._run_isolated, func, item, label)
+                       for item in items]
+            return [future.result() for future in futures]
+    
+    def _run_isolated(self, func: Callable[[Any], Any], item: Any, label: str) -> Any:
+        """Run one unit of work, converting failures into None"""
+        try:
+            return func(item)
+        except Exception as e:
+            logging.error(f"Error analyzing {label}: {e}")
+            return None
+    
+    def get_stats(self) -> Dict:
+        """Get model call concurrency counters"""
+        with self._lock:
+            return {
+                'max_concurrency': self.max_workers,
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'calls': self.calls,
+                'total_slot_wait_seconds': round(self.total_wait_seconds, 3)
+            }
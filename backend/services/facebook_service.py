@@ -10,15 +10,19 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import time
-import random
 import logging
-from typing import List, Dict
+from typing import AsyncIterator, Iterator, List, Dict
 import os
 
+from services.rate_governor import get_governor
+from services.streaming import CancelToken, aiterate, normalize_item
+
 class FacebookService:
     def __init__(self):
         """Initialize Facebook scraper with Selenium"""
         self.driver = None
+        # Shared adaptive pacing of page loads: backs off on login walls and empty pages
+        self.governor = get_governor('facebook')
         self.setup_driver()
         logging.info("Facebook Service initialized")
     
@@ -49,37 +53,46 @@ class FacebookService:
     
     def scrape_groups(self, group_names: List[str]) -> List[Dict]:
         """Scrape posts from Facebook groups"""
-        all_posts = []
-        
+        return list(self.iter_groups(group_names))
+    
+    def iter_groups(self, group_names: List[str], max_posts: int = 20,
+                    cancel: CancelToken = None) -> Iterator[Dict]:
+        """Yield up to max_posts posts per group as soon as each is extracted"""
         if not self.driver:
             logging.error("Chrome driver not available")
-            return all_posts
+            return
         
+        total = 0
         for group_name in group_names:
+            if cancel and cancel.cancelled:
+                break
             try:
                 logging.info(f"Scraping Facebook group: {group_name}")
                 
                 # Construct group URL
                 group_url = f"https://facebook.com/groups/{group_name}"
                 
-                posts = self._scrape_group_posts(group_url, group_name)
-                all_posts.extend(posts)
-                
-                # Delay between groups
-                time.sleep(random.randint(10, 20))
+                for post_data in self._iter_group_posts(group_url, group_name, max_posts, cancel):
+                    total += 1
+                    yield post_data
                 
             except Exception as e:
                 logging.error(f"Error scraping group {group_name}: {e}")
                 continue
         
-        logging.info(f"Total Facebook posts scraped: {len(all_posts)}")
-        return all_posts
+        logging.info(f"Total Facebook posts scraped: {total}")
     
-    def _scrape_group_posts(self, group_url: str, group_name: str) -> List[Dict]:
-        """Scrape posts from a specific Facebook group"""
-        posts = []
+    def aiter_groups(self, group_names: List[str], **kwargs) -> AsyncIterator[Dict]:
+        """Async variant of iter_groups (one browser, so one stream at a time)"""
+        return aiterate(self.iter_groups, group_names, **kwargs)
+    
+    def _iter_group_posts(self, group_url: str, group_name: str, max_posts: int = 20,
+                          cancel: CancelToken = None) -> Iterator[Dict]:
+        """Yield posts from a specific Facebook group"""
+        count = 0
         
         try:
+            self.governor.wait()
             self.driver.get(group_url)
             time.sleep(5)
             
@@ -105,30 +118,38 @@ class FacebookService:
                         break
                 except:
                     continue
+            self._record_page_outcome(post_elements)
             
-            max_posts = 20  # Limit to avoid detection
-            count = 0
-            
+            # max_posts limits each group to avoid detection
             for post_element in post_elements:
-                if count >= max_posts:
+                if count >= max_posts or (cancel and cancel.cancelled):
                     break
                 
                 try:
                     post_data = self._extract_post_data(post_element, group_name)
-                    if post_data:
-                        posts.append(post_data)
-                        count += 1
-                        
                 except Exception as e:
                     logging.error(f"Error extracting post data: {e}")
                     continue
+                
+                if post_data:
+                    count += 1
+                    yield normalize_item(post_data, 'facebook', group_name)
             
-            logging.info(f"Scraped {len(posts)} posts from group {group_name}")
+            logging.info(f"Scraped {count} posts from group {group_name}")
             
         except Exception as e:
             logging.error(f"Error scraping group posts from {group_url}: {e}")
-        
-        return posts
+            self.governor.record_error(e)
+    
+    def _record_page_outcome(self, post_elements: List):
+        """Tell the governor whether a page load went through or hit a login wall / empty page"""
+        current_url = (self.driver.current_url or '').lower()
+        if 'login' in current_url or 'checkpoint' in current_url:
+            self.governor.record_throttle('login_wall')
+        elif not post_elements:
+            self.governor.record_throttle('empty_page')
+        else:
+            self.governor.record_success()
     
     def _extract_post_data(self, post_element, group_name: str) -> Dict:
         """Extract data from a Facebook post element"""
@@ -240,6 +261,7 @@ class FacebookService:
             logging.info(f"Scraping Facebook page: {page_name}")
             
             page_url = f"https://facebook.com/{page_name}"
+            self.governor.wait()
             self.driver.get(page_url)
             time.sleep(5)
             
@@ -250,6 +272,7 @@ class FacebookService:
             
             # Find and extract posts
             post_elements = self.driver.find_elements(By.CSS_SELECTOR, '[role="article"]')
+            self._record_page_outcome(post_elements)
             
             count = 0
             for post_element in post_elements:
@@ -265,6 +288,7 @@ class FacebookService:
             
         except Exception as e:
             logging.error(f"Error scraping page {page_name}: {e}")
+            self.governor.record_error(e)
         
         return posts
     
@@ -3,22 +3,121 @@ Gemini Pro API Service
 Handles all AI operations using Google's Gemini Pro API
 """
 
-import google.generativeai as genai
 import json
 import logging
 import os
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Tuple
+
+from services.analysis_cache import AnalysisCache
+from services.analysis_executor import AnalysisExecutor
+from services.rate_limiter import TokenBucketLimiter
+from services.resilience import RetryPolicy, CircuitBreaker, CircuitOpenError
+from services.parked_items import ParkedItemStore
+from services.single_flight import SingleFlight
+from services.lead_cascade import LeadCascade
+from services.model_backends import ModelBackend
+from services.usage_tracker import UsageTracker, usage_context, set_scan
+from services.prompt_registry import PromptRegistry, estimate_tokens
+from services.response_parser import (
+    ResponseParser, ResponseParseError, LeadIntentResult, ScreenResult, ContactResult, LeadQualityResult
+)
+from utils.lead_prefilter import LeadPrefilter
+from utils.lead_classifier import LeadClassifier
+from utils.contact_extractor import ContactExtractor
+from utils.lead_parser import LeadParser
+from utils.near_duplicate import NearDuplicateIndex
+
+# Cached analysis kinds; cached entries from prompt versions no longer in use are purged
+CACHE_KINDS = ('screen', 'intent', 'intent_contact', 'contact', 'quality')
+
+# Lead fields sent for quality scoring - content, URLs and timestamps only cost tokens
+QUALITY_LEAD_FIELDS = (
+    'requirement', 'location', 'budget', 'timeline', 'buying_intent', 'lead_score', 'contact_method',
+    'source', 'language', 'confidence', 'action'
+)
+
+# Shortest text worth analyzing per item kind
+MIN_CONTENT_LENGTH = {'post': 10, 'comment': 5}
+
+# Ask the model for raw JSON instead of prose/markdown (structured-output mode)
+JSON_GENERATION_CONFIG = {'response_mime_type': 'application/json'}
 
 class GeminiService:
     def __init__(self):
         """Initialize Gemini Pro API"""
-        self.api_key = os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        # Live Gemini by default; record/replay/stub (GEMINI_BACKEND) run without an API key
+        self.backend = ModelBackend()
+        
+        # Cascade: local rules -> cheap screen prompt -> full extraction, one model endpoint per tier
+        self.cascade = LeadCascade()
+        self.model_name = self.cascade.extract_model
+        self.model = self.backend.model(self.model_name)
+        self.tier_models = {
+            'screen': self.backend.model(self.cascade.screen_model),
+            'extract': self.model
+        }
+        
+        # Batch analysis settings (GEMINI_BATCH_SIZE=1 disables batching)
+        self.batch_size = int(os.getenv('GEMINI_BATCH_SIZE', 10))
+        self.batch_token_budget = int(os.getenv('GEMINI_BATCH_TOKEN_BUDGET', 6000))
+        
+        # Combined intent + contact analysis (false = legacy two-call path)
+        self.combined_analysis = os.getenv('GEMINI_COMBINED_ANALYSIS', 'True').lower() == 'true'
+        
+        # Structured JSON output; unparseable replies are re-requested instead of dropped
+        self.structured_output = os.getenv('GEMINI_STRUCTURED_OUTPUT', 'True').lower() == 'true'
+        self.parse_retries = int(os.getenv('GEMINI_PARSE_RETRIES', 1))
+        self.parser = ResponseParser()
+        
+        # Lead quality scoring: leads per prompt, and leads per streamed chunk
+        self.quality_batch_size = int(os.getenv('GEMINI_QUALITY_BATCH_SIZE', 25))
+        self.quality_chunk_size = int(os.getenv('GEMINI_QUALITY_CHUNK_SIZE', 200))
+        
+        # Versioned prompt templates; the template version is part of every cache key
+        self.prompts = PromptRegistry()
+        
+        # Persistent analysis cache
+        self.cache = AnalysisCache()
+        self.cache.purge_stale_versions(
+            {kind: self.prompts.live_versions(self._prompt_family(kind)) for kind in CACHE_KINDS}
+        )
         
-        # Configure Gemini
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-001')
+        # Identical analyses requested concurrently (scheduler, manual scrapes) share one call
+        self.single_flight = SingleFlight('gemini')
+        
+        # Bounded concurrency for Gemini calls (GEMINI_MAX_CONCURRENCY in flight per process)
+        self.executor = AnalysisExecutor()
+        
+        # Shared request/token budget for every Gemini call (all threads and workers)
+        self.rate_limiter = TokenBucketLimiter(
+            'gemini',
+            requests_per_minute=float(os.getenv('GEMINI_RATE_LIMIT', 60)),
+            tokens_per_minute=float(os.getenv('GEMINI_TOKEN_RATE_LIMIT', 1000000))
+        )
+        
+        # Retry transient failures; fail fast and park posts while Gemini is down
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = CircuitBreaker('gemini')
+        self.parked = ParkedItemStore()
+        
+        # Token, latency and cost accounting per call type, platform, scan and day
+        self.usage = UsageTracker()
+        
+        # Local rule pre-filter ahead of any LLM call
+        self.prefilter = LeadPrefilter()
+        
+        # Local model trained from past analyses: gate ahead of the screen tier, fallback while Gemini is down
+        self.classifier = LeadClassifier()
+        
+        # Deterministic phone/email/handle extraction (Gemini only as a fallback)
+        self.contact_extractor = ContactExtractor()
+        
+        # Deterministic property/budget/location parsing (numeric budgets, gazetteer locations)
+        self.lead_parser = LeadParser()
+        
+        # Cross-posted captions reuse the analysis of their canonical post
+        self.near_duplicates = NearDuplicateIndex()
         
         logging.info("Gemini Service initialized successfully")
     
@@ -26,150 +125,750 @@ class GeminiService:
         """Test Gemini API with a simple prompt"""
         try:
             prompt = f"Analyze this text and provide a brief response: {text}"
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt, call_type='test')
             return response.text
         except Exception as e:
             logging.error(f"Gemini API test failed: {e}")
             raise
     
-    def analyze_posts_for_leads(self, posts: List[Dict]) -> List[Dict]:
+    def analyze_posts_for_leads(self, posts: List[Dict], batch_size: int = None) -> List[Dict]:
         """Analyze social media posts to identify potential leads"""
-        leads = []
-        
-        for post in posts:
-            try:
-                # Extract text content
-                content = post.get('caption', '') or post.get('text', '') or post.get('message', '')
-                
-                if not content or len(content.strip()) < 10:
-                    continue
-                
-                # Analyze with Gemini
-                lead_analysis = self._analyze_lead_intent(content, post)
-                
-                if lead_analysis and lead_analysis.get('is_lead', False):
-                    lead_data = self._extract_lead_info(content, post, lead_analysis)
-                    leads.append(lead_data)
-                    
-            except Exception as e:
-                logging.error(f"Error analyzing post: {e}")
-                continue
+        with usage_context(platform=self._usage_platform(self._determine_platform(post) for post in posts)):
+            leads = self._find_leads(posts, batch_size=batch_size, item_kind='post')
         
         logging.info(f"Analyzed {len(posts)} posts, found {len(leads)} potential leads")
         return leads
     
-    def analyze_comments_for_leads(self, comments: List[Dict]) -> List[Dict]:
+    def analyze_comments_for_leads(self, comments: List[Dict], batch_size: int = None) -> List[Dict]:
         """Analyze YouTube comments to identify potential leads"""
-        leads = []
+        with usage_context(platform=self._usage_platform(self._determine_platform(comment) for comment in comments)):
+            leads = self._find_leads(comments, batch_size=batch_size, item_kind='comment')
+        
+        logging.info(f"Analyzed {len(comments)} comments, found {len(leads)} potential leads")
+        return leads
+    
+    def screen_item(self, item: Dict, item_kind: str = 'post'):
+        """Rules tier for one item: None if it never needs the model, else whether it passed the filter"""
+        content = self._get_item_content(item)
+        if not content or len(content.strip()) < MIN_CONTENT_LENGTH[item_kind]:
+            return None
+        
+        analyze, passed, _ = self.prefilter.check(content)
+        self.cascade.record('rules', exited=not analyze)
+        return passed if analyze else None
+    
+    def analyze_screened(self, screened: List[Tuple[Dict, bool]], item_kind: str = 'post',
+                         batch_size: int = None) -> List[Dict]:
+        """Analyze items that already went through screen_item, as (item, passed_filter) pairs"""
+        items = [item for item, _ in screened]
+        with usage_context(platform=self._usage_platform(self._determine_platform(item) for item in items)):
+            return self._find_leads(items, batch_size=batch_size, item_kind=item_kind,
+                                    screened=[passed for _, passed in screened])
+    
+    def _find_leads(self, items: List[Dict], batch_size: int = None, item_kind: str = 'post',
+                    screened: List[bool] = None) -> List[Dict]:
+        """Run lead analysis over posts/comments, batching prompts when enabled"""
+        if batch_size is None:
+            batch_size = self.batch_size
+        
+        # Collect analyzable items keyed by a batch-unique id; obvious non-leads never reach Gemini
+        candidates = []
+        candidate_meta = {}
+        for index, item in enumerate(items):
+            passed = screened[index] if screened is not None else self.screen_item(item, item_kind)
+            if passed is None:
+                continue
+            
+            content = self._get_item_content(item)
+            key = self._batch_key(item, index)
+            candidate_meta[key] = {'passed_filter': passed, 'doc_id': self._document_id(item, content)}
+            candidates.append((key, content, item))
+        
+        # Near-duplicate stage: link cross-posts to their canonical post
+        keys_by_doc = {}
+        for key, content, item in candidates:
+            meta = candidate_meta[key]
+            canonical = self.near_duplicates.find(content, meta['doc_id'])
+            if canonical and canonical['id'] != meta['doc_id']:
+                meta['duplicate_of'] = canonical
+            else:
+                keys_by_doc[meta['doc_id']] = key
+                self.near_duplicates.add(meta['doc_id'], content, self._post_reference_url(item))
+        
+        # Reuse canonical and cached analyses, batch only what is left
+        kind = self._intent_kind()
+        raw_analyses = {}
+        pending = []
+        followers = {}
+        for candidate in candidates:
+            key = candidate[0]
+            meta = candidate_meta[key]
+            reused = self._canonical_analysis(kind, candidate[1], meta.get('duplicate_of'))
+            if reused is not None:
+                raw_analyses[key] = reused
+                self.cascade.record_reused()
+                continue
+            if meta.get('duplicate_of') and meta['duplicate_of']['id'] in keys_by_doc:
+                # Canonical copy is in this run - wait for its analysis
+                followers[key] = keys_by_doc[meta['duplicate_of']['id']]
+                continue
+            
+            cached = self._cache_get(kind, candidate[1])
+            if cached is not None:
+                raw_analyses[key] = cached
+                self.cascade.record_reused()
+            else:
+                pending.append(candidate)
+        
+        # Classifier tier: confident local non-leads stop here, confident leads skip the screen prompt
+        skip_screen = []
+        if self.classifier.available and pending:
+            predictions = self.classifier.predict_batch([candidate[1] for candidate in pending])
+            remaining = []
+            for candidate, prediction in zip(pending, predictions):
+                gated = self.classifier.gates(prediction)
+                self.cascade.record('classifier', exited=gated)
+                if gated:
+                    raw_analyses[candidate[0]] = {
+                        'is_lead': False,
+                        'lead_score': prediction['lead_score'],
+                        'confidence': prediction['confidence'],
+                        'exit_tier': 'classifier'
+                    }
+                elif self.classifier.escalates(prediction):
+                    skip_screen.append(candidate)
+                else:
+                    remaining.append(candidate)
+            pending = remaining
+        
+        # Screen tier: a short lead/not-lead prompt keeps confident non-leads away from full extraction
+        if self.cascade.enabled and pending:
+            verdicts = self._screen_candidates(pending, batch_size)
+            escalated = []
+            for candidate in pending:
+                verdict = verdicts.get(candidate[0])
+                rejected = bool(verdict) and self.cascade.screen_rejects(verdict)
+                self.cascade.record('screen', exited=rejected)
+                if verdict:
+                    self.prompts.record_outcome(
+                        'screen', self.prompts.version_for('screen', candidate[1]), 'rejected' if rejected else 'escalated'
+                    )
+                if rejected:
+                    raw_analyses[candidate[0]] = {
+                        'is_lead': False,
+                        'lead_score': 0,
+                        'confidence': verdict.get('confidence'),
+                        'exit_tier': 'screen'
+                    }
+                else:
+                    escalated.append(candidate)
+            pending = escalated
+        pending = skip_screen + pending
+        
+        # Claim batched posts so concurrent requests wait for this batch; posts already
+        # in flight elsewhere are left out and join that call individually below
+        batches = []
+        claims = {}
+        for batch in self._make_batches(pending, batch_size, 'intent'):
+            if len(batch) < 2:
+                continue
+            claimed = []
+            for candidate in batch:
+                flight_key = self._flight_key(kind, candidate[1])
+                _, leader = self.single_flight.claim(flight_key)
+                if leader:
+                    claims[candidate[0]] = flight_key
+                    claimed.append(candidate)
+            if claimed:
+                batches.append(claimed)
         
-        for comment in comments:
+        try:
+            for batch_results in self.executor.map(self._analyze_batch_intent, batches, label='batch'):
+                if batch_results:
+                    raw_analyses.update(batch_results)
+        finally:
+            for key, flight_key in claims.items():
+                if key in raw_analyses:
+                    self.single_flight.resolve(flight_key, raw_analyses[key])
+                else:
+                    self.single_flight.release(flight_key)
+        
+        for key, canonical_key in followers.items():
+            if canonical_key in raw_analyses:
+                raw_analyses[key] = raw_analyses[canonical_key]
+        
+        # Finish each post concurrently; results keep input order and failures stay isolated
+        results = self.executor.map(
+            lambda candidate: self._analyze_candidate(
+                candidate, raw_analyses.get(candidate[0]), item_kind, candidate_meta[candidate[0]]
+            ),
+            candidates,
+            label='post'
+        )
+        
+        self.near_duplicates.maybe_save()
+        
+        return [lead for lead in results if lead]
+    
+    def _document_id(self, item: Dict, content: str) -> str:
+        """Stable id of a post across scans (falls back to a content hash)"""
+        identifier = item.get('shortcode') or item.get('post_id') or item.get('comment_id') or item.get('post_url') or item.get('url')
+        if identifier:
+            return f"{self._determine_platform(item)}:{identifier}"
+        return 'content:' + AnalysisCache.make_key('document', content, '', '')[:32]
+    
+    def _post_reference_url(self, item: Dict) -> str:
+        """URL used to link duplicates back to their canonical post"""
+        return self._generate_post_url(item, self._determine_platform(item))
+    
+    def register_tier_model(self, tier: str, model, model_name: str = None):
+        """Swap the model endpoint behind a cascade tier (e.g. a local stub in tests)"""
+        self.tier_models[tier] = model
+        if tier == 'extract':
+            self.model = model
+            self.model_name = model_name or getattr(model, 'model_name', self.model_name)
+        elif model_name:
+            self.cascade.screen_model = model_name
+    
+    def _generate(self, prompt: str, expected_output_tokens: int = 256, tier: str = 'extract',
+                  call_type: str = 'intent'):
+        """Send a prompt to Gemini with rate limiting, retries and the circuit breaker"""
+        model = self.tier_models[tier]
+        model_name = str(getattr(model, 'model_name', tier)).replace('models/', '', 1)
+        input_estimate = self._estimate_tokens(prompt)
+        
+        def attempt():
+            self.circuit_breaker.before_call()
+            self.rate_limiter.acquire(input_estimate + expected_output_tokens)
+            start = time.time()
             try:
-                content = comment.get('text', '') or comment.get('content', '')
-                
-                if not content or len(content.strip()) < 5:
-                    continue
-                
-                # Analyze with Gemini
-                lead_analysis = self._analyze_lead_intent(content, comment)
-                
-                if lead_analysis and lead_analysis.get('is_lead', False):
-                    lead_data = self._extract_lead_info(content, comment, lead_analysis)
-                    leads.append(lead_data)
-                    
+                with self.executor.model_call():
+                    response = self._call_model(model, prompt)
             except Exception as e:
-                logging.error(f"Error analyzing comment: {e}")
-                continue
+                self.usage.record(call_type, model_name, input_estimate, 0, time.time() - start, error=True)
+                # Only endpoint health problems count against the breaker
+                if self.retry_policy.is_retryable(e):
+                    self.circuit_breaker.record_failure()
+                else:
+                    self.circuit_breaker.record_success()
+                raise
+            self.circuit_breaker.record_success()
+            self._record_usage(call_type, model_name, response, input_estimate, time.time() - start)
+            return response
         
-        logging.info(f"Analyzed {len(comments)} comments, found {len(leads)} potential leads")
-        return leads
+        return self.retry_policy.call(attempt)
     
-    def _analyze_lead_intent(self, content: str, source_data: Dict) -> Dict:
-        """Analyze content for lead intent using Gemini Pro"""
+    def _record_usage(self, call_type: str, model_name: str, response, input_estimate: int, latency: float):
+        """Record a call's token counts from the response usage metadata, or estimated when it has none"""
+        usage = getattr(response, 'usage_metadata', None)
+        input_tokens = getattr(usage, 'prompt_token_count', None)
+        output_tokens = getattr(usage, 'candidates_token_count', None)
+        estimated = input_tokens is None or output_tokens is None
+        if estimated:
+            input_tokens = input_estimate
+            output_tokens = self._estimate_tokens(getattr(response, 'text', '') or '')
+        self.usage.record(call_type, model_name, input_tokens, output_tokens, latency, estimated=estimated)
+    
+    def _usage_platform(self, platforms) -> str:
+        """Platform a run's Gemini usage is attributed to ('mixed' for multi-platform input)"""
+        platforms = set(platforms)
+        if len(platforms) == 1:
+            return platforms.pop()
+        return 'mixed' if platforms else 'unknown'
+    
+    def _call_model(self, model, prompt: str):
+        """Call a model endpoint, requesting JSON output when structured mode is on"""
+        if self.structured_output:
+            try:
+                return model.generate_content(prompt, generation_config=JSON_GENERATION_CONFIG)
+            except (TypeError, ValueError, KeyError) as e:
+                if 'response_mime_type' not in str(e) and not isinstance(e, TypeError):
+                    raise
+                # Older SDKs do not know response_mime_type - fall back to prompt-only JSON
+                logging.warning(f"Structured output not supported by the Gemini SDK, disabling it: {e}")
+                self.structured_output = False
+        
+        return model.generate_content(prompt)
+    
+    def _generate_json(self, prompt: str, result_type: type, expected_output_tokens: int = 256,
+                       tier: str = 'extract', retries: int = None, call_type: str = 'intent'):
+        """Generate and parse a typed JSON result, re-asking when the reply cannot be parsed"""
+        retries = self.parse_retries if retries is None else retries
+        attempt = 0
+        
+        while True:
+            response = self._generate(prompt, expected_output_tokens, tier, call_type)
+            try:
+                return self.parser.parse(response.text, result_type)
+            except ResponseParseError as e:
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                self.parser.record_retry()
+                logging.warning(f"Unparseable Gemini reply, asking again ({attempt}/{retries}): {e}")
+    
+    def _generate_json_list(self, prompt: str, result_type: type, expected_output_tokens: int = 256,
+                            tier: str = 'extract', call_type: str = 'intent') -> List:
+        """Generate and parse a batch reply (unparseable batches fall back to per-post calls)"""
+        response = self._generate(prompt, expected_output_tokens, tier, call_type)
+        return self.parser.parse_list(response.text, result_type)
+    
+    def _is_transient_failure(self, error: Exception) -> bool:
+        """Check whether a failure means the item should be kept for later (Gemini down or unreachable)"""
+        # A reply still unparseable after the parse retries is permanent for that item, not an outage
+        return isinstance(error, CircuitOpenError) or self.retry_policy.is_retryable(error)
+    
+    def get_circuit_status(self) -> Dict:
+        """Get circuit breaker state and parked (and dead-lettered) item counts"""
+        status = self.circuit_breaker.get_status()
+        status['parked_items'] = self.parked.count()
+        status['dead_lettered_items'] = self.parked.count(dead_lettered=True)
+        return status
+    
+    def reprocess_parked(self, limit: int = 500) -> Dict:
+        """Analyze posts and comments that were parked during a Gemini outage"""
+        # Leads for items that already got a degraded lead carry replaces_provisional_id; degraded
+        # leads whose post turned out not to be a lead are listed as retracted
+        result = {'leads': [], 'retracted_provisional_ids': []}
+        if not self.circuit_breaker.allows_calls():
+            logging.info("Gemini circuit still open, leaving parked items for later")
+            return result
+        
+        posts = self.parked.drain('post', limit)
+        comments = self.parked.drain('comment', limit)
+        if not posts and not comments:
+            return result
+        
+        logging.info(f"Reprocessing {len(posts)} parked posts and {len(comments)} parked comments")
+        result['leads'] = self.analyze_posts_for_leads(posts) + self.analyze_comments_for_leads(comments)
+        
+        provisional = {item['provisional_id'] for item in posts + comments if item.get('provisional_id')}
+        confirmed = {lead.get('replaces_provisional_id') for lead in result['leads']}
+        # Items parked again (Gemini failed once more) keep their degraded lead for now
+        undecided = provisional - confirmed
+        result['retracted_provisional_ids'] = sorted(undecided - self.parked.parked_provisional_ids(undecided))
+        return result
+    
+    def get_stats(self) -> Dict:
+        """Get Gemini service statistics"""
+        return {
+            'model': self.model_name,
+            'backend': self.backend.get_stats(),
+            'cascade': self.cascade.get_stats(
+                rules_threshold=self.prefilter.min_score,
+                classifier_threshold=self.classifier.gate_threshold if self.classifier.available else None
+            ),
+            'classifier': self.classifier.get_stats(),
+            'cache': self.cache.get_stats(),
+            'single_flight': self.single_flight.get_stats(),
+            'concurrency': self.executor.get_stats(),
+            'rate_limiter': self.rate_limiter.get_stats(),
+            'retries': self.retry_policy.get_stats(),
+            'circuit': self.get_circuit_status(),
+            'parser': dict(self.parser.get_stats(), structured_output=self.structured_output),
+            'prompts': self.prompts.get_stats(),
+            'usage': self.usage.get_report(),
+            'prefilter': self.prefilter.get_report(),
+            'lead_parser': self.lead_parser.get_stats(),
+            'near_duplicates': self.near_duplicates.get_stats()
+        }
+    
+    def set_scan(self, scan_id: str):
+        """Attribute this request's Gemini usage to a scheduler scan (None for manual requests)"""
+        set_scan(scan_id)
+    
+    def get_usage(self, scan_id: str = None) -> Dict:
+        """Token and cost rollups, or one scan's totals"""
+        if scan_id:
+            return self.usage.scan_summary(scan_id)
+        return self.usage.get_report()
+    
+    def _analyze_candidate(self, candidate: Tuple, raw_analysis: Dict = None, item_kind: str = 'post',
+                           meta: Dict = None) -> Dict:
+        """Qualify one post and build its lead record (None if not a lead)"""
+        key, content, item = candidate
+        meta = meta or {}
+        
         try:
-            prompt = f"""
-            You are a real estate lead qualification expert. Analyze this social media content for lead intent:
+            if raw_analysis is None:
+                # Unbatched, or missing/malformed in the batch response - analyze on its own
+                raw_analysis = self._request_lead_intent(content)
+            lead_analysis = self._qualify_lead(raw_analysis) if raw_analysis else None
+        except ResponseParseError as e:
+            # Gemini answered, just never parseably: asking again later will not help, so keep the local verdict
+            logging.warning(f"Unparseable lead analysis, using the local classifier instead: {e}")
+            return None if item.get('provisional_id') else self._degraded_lead(content, item, provisional=False)
+        except Exception as e:
+            if not self._is_transient_failure(e):
+                raise
+            # Gemini unavailable - keep the post for a later run instead of dropping it; a post
+            # parked again after reprocessing already has its degraded lead out
+            degraded = None if item.get('provisional_id') else self._degraded_lead(content, item, meta.get('doc_id'))
+            provisional_id = item.get('provisional_id') or (degraded or {}).get('provisional_id')
+            self.parked.park(item, item_kind, str(e), provisional_id)
+            return degraded
+        
+        is_lead = bool(lead_analysis and lead_analysis.get('is_lead', False))
+        # A verdict of the local classifier is no LLM decision to grade the filter against
+        if not (raw_analysis and raw_analysis.get('exit_tier') == 'classifier'):
+            self.prefilter.record_outcome(meta.get('passed_filter', True), is_lead)
+        if raw_analysis and 'exit_tier' not in raw_analysis:
+            self.cascade.record('extract', exited=not is_lead)
+            self.prompts.record_outcome(
+                'intent', self.prompts.version_for('intent', content), 'lead' if is_lead else 'not_lead'
+            )
+        
+        duplicate_of = meta.get('duplicate_of')
+        if not duplicate_of and meta.get('doc_id') and raw_analysis and 'exit_tier' not in raw_analysis:
+            # Point the index at the cached analysis so later copies of this post can reuse it
+            self.near_duplicates.add(
+                meta['doc_id'], content, self._post_reference_url(item), analysis_ref=self._analysis_ref(content)
+            )
+        
+        if not is_lead:
+            return None
+        
+        lead_data = self._extract_lead_info(content, item, lead_analysis)
+        if lead_data and item.get('provisional_id'):
+            # Reprocessed parked post: this lead supersedes the degraded one emitted earlier
+            lead_data['replaces_provisional_id'] = item['provisional_id']
+        if lead_data and duplicate_of:
+            lead_data['duplicate_of'] = duplicate_of.get('url') or duplicate_of['id']
+            lead_data['canonical_post_id'] = duplicate_of['id']
+        return lead_data
+    
+    def _degraded_lead(self, content: str, item: Dict, doc_id: str = None, provisional: bool = True) -> Dict:
+        """Lead record from the local classifier while Gemini is unavailable (provisional while the post is parked)"""
+        if not (self.classifier.available and self.classifier.fallback_enabled):
+            return None
+        
+        analysis = self.classifier.predict_batch([content])[0]
+        analysis['contact'] = {}
+        analysis['contact_available'] = self.contact_extractor.has_contact(self.contact_extractor.extract(content))
+        lead_analysis = self._qualify_lead(analysis)
+        if not (lead_analysis and lead_analysis.get('is_lead')):
+            return None
+        
+        self.classifier.record_fallback()
+        lead_data = self._extract_lead_info(content, item, lead_analysis)
+        if lead_data:
+            lead_data['analysis_source'] = 'local_classifier'
+        if lead_data and provisional:
+            # Links the reprocessed lead (or its retraction) back to this one
+            lead_data['provisional_id'] = doc_id or self._document_id(item, content)
+        return lead_data
+    
+    def _intent_kind(self) -> str:
+        """Cache kind of the intent analysis for the current mode"""
+        return 'intent_contact' if self.combined_analysis else 'intent'
+    
+    def _model_name_for(self, kind: str) -> str:
+        """Name of the model that answers a prompt kind"""
+        return self.cascade.screen_model if kind == 'screen' else self.model_name
+    
+    def _prompt_family(self, kind: str) -> str:
+        """Prompt template family behind a cache kind"""
+        return 'intent' if kind == 'intent_contact' else kind
+    
+    def _prompt_version(self, kind: str, content: str) -> str:
+        """Template version that handles this content"""
+        return self.prompts.version_for(self._prompt_family(kind), content)
+    
+    def _cache_get(self, kind: str, content: str):
+        """Look up a cached analysis for this prompt version and model"""
+        return self.cache.get(kind, content, self._prompt_version(kind, content), self._model_name_for(kind))
+    
+    def _cache_set(self, kind: str, content: str, result):
+        """Store an analysis for this prompt version and model"""
+        self.cache.set(kind, content, self._prompt_version(kind, content), self._model_name_for(kind), result)
+    
+    def _flight_key(self, kind: str, content: str) -> str:
+        """Single-flight key: content hash and prompt version, same as the cache key"""
+        return AnalysisCache.make_key(kind, content, self._prompt_version(kind, content), self._model_name_for(kind))
+    
+    def _analysis_ref(self, content: str) -> Dict:
+        """Where a post's intent analysis is cached, for the near-duplicate index"""
+        kind = self._intent_kind()
+        return {
+            'kind': kind,
+            'cache_key': self._flight_key(kind, content),
+            'prompt_version': self._prompt_version(kind, content),
+            'model': self._model_name_for(kind)
+        }
+    
+    def _canonical_analysis(self, kind: str, content: str, canonical: Dict = None):
+        """Cached analysis of the post a near-duplicate copies (None once expired, invalidated or purged)"""
+        ref = (canonical or {}).get('analysis_ref')
+        if not ref or ref.get('kind') != kind:
+            return None
+        # Reuse only what this copy would have been analyzed with (A/B prompt routing, current model)
+        if ref.get('prompt_version') != self._prompt_version(kind, content) or ref.get('model') != self._model_name_for(kind):
+            return None
+        return self.cache.get_by_key(ref['cache_key'])
+    
+    def _coalesced(self, kind: str, content: str, compute):
+        """Return the cached analysis, or compute it once for all concurrent callers"""
+        def run():
+            cached = self._cache_get(kind, content)
+            if cached is not None:
+                return cached
+            return compute()
+        
+        return self.single_flight.do(self._flight_key(kind, content), run)
+    
+    def get_cache_stats(self) -> Dict:
+        """Get analysis cache statistics"""
+        return self.cache.get_stats()
+    
+    def invalidate_cache(self, kind: str = None) -> int:
+        """Invalidate cached analyses (all, or one prompt kind)"""
+        return self.cache.invalidate(kind)
+    
+    def _get_item_content(self, item: Dict) -> str:
+        """Extract the text content of a post or comment"""
+        return item.get('caption', '') or item.get('text', '') or item.get('message', '') or item.get('content', '')
+    
+    def _batch_key(self, item: Dict, index: int) -> str:
+        """Build the id a post is referred to by inside a batch prompt"""
+        item_id = item.get('id') or item.get('shortcode') or item.get('comment_id')
+        return f"{index}_{item_id}" if item_id else str(index)
+    
+    def _estimate_tokens(self, text: str) -> int:
+        """Rough token estimate (~4 bytes of UTF-8 per token)"""
+        return estimate_tokens(text)
+    
+    def _make_batches(self, candidates: List[Tuple], batch_size: int, family: str = 'intent') -> List[List[Tuple]]:
+        """Split candidates into batches bounded by size and token budget (one prompt version per batch)"""
+        if batch_size <= 1:
+            return [[candidate] for candidate in candidates]
+        
+        tier = 'screen' if family == 'screen' else 'extract'
+        groups = {}
+        for candidate in candidates:
+            groups.setdefault(self.prompts.version_for(family, candidate[1]), []).append(candidate)
+        
+        batches = []
+        for group in groups.values():
+            current = []
+            current_tokens = 0
             
-            Content: "{content}"
+            for candidate in group:
+                # Content is truncated to the tier budget when the prompt is rendered
+                tokens = min(self._estimate_tokens(candidate[1]), self.prompts.budgets[tier])
+                if current and (len(current) >= batch_size or current_tokens + tokens > self.batch_token_budget):
+                    batches.append(current)
+                    current = []
+                    current_tokens = 0
+                current.append(candidate)
+                current_tokens += tokens
             
-            PRIORITY: Focus on HIGH-INTENT leads with direct contact information or clear buying signals.
+            if current:
+                batches.append(current)
+        
+        return batches
+    
+    def _screen_candidates(self, candidates: List[Tuple], batch_size: int) -> Dict[str, Dict]:
+        """Run the cheap screen tier, returning verdicts keyed by post id (missing = escalate)"""
+        verdicts = {}
+        uncached = []
+        for candidate in candidates:
+            cached = self._cache_get('screen', candidate[1])
+            if cached is not None:
+                verdicts[candidate[0]] = cached
+            else:
+                uncached.append(candidate)
+        
+        # Posts another request is already screening are waited for, not screened twice
+        claimed = []
+        claims = {}
+        joined = {}
+        for candidate in uncached:
+            flight_key = self._flight_key('screen', candidate[1])
+            future, leader = self.single_flight.claim(flight_key)
+            if leader:
+                claims[candidate[0]] = flight_key
+                claimed.append(candidate)
+            else:
+                joined[candidate[0]] = future
+        
+        try:
+            batches = self._make_batches(claimed, batch_size, 'screen')
+            for batch_verdicts in self.executor.map(self._screen_batch, batches, label='screen batch'):
+                if batch_verdicts:
+                    verdicts.update(batch_verdicts)
+        finally:
+            for key, flight_key in claims.items():
+                if key in verdicts:
+                    self.single_flight.resolve(flight_key, verdicts[key])
+                else:
+                    self.single_flight.release(flight_key)
+        
+        for key, future in joined.items():
+            try:
+                verdict = self.single_flight.join(future)
+            except Exception:
+                verdict = None
+            if isinstance(verdict, dict):
+                verdicts[key] = verdict
+        
+        return verdicts
+    
+    def _screen_batch(self, batch: List[Tuple]) -> Dict[str, Dict]:
+        """Ask the screen model whether each post is a property lead at all"""
+        try:
+            version = self.prompts.version_for('screen', batch[0][1])
+            posts_json = json.dumps(
+                [{'id': key, 'content': self.prompts.fit(content, 'screen')} for key, content, _ in batch],
+                ensure_ascii=False
+            )
+            prompt = self.prompts.render('screen', 'batch', version, posts_json=posts_json)
             
-            Determine:
-            1. Is this person actively looking for property? (Yes/No)
-            2. What type of property? (1BHK, 2BHK, 3BHK, Villa, Commercial, etc.)
-            3. Location preference? (Gurgaon, Delhi, Mumbai, etc.)
-            4. Budget range? (if mentioned)
-            5. Timeline? (urgent, within month, etc.)
-            6. Contact information? (phone, email, WhatsApp if visible)
-            7. Lead score (1-10, where 10 is highest intent - PRIORITIZE contacts with phone/email)
-            8. Language used (Hindi/English/Both)
-            9. Buying intent level (High/Medium/Low)
-            10. Contact method mentioned (Call, DM, WhatsApp, Email)
+            items = self._generate_json_list(prompt, ScreenResult, 25 * len(batch), tier='screen', call_type='screen')
             
-            IMPORTANT: Only mark as lead if:
-            - Direct contact info is present (phone/email)
-            - Clear buying intent ("looking for", "need", "want to buy")
-            - Specific requirements mentioned
-            - Timeline is mentioned ("urgent", "immediately", "this month")
+            verdicts = {}
+            contents = {key: content for key, content, _ in batch}
+            for item in items:
+                if item.id in contents:
+                    verdict = {'is_lead': item.is_lead, 'confidence': item.confidence}
+                    verdicts[item.id] = verdict
+                    self._cache_set('screen', contents[item.id], verdict)
             
-            Respond in JSON format:
-            {{
-                "is_lead": true/false,
-                "property_type": "2BHK",
-                "location": "Gurgaon",
-                "budget_range": "50L-70L",
-                "timeline": "within_month",
-                "contact_available": true/false,
-                "contact_method": "phone/email/whatsapp/dm",
-                "buying_intent": "High/Medium/Low",
-                "lead_score": 8,
-                "language": "English",
-                "confidence": 0.85
-            }}
-            """
+            return verdicts
+        
+        except Exception as e:
+            # Fail open - unscreened posts go on to full extraction
+            logging.error(f"Error in lead screen: {e}")
+            return {}
+    
+    def _analyze_batch_intent(self, batch: List[Tuple]) -> Dict[str, Dict]:
+        """Analyze several posts in one prompt, returning raw analyses keyed by post id"""
+        try:
+            version = self.prompts.version_for('intent', batch[0][1])
+            posts_json = json.dumps(
+                [{'id': key, 'content': self.prompts.fit(content, 'extract')} for key, content, _ in batch],
+                ensure_ascii=False
+            )
+            contact_instructions, contact_fields = self._contact_prompt_section(version)
+            prompt = self.prompts.render(
+                'intent', 'batch', version,
+                posts_json=posts_json, contact_instructions=contact_instructions, contact_fields=contact_fields
+            )
             
-            response = self.model.generate_content(prompt)
-            result = self._parse_gemini_response(response.text)
+            items = self._generate_json_list(prompt, LeadIntentResult, 200 * len(batch))
+            results = {item.id: item.to_dict() for item in items if item.id}
             
-            # Validate result - prioritize leads with contact info
-            is_lead = result.get('is_lead', False)
-            lead_score = result.get('lead_score', 0)
-            contact_available = result.get('contact_available', False)
-            buying_intent = result.get('buying_intent', 'Low')
+            kind = self._intent_kind()
+            for key, content, _ in batch:
+                if key in results:
+                    self._cache_set(kind, content, results[key])
             
-            # Higher priority for leads with contact info
-            if is_lead and contact_available and lead_score >= 6:
-                return result
-            elif is_lead and buying_intent == 'High' and lead_score >= 7:
-                return result
-            elif is_lead and lead_score >= 8:
-                return result
-            else:
-                return None
-                
+            missing = len(batch) - len([key for key, _, _ in batch if key in results])
+            if missing:
+                logging.warning(f"Batch analysis missing {missing}/{len(batch)} posts, retrying them individually")
+            
+            return results
+        
         except Exception as e:
+            logging.error(f"Error in batch lead intent analysis: {e}")
+            return {}
+    
+    def _analyze_lead_intent(self, content: str, source_data: Dict) -> Dict:
+        """Analyze content for lead intent using Gemini Pro (None unless it qualifies as a lead)"""
+        result = self._request_lead_intent(content)
+        return self._qualify_lead(result) if result else None
+    
+    def _request_lead_intent(self, content: str) -> Dict:
+        """Raw intent analysis (and contact details in combined mode), cached by content"""
+        try:
+            kind = self._intent_kind()
+            return self._coalesced(kind, content, lambda: self._fetch_lead_intent(kind, content))
+        
+        except Exception as e:
+            if self._is_transient_failure(e) or isinstance(e, ResponseParseError):
+                raise
             logging.error(f"Error in lead intent analysis: {e}")
             return None
     
+    def _fetch_lead_intent(self, kind: str, content: str) -> Dict:
+        """Ask Gemini for the intent analysis of one post"""
+        version = self.prompts.version_for('intent', content)
+        contact_instructions, contact_fields = self._contact_prompt_section(version)
+        prompt = self.prompts.render(
+            'intent', 'single', version,
+            content=self.prompts.fit(content, 'extract'),
+            contact_instructions=contact_instructions,
+            contact_fields=contact_fields
+        )
+        
+        result = self._generate_json(prompt, LeadIntentResult).to_dict()
+        self._cache_set(kind, content, result)
+        
+        return result
+    
+    def _contact_prompt_section(self, version: str = None) -> Tuple[str, str]:
+        """Extra instructions and JSON fields that fold contact extraction into the intent prompt"""
+        if not self.combined_analysis:
+            return '', ''
+        
+        instructions = self.prompts.fragment('intent', 'contact_instructions', version)
+        fields = ',\n' + self.prompts.fragment('intent', 'contact_fields', version)
+        return instructions, fields
+    
+    def _qualify_lead(self, result: Dict) -> Dict:
+        """Validate an intent analysis - prioritize leads with contact info"""
+        if not self.cascade.extract_accepts(result):
+            return None
+        
+        is_lead = result.get('is_lead', False)
+        lead_score = result.get('lead_score', 0) or 0
+        contact_available = result.get('contact_available', False)
+        buying_intent = result.get('buying_intent', 'Low')
+        
+        # Higher priority for leads with contact info
+        if is_lead and contact_available and lead_score >= 6:
+            return result
+        elif is_lead and buying_intent == 'High' and lead_score >= 7:
+            return result
+        elif is_lead and lead_score >= 8:
+            return result
+        else:
+            return None
+    
     def _extract_lead_info(self, content: str, source_data: Dict, analysis: Dict) -> Dict:
         """Extract structured lead information"""
         try:
-            # Extract contact information
-            contact_info = self._extract_contact_info(content)
+            contact_info = analysis.get('contact')
+            if isinstance(contact_info, dict):
+                # Combined analysis already carries the contact fields; local regex matches take precedence
+                contact_info = self.contact_extractor.merge(self.contact_extractor.extract(content), contact_info)
+            else:
+                # Two-call mode (or the model omitted the contact block)
+                contact_info = self._extract_contact_info(content)
             
             # Determine source platform
             platform = self._determine_platform(source_data)
             
+            # Locally parsed fields win over the model's free-form strings when they match confidently
+            parsed = self.lead_parser.parse(content)
+            
             # Create lead data
             lead_data = {
-                'name': contact_info.get('name', 'Unknown'),
+                'name': contact_info.get('name') or 'Unknown',
                 'phone': contact_info.get('phone', ''),
                 'email': contact_info.get('email', ''),
                 'whatsapp': contact_info.get('whatsapp', ''),
                 'social_handle': contact_info.get('social_handle', ''),
                 'contact_phrase': contact_info.get('contact_phrase', ''),
-                'requirement': analysis.get('property_type', ''),
-                'location': analysis.get('location', ''),
-                'budget': analysis.get('budget_range', ''),
+                'requirement': parsed.get('property_type') or analysis.get('property_type', ''),
+                'property_category': parsed.get('property_category', ''),
+                'bhk': parsed.get('bhk'),
+                'location': parsed.get('location') or analysis.get('location', ''),
+                'sector': parsed.get('sector', ''),
+                'project': parsed.get('project', ''),
+                'budget': parsed.get('budget_range') or analysis.get('budget_range', ''),
+                'budget_min': parsed.get('budget_min'),
+                'budget_max': parsed.get('budget_max'),
+                'budget_period': parsed.get('budget_period', ''),
                 'timeline': analysis.get('timeline', ''),
                 'contact_method': analysis.get('contact_method', ''),
                 'buying_intent': analysis.get('buying_intent', 'Medium'),
@@ -178,6 +877,7 @@ class GeminiService:
                 'original_content': content,
                 'post_url': self._generate_post_url(source_data, platform),
                 'social_media_url': source_data.get('url', ''),
+                'hashtags': source_data.get('hashtags', []),
                 'username': source_data.get('username', ''),
                 'language': analysis.get('language', 'English'),
                 'confidence': analysis.get('confidence', 0.5),
@@ -187,57 +887,40 @@ class GeminiService:
             }
             
             return lead_data
-            
+        
         except Exception as e:
             logging.error(f"Error extracting lead info: {e}")
             return None
     
     def _extract_contact_info(self, content: str) -> Dict:
-        """Extract contact information from content"""
+        """Extract contact information from content (local regex first, Gemini only as a fallback)"""
+        local_contact = self.contact_extractor.extract(content)
+        
+        # Only ask the model when nothing was found but the text talks about contacting
+        if self.contact_extractor.has_contact(local_contact) or not self.contact_extractor.has_contact_intent(content):
+            return local_contact
+        
         try:
-            prompt = f"""
-            Extract ALL possible contact information from this text:
-            
-            "{content}"
-            
-            AGGRESSIVELY search for:
-            1. Name (any name mentioned)
-            2. Phone number (any format: 9876543210, +91-9876543210, 98765-43210, etc.)
-            3. Email address (any format)
-            4. WhatsApp number (any format)
-            5. Social media handles (@username)
-            6. Contact phrases ("call me", "DM me", "contact me", "reach out")
-            
-            IMPORTANT: 
-            - Look for Indian phone numbers (starting with 6,7,8,9)
-            - Look for email patterns (contains @ and .)
-            - Look for WhatsApp mentions
-            - Extract even partial contact info
-            
-            Respond in JSON format:
-            {{
-                "name": "extracted name or null",
-                "phone": "extracted phone or null", 
-                "email": "extracted email or null",
-                "whatsapp": "extracted whatsapp or null",
-                "social_handle": "extracted social handle or null",
-                "contact_phrase": "extracted contact phrase or null"
-            }}
-            """
-            
-            response = self.model.generate_content(prompt)
-            return self._parse_gemini_response(response.text)
-            
+            result = self._coalesced('contact', content, lambda: self._fetch_contact_info(content))
+            return self.contact_extractor.merge(local_contact, result)
+        
         except Exception as e:
             logging.error(f"Error extracting contact info: {e}")
-            return {
-                'name': None, 
-                'phone': None, 
-                'email': None,
-                'whatsapp': None,
-                'social_handle': None,
-                'contact_phrase': None
-            }
+            return local_contact
+    
+    def _fetch_contact_info(self, content: str) -> Dict:
+        """Ask Gemini for the contact details in one text"""
+        prompt = self.prompts.render(
+            'contact', 'single', self.prompts.version_for('contact', content),
+            content=self.prompts.fit(content, 'extract')
+        )
+        
+        result = self._generate_json(prompt, ContactResult, call_type='contact').to_dict()
+        
+        if 'phone' in result or 'email' in result:
+            self._cache_set('contact', content, result)
+        
+        return result
     
     def _determine_platform(self, source_data: Dict) -> str:
         """Determine the source platform"""
@@ -250,88 +933,132 @@ class GeminiService:
         else:
             return 'unknown'
     
-    def analyze_lead_quality(self, leads: List[Dict]) -> List[Dict]:
+    def analyze_lead_quality(self, leads: List[Dict], batch_size: int = None) -> List[Dict]:
         """Analyze lead quality and provide scoring"""
-        analyzed_leads = []
+        analyzed = []
+        for chunk in self.iter_lead_quality(leads, batch_size=batch_size):
+            analyzed.extend(chunk)
+        return analyzed
+    
+    def iter_lead_quality(self, leads: List[Dict], batch_size: int = None, chunk_size: int = None):
+        """Score leads chunk by chunk, yielding each chunk's analyzed leads as soon as it is done"""
+        batch_size = batch_size or self.quality_batch_size
+        chunk_size = chunk_size or self.quality_chunk_size
         
-        for lead in leads:
-            try:
-                prompt = f"""
-                Analyze this lead data for quality and priority:
-                
-                Lead Data: {json.dumps(lead, indent=2)}
-                
-                Provide:
-                1. Quality score (1-10)
-                2. Priority level (High/Medium/Low)
-                3. Recommended next action
-                4. Risk factors
-                5. Opportunity assessment
-                
-                Respond in JSON format:
-                {{
-                    "quality_score": 8,
-                    "priority": "High",
-                    "recommended_action": "Call immediately",
-                    "risk_factors": ["No phone number"],
-                    "opportunity_assessment": "Strong intent, ready to buy",
-                    "follow_up_suggestion": "Send property recommendations"
-                }}
-                """
-                
-                response = self.model.generate_content(prompt)
-                analysis = self._parse_gemini_response(response.text)
-                
-                # Add analysis to lead
-                lead_with_analysis = lead.copy()
-                lead_with_analysis.update(analysis)
-                analyzed_leads.append(lead_with_analysis)
-                
-            except Exception as e:
-                logging.error(f"Error analyzing lead quality: {e}")
-                analyzed_leads.append(lead)
+        platform = self._usage_platform(str(lead.get('source', 'unknown')).lower() for lead in leads)
+        for start in range(0, len(leads), chunk_size):
+            with usage_context(platform=platform):
+                chunk = self._analyze_quality_chunk(leads[start:start + chunk_size], batch_size)
+            yield chunk
+    
+    def _analyze_quality_chunk(self, leads: List[Dict], batch_size: int) -> List[Dict]:
+        """Score one chunk of leads: cached first, then batched prompts, then single calls for leftovers"""
+        compact = [self._compact_lead(lead) for lead in leads]
+        analyses = {}
+        pending = []
+        for index, projection in enumerate(compact):
+            cached = self._cache_get('quality', self._lead_cache_content(projection))
+            if cached is not None:
+                analyses[index] = cached
+            else:
+                pending.append(index)
         
-        return analyzed_leads
+        # One prompt version per batch
+        groups = {}
+        for index in pending:
+            version = self.prompts.version_for('quality', self._lead_cache_content(compact[index]))
+            groups.setdefault(version, []).append(index)
+        batches = [group[i:i + batch_size] for group in groups.values() for i in range(0, len(group), batch_size)]
+        work = [[(index, compact[index]) for index in batch] for batch in batches if len(batch) > 1]
+        for batch_results in self.executor.map(self._analyze_quality_batch, work, label='lead quality batch'):
+            if batch_results:
+                analyses.update(batch_results)
+        
+        # Unbatched, or missing from the batch reply - score on their own
+        leftovers = [index for index in pending if index not in analyses]
+        single_results = self.executor.map(
+            lambda index: self._coalesced(
+                'quality', self._lead_cache_content(compact[index]), lambda: self._fetch_lead_quality(compact[index])
+            ),
+            leftovers,
+            label='lead quality'
+        )
+        for index, analysis in zip(leftovers, single_results):
+            if analysis is not None:
+                analyses[index] = analysis
+        
+        # A failed analysis keeps the original lead
+        results = []
+        for index, lead in enumerate(leads):
+            lead_with_analysis = lead.copy()
+            lead_with_analysis.update(analyses.get(index) or {})
+            results.append(lead_with_analysis)
+        return results
+    
+    def _analyze_single_lead_quality(self, lead: Dict) -> Dict:
+        """Score one lead's quality and priority"""
+        return self._analyze_quality_chunk([lead], batch_size=1)[0]
     
-    def _parse_gemini_response(self, response_text: str) -> dict:
-        """Parse Gemini response to extract structured data"""
+    def _analyze_quality_batch(self, batch: List[Tuple]) -> Dict[int, Dict]:
+        """Score several leads in one prompt, returning analyses keyed by position in the chunk"""
         try:
-            import re
+            leads_json = json.dumps(
+                [dict(projection, id=str(index)) for index, projection in batch],
+                ensure_ascii=False,
+                separators=(',', ':')
+            )
+            version = self.prompts.version_for('quality', self._lead_cache_content(batch[0][1]))
+            prompt = self.prompts.render('quality', 'batch', version, leads_json=leads_json)
             
-            # Clean the response text
-            cleaned_text = response_text.strip()
+            items = self._generate_json_list(prompt, LeadQualityResult, 120 * len(batch), call_type='quality')
             
-            # Try to extract JSON from markdown code blocks first
-            json_match = re.search(r'```json\s*(.*?)\s*```', cleaned_text, re.DOTALL)
-            if json_match:
-                try:
-                    return json.loads(json_match.group(1))
-                except json.JSONDecodeError:
-                    pass
+            projections = {str(index): (index, projection) for index, projection in batch}
+            results = {}
+            for item in items:
+                if item.id in projections:
+                    index, projection = projections[item.id]
+                    analysis = item.to_dict()
+                    analysis.pop('id', None)
+                    results[index] = analysis
+                    self._cache_set('quality', self._lead_cache_content(projection), analysis)
             
-            # Try to find JSON without markdown
-            json_match = re.search(r'\{.*\}', cleaned_text, re.DOTALL)
-            if json_match:
-                try:
-                    return json.loads(json_match.group(0))
-                except json.JSONDecodeError:
-                    pass
+            missing = len(batch) - len(results)
+            if missing:
+                logging.warning(f"Quality batch missing {missing}/{len(batch)} leads, scoring them individually")
             
-            # Try to parse the entire response as JSON
-            return json.loads(cleaned_text)
-            
-        except json.JSONDecodeError:
-            # Fallback: return basic structure based on content analysis
-            return {
-                "has_lead_intent": any(word in response_text.lower() for word in ["looking", "contact", "buy", "sell", "rent", "property", "apartment", "house"]),
-                "confidence": 0.5,
-                "extracted_info": {
-                    "property_type": "unknown",
-                    "location": "unknown", 
-                    "budget": "unknown",
-                    "contact": "unknown"
-                }
-            }
+            return results
+        
+        except Exception as e:
+            logging.error(f"Error in batch lead quality analysis: {e}")
+            return {}
+    
+    def _fetch_lead_quality(self, projection: Dict) -> Dict:
+        """Ask Gemini for the quality analysis of one lead"""
+        cache_content = self._lead_cache_content(projection)
+        prompt = self.prompts.render(
+            'quality', 'single', self.prompts.version_for('quality', cache_content),
+            lead_json=json.dumps(projection, ensure_ascii=False, separators=(',', ':'))
+        )
+        
+        analysis = self._generate_json(prompt, LeadQualityResult, call_type='quality').to_dict()
+        self._cache_set('quality', cache_content, analysis)
+        
+        return analysis
+    
+    def _compact_lead(self, lead: Dict) -> Dict:
+        """Whitelisted projection of a lead for quality prompts (contact details reduced to flags)"""
+        projection = {field: lead[field] for field in QUALITY_LEAD_FIELDS if lead.get(field) not in (None, '')}
+        for field in ('phone', 'email', 'whatsapp'):
+            projection[f'has_{field}'] = bool(lead.get(field))
+        return projection
+    
+    def _lead_cache_content(self, projection: Dict) -> str:
+        """Stable serialization of a lead projection for cache keys"""
+        return json.dumps(projection, sort_keys=True, ensure_ascii=False, default=str)
+    
+    def _parse_gemini_response(self, response_text: str, result_type: type = LeadIntentResult) -> dict:
+        """Parse a Gemini reply into a validated dict (raises ResponseParseError instead of guessing)"""
+        return self.parser.parse(response_text, result_type).to_dict()
     
     def _generate_post_url(self, source_data: Dict, platform: str) -> str:
         """Generate direct URL to the social media post"""
@@ -340,7 +1067,7 @@ class GeminiService:
                 shortcode = source_data.get('shortcode', '')
                 if shortcode:
                     return f"https://www.instagram.com/p/{shortcode}/"
-                
+            
             elif platform.lower() == 'facebook':
                 post_id = source_data.get('post_id', '')
                 group_id = source_data.get('group_id', '')
@@ -348,7 +1075,7 @@ class GeminiService:
                     return f"https://www.facebook.com/groups/{group_id}/posts/{post_id}/"
                 elif post_id:
                     return f"https://www.facebook.com/posts/{post_id}/"
-                    
+            
             elif platform.lower() == 'youtube':
                 video_id = source_data.get('video_id', '')
                 comment_id = source_data.get('comment_id', '')
@@ -359,7 +1086,7 @@ class GeminiService:
             
             # Fallback to original URL
             return source_data.get('url', '')
-            
+        
         except Exception as e:
             logging.error(f"Error generating post URL: {e}")
             return source_data.get('url', '')
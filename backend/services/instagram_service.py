@@ -4,12 +4,14 @@ Handles Instagram post scraping using Instaloader
 """
 
 import instaloader
-import time
-import random
 import logging
-from typing import List, Dict
+from typing import AsyncIterator, Iterator, List, Dict
 import os
 
+from services.rate_governor import get_governor
+from services.scrape_state import ScrapeStateStore
+from services.streaming import CancelToken, aiterate, normalize_item
+
 class InstagramService:
     def __init__(self):
         """Initialize Instagram scraper"""
@@ -30,28 +32,66 @@ class InstagramService:
             except Exception as e:
                 logging.warning(f"Instagram login failed: {e}")
         
+        # Seen-set and per-hashtag high-water marks: runs only fetch posts newer than the last scan
+        self.state = ScrapeStateStore()
+        self.incremental = os.getenv('INSTAGRAM_INCREMENTAL', 'True').lower() == 'true'
+        # Shared adaptive pacing: backs off when Instagram throttles, speeds up while it doesn't
+        self.governor = get_governor('instagram')
+        
         logging.info("Instagram Service initialized")
     
-    def scrape_hashtags(self, hashtags: List[str]) -> List[Dict]:
-        """Scrape Instagram posts from hashtags"""
-        all_posts = []
+    def scrape_hashtags(self, hashtags: List[str], incremental: bool = None) -> List[Dict]:
+        """Scrape Instagram posts from hashtags (only posts not seen before when incremental)"""
+        return list(self.iter_posts(hashtags, incremental=incremental))
+    
+    def iter_posts(self, hashtags: List[str], incremental: bool = None, max_posts: int = 50,
+                   cancel: CancelToken = None) -> Iterator[Dict]:
+        """Yield up to max_posts posts per hashtag as soon as each is fetched"""
+        if incremental is None:
+            incremental = self.incremental
+        # A post found under several hashtags is kept once, with every hashtag it matched
+        emitted = {}
+        duplicates_skipped = 0
         
-        for hashtag in hashtags:
+        for hashtag in dict.fromkeys(hashtags):
+            if cancel and cancel.cancelled:
+                break
+            cursor = None
             try:
                 logging.info(f"Scraping Instagram hashtag: #{hashtag}")
                 
-                # Get hashtag posts
+                # Get hashtag posts (the first page; every new post below is paced on its own)
+                self.governor.wait()
                 posts = self.loader.get_hashtag_posts(hashtag)
+                cursor = self.state.cursor('instagram', hashtag) if incremental else None
                 
                 count = 0
-                max_posts_per_hashtag = 50  # Limit to avoid rate limiting
+                fetched = 0
                 
                 for post in posts:
-                    if count >= max_posts_per_hashtag:
+                    fetched += 1
+                    if count >= max_posts or (cancel and cancel.cancelled):
                         break
                     
+                    if cursor:
+                        # Known posts cost no delay; a run of them means the rest of the feed is known too
+                        position = cursor.check(post.shortcode, post.date.timestamp())
+                        if position == cursor.STOP:
+                            break
+                        if position == cursor.SEEN:
+                            continue
+                    
+                    if post.shortcode in emitted:
+                        emitted[post.shortcode]['hashtags'].append(hashtag)
+                        duplicates_skipped += 1
+                        if cursor:
+                            cursor.add(post.shortcode, post.date.timestamp())
+                        continue
+                    
                     try:
-                        post_data = {
+                        # Reading a post's details can cost requests of its own, like fetching a comment page
+                        self.governor.wait()
+                        post_data = normalize_item({
                             'id': post.mediaid,
                             'shortcode': post.shortcode,
                             'caption': post.caption or '',
@@ -60,40 +100,60 @@ class InstagramService:
                             'date': post.date.isoformat(),
                             'url': f"https://instagram.com/p/{post.shortcode}/",
                             'hashtag': hashtag,
+                            'hashtags': [hashtag],
                             'username': post.owner_username,
                             'profile_url': f"https://instagram.com/{post.owner_username}/",
                             'is_video': post.is_video,
                             'video_view_count': post.video_view_count if post.is_video else 0,
                             'timestamp': post.date.timestamp()
-                        }
-                        
-                        all_posts.append(post_data)
-                        count += 1
-                        
-                        # Respectful delay to avoid rate limiting
-                        time.sleep(random.randint(2, 5))
-                        
+                        }, 'instagram', hashtag)
                     except Exception as e:
                         logging.error(f"Error processing post {post.shortcode}: {e}")
+                        self.governor.record_error(e)
+                        # An unreadable post is not retried, and must not hold the high-water mark back
+                        if cursor:
+                            cursor.add(post.shortcode)
                         continue
+                    
+                    self.governor.record_success()
+                    emitted[post.shortcode] = post_data
+                    count += 1
+                    yield post_data
+                    # Marked seen only once the consumer asks for more: a stopped stream rescans the last post
+                    if cursor:
+                        cursor.add(post.shortcode, post_data['timestamp'])
+                else:
+                    if cursor:
+                        cursor.end_of_feed()
                 
-                logging.info(f"Scraped {count} posts from #{hashtag}")
+                logging.info(f"Scraped {count} posts from #{hashtag}" + (f" ({cursor.summary()})" if cursor else ''))
                 
-                # Delay between hashtags
-                time.sleep(random.randint(5, 10))
+                if not fetched:
+                    self.governor.record_throttle('empty_page')
                 
             except Exception as e:
                 logging.error(f"Error scraping hashtag #{hashtag}: {e}")
+                self.governor.record_error(e)
                 continue
+            
+            finally:
+                # Posts already taken count as scraped even if the feed failed or the consumer stopped part-way
+                # (the high-water mark only advances once a walk gets back to it)
+                if cursor:
+                    cursor.commit()
         
-        logging.info(f"Total Instagram posts scraped: {len(all_posts)}")
-        return all_posts
+        logging.info(f"Total Instagram posts scraped: {len(emitted)} ({duplicates_skipped} cross-hashtag duplicates skipped)")
+    
+    def aiter_posts(self, hashtags: List[str], **kwargs) -> AsyncIterator[Dict]:
+        """Async variant of iter_posts"""
+        return aiterate(self.iter_posts, hashtags, **kwargs)
     
     def scrape_user_posts(self, username: str, max_posts: int = 20) -> List[Dict]:
         """Scrape posts from a specific user"""
         try:
             logging.info(f"Scraping posts from user: @{username}")
             
+            self.governor.wait()
             profile = instaloader.Profile.from_username(self.loader.context, username)
             posts = []
             
@@ -118,33 +178,50 @@ class InstagramService:
                 
                 posts.append(post_data)
                 count += 1
-                
-                time.sleep(random.randint(1, 3))
             
+            self.governor.record_success()
             logging.info(f"Scraped {len(posts)} posts from @{username}")
             return posts
             
         except Exception as e:
             logging.error(f"Error scraping user @{username}: {e}")
+            self.governor.record_error(e)
             return []
     
     def scrape_hashtag_comments(self, hashtag: str, max_posts: int = 10) -> List[Dict]:
         """Scrape comments from hashtag posts"""
+        return list(self.iter_hashtag_comments(hashtag, max_posts))
+    
+    def iter_hashtag_comments(self, hashtag: str, max_posts: int = 10, max_comments: int = None,
+                              cancel: CancelToken = None) -> Iterator[Dict]:
+        """Yield comments of a hashtag's posts (up to max_comments per post) as they are fetched"""
         try:
             logging.info(f"Scraping comments from hashtag: #{hashtag}")
             
+            self.governor.wait()
             posts = self.loader.get_hashtag_posts(hashtag)
-            all_comments = []
+            total = 0
             
             count = 0
             for post in posts:
-                if count >= max_posts:
+                if count >= max_posts or (cancel and cancel.cancelled):
                     break
                 
                 try:
-                    # Get comments for this post
-                    for comment in post.get_comments():
-                        comment_data = {
+                    # Every post's comments are a separate request
+                    self.governor.wait()
+                    comments = post.get_comments()
+                except Exception as e:
+                    logging.error(f"Error scraping comments from post {post.shortcode}: {e}")
+                    self.governor.record_error(e)
+                    continue
+                
+                post_comments = 0
+                try:
+                    for comment in comments:
+                        if (max_comments and post_comments >= max_comments) or (cancel and cancel.cancelled):
+                            break
+                        comment_data = normalize_item({
                             'id': comment.id,
                             'text': comment.text,
                             'username': comment.owner.username,
@@ -155,23 +232,29 @@ class InstagramService:
                             'post_caption': post.caption or '',
                             'hashtag': hashtag,
                             'timestamp': comment.created_at_utc.timestamp()
-                        }
+                        }, 'instagram', hashtag)
                         
-                        all_comments.append(comment_data)
+                        post_comments += 1
+                        yield comment_data
                     
                     count += 1
-                    time.sleep(random.randint(3, 6))
+                    total += post_comments
+                    self.governor.record_success()
                     
                 except Exception as e:
                     logging.error(f"Error scraping comments from post {post.shortcode}: {e}")
+                    self.governor.record_error(e)
                     continue
             
-            logging.info(f"Scraped {len(all_comments)} comments from #{hashtag}")
-            return all_comments
+            logging.info(f"Scraped {total} comments from #{hashtag}")
             
         except Exception as e:
             logging.error(f"Error scraping comments from hashtag #{hashtag}: {e}")
-            return []
+            self.governor.record_error(e)
+    
+    def aiter_hashtag_comments(self, hashtag: str, **kwargs) -> AsyncIterator[Dict]:
+        """Async variant of iter_hashtag_comments"""
+        return aiterate(self.iter_hashtag_comments, hashtag, **kwargs)
     
     def search_posts_by_keywords(self, keywords: List[str]) -> List[Dict]:
         """Search posts by keywords (limited functionality without API)"""
@@ -2,70 +2,249 @@
 Instagram Service - Fixed version without auto-login
 """
 
+import contextvars
 import logging
-from typing import List, Dict
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, List, Tuple
 import instaloader
-import time
+
+from services.instaloader_pool import InstaloaderPool
+from services.rate_governor import get_governor
+from services.scrape_state import ScrapeStateStore
+from services.streaming import CancelToken, aiterate, normalize_item
 
 class InstagramService:
     def __init__(self):
         """Initialize Instagram service"""
-        self.loader = None
+        # Long-lived loaders (sessions persisted to disk) shared by concurrent hashtag fetches
+        self.pool = InstaloaderPool()
+        self.concurrency = max(1, int(os.getenv('INSTAGRAM_HASHTAG_CONCURRENCY', 3)))
+        
+        # Seen-set and per-hashtag high-water marks: runs only fetch posts newer than the last scan
+        self.state = ScrapeStateStore()
+        self.incremental = os.getenv('INSTAGRAM_INCREMENTAL', 'True').lower() == 'true'
+        # Shared adaptive pacing: backs off when Instagram throttles, speeds up while it doesn't
+        self.governor = get_governor('instagram')
+        
         logging.info("Instagram Service initialized (no auto-login)")
     
-    def scrape_hashtags(self, hashtags: List[str], max_posts: int = 10) -> List[Dict]:
-        """Scrape Instagram posts by hashtags without login"""
+    def scrape_hashtags(self, hashtags: List[str], max_posts: int = 10, incremental: bool = None) -> List[Dict]:
+        """Scrape up to max_posts posts per hashtag without login (only posts not seen before when incremental)"""
+        posts = []
+        duplicates_skipped = 0
         try:
-            # Initialize loader without login
-            self.loader = instaloader.Instaloader()
-            
-            # Configure to avoid rate limiting
-            self.loader.context._session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
+            for hashtag, hashtag_posts, duplicates in self.iter_hashtags(hashtags, max_posts, incremental):
+                posts.extend(hashtag_posts)
+                duplicates_skipped += len(duplicates)
             
-            posts = []
+            logging.info(f"Scraped {len(posts)} posts from Instagram ({duplicates_skipped} cross-hashtag duplicates skipped)")
+            return posts
             
-            for hashtag in hashtags:
+        except Exception as e:
+            logging.error(f"Instagram scraping error: {e}")
+            return posts
+    
+    def iter_hashtags(self, hashtags: List[str], max_posts: int = 10,
+                      incremental: bool = None) -> Iterator[Tuple[str, List[Dict], List[str]]]:
+        """Fetch hashtags concurrently, yielding (hashtag, new posts, shortcodes already emitted) as each finishes"""
+        if incremental is None:
+            incremental = self.incremental
+        hashtags = list(dict.fromkeys(hashtags or []))
+        if not hashtags:
+            return
+        
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(hashtags)), thread_name_prefix='instagram-hashtag'
+        )
+        # Each worker runs in a copy of the caller's context so waits are attributed to its scan
+        futures = {
+            executor.submit(contextvars.copy_context().run, self._scrape_hashtag, hashtag, max_posts, incremental): hashtag
+            for hashtag in hashtags
+        }
+        # A post found under several hashtags is emitted once; its 'hashtags' list grows as later hashtags match it
+        emitted = {}
+        try:
+            for future in as_completed(futures):
+                hashtag = futures[future]
+                posts, duplicates = [], []
+                for post in future.result():
+                    first = emitted.get(post['shortcode'])
+                    if first is None:
+                        post['hashtags'] = [hashtag]
+                        emitted[post['shortcode']] = post
+                        posts.append(post)
+                    else:
+                        first['hashtags'].append(hashtag)
+                        duplicates.append(post['shortcode'])
+                yield hashtag, posts, duplicates
+        finally:
+            # A consumer that stops early should not leave queued hashtags fetching in the background
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+    
+    def iter_posts(self, hashtags: List[str], max_posts: int = 10, incremental: bool = None,
+                   cancel: CancelToken = None) -> Iterator[Dict]:
+        """Yield posts one by one as the concurrent hashtag fetches produce them (each post once)"""
+        if incremental is None:
+            incremental = self.incremental
+        hashtags = list(dict.fromkeys(hashtags or []))
+        if not hashtags:
+            return
+        # Stops the fetchers when the consumer goes away, without cancelling the caller's token
+        cancel = CancelToken(cancel)
+        
+        # Cursors live here so a post only counts as scraped once the consumer has taken it
+        cursors = {hashtag: self.state.cursor('instagram', hashtag) if incremental else None for hashtag in hashtags}
+        # Bounded hand-off: fetchers pause while the consumer is busy instead of buffering whole feeds
+        handoff = queue.Queue(maxsize=self.concurrency * 10)
+        done = object()
+        
+        def put(item) -> bool:
+            """Hand one post to the consumer unless it has gone away"""
+            while not cancel.cancelled:
                 try:
-                    logging.info(f"Scraping hashtag: #{hashtag}")
-                    
-                    # Get hashtag posts
-                    hashtag_obj = instaloader.Hashtag.from_name(self.loader.context, hashtag)
-                    
-                    # Get recent posts
-                    for post in hashtag_obj.get_posts():
-                        if len(posts) >= max_posts:
+                    handoff.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def fetch(hashtag: str):
+            """Stream one hashtag's posts into the hand-off queue"""
+            try:
+                with closing(self._iter_hashtag_posts(hashtag, max_posts, cursors[hashtag], cancel)) as posts:
+                    for post in posts:
+                        if not put(post):
                             break
-                            
-                        post_data = {
-                            'id': post.shortcode,
-                            'shortcode': post.shortcode,
-                            'caption': post.caption or '',
-                            'owner_username': post.owner_username,
-                            'likes': post.likes,
-                            'comments': post.comments,
-                            'timestamp': post.date.isoformat(),
-                            'url': f"https://www.instagram.com/p/{post.shortcode}/",
-                            'hashtag': hashtag
-                        }
-                        
-                        posts.append(post_data)
-                        logging.info(f"Found post: {post.shortcode}")
-                        
-                        # Small delay to avoid rate limiting
-                        time.sleep(1)
-                        
-                except Exception as e:
-                    logging.warning(f"Error scraping hashtag {hashtag}: {e}")
+            finally:
+                put(done)
+        
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.concurrency, len(hashtags)), thread_name_prefix='instagram-hashtag'
+        )
+        for hashtag in hashtags:
+            executor.submit(contextvars.copy_context().run, fetch, hashtag)
+        
+        emitted = {}
+        duplicates_skipped = 0
+        remaining = len(hashtags)
+        try:
+            while remaining:
+                post = handoff.get()
+                if post is done:
+                    remaining -= 1
                     continue
-            
-            logging.info(f"Scraped {len(posts)} posts from Instagram")
-            return posts
-            
+                first = emitted.get(post['shortcode'])
+                if first is not None:
+                    first['hashtags'].append(post['hashtag'])
+                    duplicates_skipped += 1
+                else:
+                    post['hashtags'] = [post['hashtag']]
+                    emitted[post['shortcode']] = post
+                    yield post
+                self._mark_seen(cursors[post['hashtag']], post)
+        finally:
+            cancel.cancel()
+            executor.shutdown(wait=True)
+            for cursor in cursors.values():
+                if cursor:
+                    cursor.commit()
+            logging.info(f"Streamed {len(emitted)} Instagram posts ({duplicates_skipped} cross-hashtag duplicates skipped)")
+    
+    def aiter_posts(self, hashtags: List[str], **kwargs) -> AsyncIterator[Dict]:
+        """Async variant of iter_posts"""
+        return aiterate(self.iter_posts, hashtags, **kwargs)
+    
+    def _scrape_hashtag(self, hashtag: str, max_posts: int, incremental: bool) -> List[Dict]:
+        """Fetch up to max_posts posts of one hashtag on a pooled loader"""
+        cursor = self.state.cursor('instagram', hashtag) if incremental else None
+        posts = []
+        try:
+            for post in self._iter_hashtag_posts(hashtag, max_posts, cursor):
+                posts.append(post)
+                self._mark_seen(cursor, post)
+        finally:
+            # Posts already fetched count as scraped even if the feed failed part-way
+            if cursor:
+                cursor.commit()
+        return posts
+    
+    @staticmethod
+    def _mark_seen(cursor, post: Dict):
+        """Record a post with its hashtag's cursor"""
+        if cursor:
+            cursor.add(post['shortcode'], datetime.fromisoformat(post['timestamp']).timestamp())
+    
+    def _iter_hashtag_posts(self, hashtag: str, max_posts: int, cursor=None,
+                            cancel: CancelToken = None) -> Iterator[Dict]:
+        """Yield up to max_posts posts of one hashtag (not yet seen by the cursor) on a pooled loader"""
+        count = 0
+        try:
+            with self.pool.acquire() as loader:
+                logging.info(f"Scraping hashtag: #{hashtag}")
+                
+                # Get hashtag posts
+                self.governor.wait()
+                hashtag_obj = instaloader.Hashtag.from_name(loader.context, hashtag)
+                fetched = 0
+                
+                # Get recent posts (every new post is paced on its own, like fetching a comment page)
+                for post in hashtag_obj.get_posts():
+                    fetched += 1
+                    if count >= max_posts or (cancel and cancel.cancelled):
+                        break
+                    
+                    if cursor:
+                        position = cursor.check(post.shortcode, post.date.timestamp())
+                        if position == cursor.STOP:
+                            break
+                        if position == cursor.SEEN:
+                            continue
+                    
+                    self.governor.wait()
+                    post_data = normalize_item({
+                        'id': post.shortcode,
+                        'shortcode': post.shortcode,
+                        'caption': post.caption or '',
+                        'owner_username': post.owner_username,
+                        'likes': post.likes,
+                        'comments': post.comments,
+                        'timestamp': post.date.isoformat(),
+                        'url': f"https://www.instagram.com/p/{post.shortcode}/",
+                        'hashtag': hashtag
+                    }, 'instagram', hashtag)
+                    
+                    self.governor.record_success()
+                    count += 1
+                    logging.info(f"Found post: {post.shortcode}")
+                    yield post_data
+                else:
+                    if cursor:
+                        cursor.end_of_feed()
+                
+                # An empty feed for a hashtag is how Instagram answers logged-out clients it throttles
+                if not fetched:
+                    self.governor.record_throttle('empty_page')
+                
+                if cursor:
+                    logging.info(f"#{hashtag}: {cursor.summary()}")
+                
         except Exception as e:
-            logging.error(f"Instagram scraping error: {e}")
-            return []
+            logging.warning(f"Error scraping hashtag {hashtag}: {e}")
+            self.governor.record_error(e)
+    
+    def get_stats(self) -> Dict:
+        """Get loader pool and scrape state stats"""
+        return {
+            'concurrency': self.concurrency,
+            'pool': self.pool.get_stats(),
+            'state': self.state.get_stats()
+        }
     
     def get_demo_posts(self) -> List[Dict]:
         """Return demo posts when scraping fails"""
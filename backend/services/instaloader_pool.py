@@ -0,0 +1,127 @@
+"""
+Instaloader Context Pool
+Long-lived Instaloader instances whose session cookies persist across runs
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+import instaloader
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+class InstaloaderPool:
+    def __init__(self, size: int = None, session_dir: str = None):
+        """Initialize a pool of up to INSTAGRAM_POOL_SIZE loaders (created on first use)"""
+        self.size = max(1, int(size or os.getenv('INSTAGRAM_POOL_SIZE', 3)))
+        self.session_dir = session_dir or os.getenv('INSTAGRAM_SESSION_DIR', '../data/sessions')
+        self.acquire_timeout = float(os.getenv('INSTAGRAM_POOL_ACQUIRE_TIMEOUT', 300))
+        
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        # Slots without a loader (a failed creation hands its slot back)
+        self._free_slots = list(range(self.size))
+        self.created = 0
+        self.in_use = 0
+        self.acquisitions = 0
+        self.total_wait_seconds = 0.0
+        self.sessions_loaded = 0
+        self.sessions_saved = 0
+    
+    def _session_path(self, slot: int) -> str:
+        """Cookie file of one pool slot"""
+        return os.path.join(self.session_dir, f"instagram_{slot}.json")
+    
+    def _create(self, slot: int):
+        """Build a loader and restore its cookies from the last run"""
+        loader = instaloader.Instaloader()
+        session = loader.context._session
+        session.headers.update({'User-Agent': USER_AGENT})
+        
+        path = self._session_path(slot)
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    session.cookies.update(json.load(f))
+                with self._lock:
+                    self.sessions_loaded += 1
+            except Exception as e:
+                logging.warning(f"Could not restore Instagram session {path}: {e}")
+        return slot, loader
+    
+    def _save(self, slot: int, loader):
+        """Write a loader's cookies so the next run reuses the session"""
+        try:
+            cookies = loader.context._session.cookies.get_dict()
+            if not cookies:
+                return
+            os.makedirs(self.session_dir, exist_ok=True)
+            path = self._session_path(slot)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(cookies, f)
+            os.replace(path + '.tmp', path)
+            with self._lock:
+                self.sessions_saved += 1
+        except Exception as e:
+            logging.warning(f"Could not save Instagram session {slot}: {e}")
+    
+    @contextmanager
+    def acquire(self):
+        """Borrow a loader, waiting up to acquire_timeout for one to come back when all are busy"""
+        start = time.time()
+        entry = None
+        while entry is None:
+            with self._lock:
+                slot = self._free_slots.pop(0) if self._idle.empty() and self._free_slots else None
+                if slot is not None:
+                    self.created += 1
+            if slot is not None:
+                try:
+                    entry = self._create(slot)
+                except Exception:
+                    with self._lock:
+                        self.created -= 1
+                        self._free_slots.insert(0, slot)
+                    raise
+                break
+            
+            remaining = start + self.acquire_timeout - time.time()
+            if remaining <= 0:
+                raise TimeoutError(f"No Instagram loader came free within {self.acquire_timeout:g}s")
+            try:
+                # Short waits: a slot freed by a failed creation is picked up without a loader coming back
+                entry = self._idle.get(timeout=min(remaining, 1))
+            except queue.Empty:
+                continue
+        
+        with self._lock:
+            self.in_use += 1
+            self.acquisitions += 1
+            self.total_wait_seconds += time.time() - start
+        try:
+            yield entry[1]
+        finally:
+            self._save(*entry)
+            with self._lock:
+                self.in_use -= 1
+            self._idle.put(entry)
+    
+    def get_stats(self) -> Dict:
+        """Get pool size, usage and session persistence counters"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'created': self.created,
+                'in_use': self.in_use,
+                'acquisitions': self.acquisitions,
+                'total_wait_seconds': round(self.total_wait_seconds, 3),
+                'sessions_loaded': self.sessions_loaded,
+                'sessions_saved': self.sessions_saved,
+                'session_dir': self.session_dir
+            }
@@ -0,0 +1,83 @@
+"""
+Lead Qualification Cascade
+Tier settings and exit metrics for rules -> classifier -> screen -> extract
+"""
+
+import logging
+import os
+import threading
+from typing import Dict
+
+TIERS = ('rules', 'classifier', 'screen', 'extract')
+
+class LeadCascade:
+    def __init__(self):
+        """Initialize cascade thresholds and per-tier counters"""
+        self.enabled = os.getenv('LEAD_CASCADE_ENABLED', 'True').lower() == 'true'
+        self.screen_model = os.getenv('GEMINI_SCREEN_MODEL', 'gemini-2.0-flash-lite-001')
+        self.extract_model = os.getenv('GEMINI_EXTRACT_MODEL', 'gemini-2.0-flash-001')
+        
+        # A "not a lead" screen verdict only ends the cascade at or above this confidence
+        self.screen_threshold = float(os.getenv('LEAD_CASCADE_SCREEN_THRESHOLD', 0.7))
+        # Leads from the full extraction need at least this model confidence
+        self.extract_threshold = float(os.getenv('LEAD_CASCADE_EXTRACT_MIN_CONFIDENCE', 0))
+        
+        self._lock = threading.Lock()
+        self.counters = {tier: {'entered': 0, 'exited': 0} for tier in TIERS}
+        self.reused = 0
+        
+        logging.info(f"Lead Cascade initialized (enabled={self.enabled}, screen={self.screen_model}, extract={self.extract_model})")
+    
+    def record(self, tier: str, exited: bool):
+        """Count a post entering a tier, and whether it stopped there"""
+        with self._lock:
+            self.counters[tier]['entered'] += 1
+            if exited:
+                self.counters[tier]['exited'] += 1
+    
+    def record_reused(self):
+        """Count a post answered from the cache or a near-duplicate instead of the model tiers"""
+        with self._lock:
+            self.reused += 1
+    
+    def screen_rejects(self, verdict: Dict) -> bool:
+        """Check whether a screen verdict is a confident non-lead"""
+        try:
+            confidence = float(verdict.get('confidence', 0) or 0)
+        except (TypeError, ValueError):
+            confidence = 0.0
+        return verdict.get('is_lead') is False and confidence >= self.screen_threshold
+    
+    def extract_accepts(self, analysis: Dict) -> bool:
+        """Check the extraction tier's confidence threshold"""
+        try:
+            confidence = float(analysis.get('confidence', 1) or 0)
+        except (TypeError, ValueError):
+            confidence = 0.0
+        return confidence >= self.extract_threshold
+    
+    def get_stats(self, rules_threshold: float = None, classifier_threshold: float = None) -> Dict:
+        """Per-tier exit counts and thresholds"""
+        thresholds = {
+            'rules': rules_threshold,
+            'classifier': classifier_threshold,
+            'screen': self.screen_threshold,
+            'extract': self.extract_threshold
+        }
+        with self._lock:
+            tiers = {}
+            for tier in TIERS:
+                counts = self.counters[tier]
+                tiers[tier] = {
+                    'entered': counts['entered'],
+                    'exited': counts['exited'],
+                    'exit_rate': round(counts['exited'] / counts['entered'], 3) if counts['entered'] else None,
+                    'threshold': thresholds[tier]
+                }
+            return {
+                'enabled': self.enabled,
+                'screen_model': self.screen_model,
+                'extract_model': self.extract_model,
+                'reused_analyses': self.reused,
+                'tiers': tiers
+            }
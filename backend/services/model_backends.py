@@ -0,0 +1,292 @@
+"""
+Gemini Model Backends
+Live Gemini (default), record-to-disk, replay and local stub endpoints behind one interface
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict
+
+from utils.lead_prefilter import LeadPrefilter
+
+BACKENDS = ('genai', 'record', 'replay', 'stub')
+
+def prompt_key(prompt: str) -> str:
+    """Stable key for a recorded prompt"""
+    return hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+
+class InjectedFault(ConnectionError):
+    """Simulated transient Gemini failure (retried like a real 503)"""
+
+class ReplayMissError(LookupError):
+    """Raised in strict replay mode when a prompt has no recording"""
+
+class StubResponse:
+    def __init__(self, text: str, usage: Dict = None):
+        """Minimal stand-in for a Gemini response"""
+        self.text = text
+        self.usage_metadata = SimpleNamespace(**usage) if usage else None
+
+class FaultInjector:
+    def __init__(self, latency_ms: str = None, error_rate: float = None, seed: str = None):
+        """Initialize simulated latency ("50" or "20-80" ms) and error rate for offline backends"""
+        latency_ms = latency_ms if latency_ms is not None else os.getenv('GEMINI_STUB_LATENCY_MS', '0')
+        low, _, high = str(latency_ms).partition('-')
+        self.latency_range = (float(low or 0) / 1000, float(high or low or 0) / 1000)
+        self.error_rate = float(error_rate if error_rate is not None else os.getenv('GEMINI_STUB_ERROR_RATE', 0))
+        
+        seed = seed if seed is not None else os.getenv('GEMINI_STUB_SEED', '')
+        self._random = random.Random(seed) if seed else random.Random()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.injected_errors = 0
+    
+    def apply(self):
+        """Sleep for the simulated latency, then fail at the configured rate"""
+        with self._lock:
+            self.calls += 1
+            delay = self._random.uniform(*self.latency_range)
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.injected_errors += 1
+        
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise InjectedFault("503 Service Unavailable (injected fault)")
+    
+    def get_stats(self) -> Dict:
+        """Get injection counters"""
+        with self._lock:
+            return {
+                'latency_ms': [round(bound * 1000) for bound in self.latency_range],
+                'error_rate': self.error_rate,
+                'calls': self.calls,
+                'injected_errors': self.injected_errors
+            }
+
+# Local stand-in for a Gemini model: answers lead prompts offline from the rule scores
+class StubModel:
+    _BATCH_PATTERN = re.compile(r'(?:Posts|Leads) \(JSON array[^\n]*\n\s*(\[[^\n]*\])')
+    _CONTENT_PATTERN = re.compile(r'Content:\s*"(.*?)"\s*\n', re.DOTALL)
+    
+    def __init__(self, name: str = 'stub', faults: FaultInjector = None):
+        """Initialize stub model"""
+        self.model_name = name
+        self.faults = faults
+        self.scorer = LeadPrefilter(audit_rate=0)
+    
+    def _verdict(self, text: str) -> Dict:
+        """Lead verdict (and quality score) for one text"""
+        result = self.scorer.score(text)
+        score = max(1, min(10, int(round(result['score'] * 1.5))))
+        is_lead = result['passed']
+        return {
+            'is_lead': is_lead,
+            'lead_score': score,
+            'quality_score': score,
+            'priority': 'High' if score >= 7 else 'Medium' if score >= 4 else 'Low',
+            'confidence': 0.9 if abs(result['score'] - self.scorer.min_score) >= 2 else 0.6,
+            'contact_available': 'contact' in result['signals'],
+            'buying_intent': 'High' if score >= 7 else 'Medium' if is_lead else 'Low'
+        }
+    
+    def generate_content(self, prompt: str, **kwargs) -> StubResponse:
+        """Answer a single-post or batch prompt"""
+        if self.faults:
+            self.faults.apply()
+        
+        batch = self._BATCH_PATTERN.search(prompt)
+        if batch:
+            try:
+                items = json.loads(batch.group(1))
+                return StubResponse(json.dumps([
+                    dict(self._verdict(item.get('content') or json.dumps(item)), id=item.get('id'))
+                    for item in items
+                ]))
+            except (json.JSONDecodeError, AttributeError):
+                pass
+        
+        content = self._CONTENT_PATTERN.search(prompt)
+        return StubResponse(json.dumps(self._verdict(content.group(1) if content else prompt)))
+
+class RecordingStore:
+    def __init__(self, path: str = None):
+        """Initialize the prompt/response recording file (JSON lines)"""
+        self.path = path or os.getenv('GEMINI_RECORDINGS_PATH', '../data/recordings/gemini_recordings.jsonl')
+        self._lock = threading.Lock()
+        self._responses = None
+        self.recorded = 0
+    
+    def append(self, model_name: str, prompt: str, text: str, usage: Dict, latency: float):
+        """Save one prompt/response pair"""
+        record = {
+            'key': prompt_key(prompt),
+            'model': model_name,
+            'prompt': prompt,
+            'text': text,
+            'usage': usage,
+            'latency_ms': round(latency * 1000, 1),
+            'recorded_at': time.time()
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.recorded += 1
+            if self._responses is not None:
+                self._responses[record['key']] = record
+    
+    def lookup(self, prompt: str) -> Dict:
+        """Recorded response for a prompt (latest recording wins), or None"""
+        with self._lock:
+            if self._responses is None:
+                self._responses = self._load()
+            return self._responses.get(prompt_key(prompt))
+    
+    def _load(self) -> Dict:
+        """Read the recording file"""
+        responses = {}
+        if not os.path.exists(self.path):
+            logging.warning(f"No Gemini recordings at {self.path}")
+            return responses
+        
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    responses[record['key']] = record
+                except (ValueError, KeyError):
+                    continue
+        logging.info(f"Loaded {len(responses)} Gemini recordings from {self.path}")
+        return responses
+    
+    def size(self) -> int:
+        """Number of distinct recorded prompts"""
+        with self._lock:
+            return len(self._responses) if self._responses is not None else 0
+
+def _usage_dict(response) -> Dict:
+    """Token counts from a Gemini response's usage metadata"""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return None
+    return {name: getattr(usage, name, None)
+            for name in ('prompt_token_count', 'candidates_token_count', 'total_token_count')}
+
+class RecordingModel:
+    def __init__(self, model, model_name: str, store: RecordingStore):
+        """Wrap a live model and save every prompt/response pair"""
+        self.model = model
+        self.model_name = model_name
+        self.store = store
+    
+    def generate_content(self, prompt: str, **kwargs):
+        """Call the live model and record its reply"""
+        start = time.time()
+        response = self.model.generate_content(prompt, **kwargs)
+        try:
+            self.store.append(self.model_name, prompt, response.text, _usage_dict(response), time.time() - start)
+        except Exception as e:
+            logging.warning(f"Could not record Gemini response: {e}")
+        return response
+
+class ReplayModel:
+    def __init__(self, model_name: str, store: RecordingStore, faults: FaultInjector, fallback=None):
+        """Answer prompts from recordings; misses go to the fallback model or raise"""
+        self.model_name = model_name
+        self.store = store
+        self.faults = faults
+        self.fallback = fallback
+        
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def generate_content(self, prompt: str, **kwargs) -> StubResponse:
+        """Replay the recorded reply for a prompt"""
+        record = self.store.lookup(prompt)
+        with self._lock:
+            if record:
+                self.hits += 1
+            else:
+                self.misses += 1
+        
+        if record is None:
+            if self.fallback is None:
+                raise ReplayMissError(f"No recording for prompt {prompt_key(prompt)} ({self.model_name})")
+            return self.fallback.generate_content(prompt, **kwargs)
+        
+        self.faults.apply()
+        return StubResponse(record['text'], record.get('usage'))
+
+class ModelBackend:
+    def __init__(self, mode: str = None):
+        """Initialize the backend selected by GEMINI_BACKEND (genai, record, replay or stub)"""
+        self.mode = (mode or os.getenv('GEMINI_BACKEND', 'genai')).lower()
+        if self.mode not in BACKENDS:
+            raise ValueError(f"Unknown GEMINI_BACKEND '{self.mode}' (expected one of {', '.join(BACKENDS)})")
+        
+        self.faults = FaultInjector()
+        self.store = RecordingStore() if self.mode in ('record', 'replay') else None
+        # Strict replay fails on prompts that were never recorded instead of answering from the stub
+        self.replay_strict = os.getenv('GEMINI_REPLAY_STRICT', 'False').lower() == 'true'
+        self.models = {}
+        
+        self._genai = None
+        if self.mode in ('genai', 'record'):
+            self._genai = self._configure_genai()
+        
+        logging.info(f"Gemini model backend: {self.mode}")
+    
+    def _configure_genai(self):
+        """Import and configure the Gemini SDK (only live backends need the API key)"""
+        api_key = os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        return genai
+    
+    @property
+    def live(self) -> bool:
+        """Whether calls go to the real Gemini API"""
+        return self._genai is not None
+    
+    def model(self, spec: str):
+        """Build a model endpoint from a spec: a Gemini model name, or 'stub' for the local stand-in"""
+        if spec == 'stub' or spec.startswith('stub:') or self.mode == 'stub':
+            model = StubModel(spec, self.faults)
+        elif self.mode == 'replay':
+            fallback = None if self.replay_strict else StubModel(spec, self.faults)
+            model = ReplayModel(spec, self.store, self.faults, fallback)
+        elif self.mode == 'record':
+            model = RecordingModel(self._genai.GenerativeModel(spec), spec, self.store)
+        else:
+            model = self._genai.GenerativeModel(spec)
+        
+        self.models[spec] = model
+        return model
+    
+    def get_stats(self) -> Dict:
+        """Get backend mode, fault injection and record/replay counters"""
+        stats = {'mode': self.mode}
+        if self.mode in ('replay', 'stub'):
+            stats['faults'] = self.faults.get_stats()
+        if self.store is not None:
+            stats['recordings_path'] = self.store.path
+            stats['recorded'] = self.store.recorded
+        if self.mode == 'replay':
+            replayers = [model for model in self.models.values() if isinstance(model, ReplayModel)]
+            stats['replay_hits'] = sum(model.hits for model in replayers)
+            stats['replay_misses'] = sum(model.misses for model in replayers)
+            stats['recordings_loaded'] = self.store.size()
+        return stats
@@ -0,0 +1,146 @@
+"""
+Parked Items Store
+Keeps posts that could not be analyzed (Gemini outage) for later processing
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Set
+
+class ParkedItemStore:
+    def __init__(self, db_path: str = None):
+        """Initialize SQLite-backed parking store"""
+        self.db_path = db_path or os.getenv('PARKED_ITEMS_DB_PATH', '../data/cache/parked_items.db')
+        # Failed analyses after which an item is dead-lettered instead of parked again
+        self.max_attempts = max(1, int(os.getenv('PARKED_ITEMS_MAX_ATTEMPTS', 5)))
+        self._lock = threading.Lock()
+        self._memory = None
+        
+        try:
+            self._init_db()
+        except (OSError, sqlite3.Error) as e:
+            # An unwritable data directory must not stop GeminiService from starting
+            logging.error(f"Parked item store {self.db_path} unavailable, keeping parked items in memory: {e}")
+            self.db_path = f"file:parked_items_{id(self)}?mode=memory&cache=shared"
+            # The shared in-memory database lives as long as one connection to it stays open
+            self._memory = sqlite3.connect(self.db_path, uri=True, check_same_thread=False)
+            self._init_db()
+    
+    def _init_db(self):
+        """Create the parked items table"""
+        directory = os.path.dirname(self.db_path) if self._memory is None else ''
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS parked_items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    item TEXT NOT NULL,
+                    reason TEXT,
+                    parked_at REAL NOT NULL,
+                    provisional_id TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 1,
+                    dead_lettered_at REAL
+                )
+            ''')
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(parked_items)').fetchall()]
+            if 'provisional_id' not in columns:
+                conn.execute('ALTER TABLE parked_items ADD COLUMN provisional_id TEXT')
+            if 'attempts' not in columns:
+                conn.execute('ALTER TABLE parked_items ADD COLUMN attempts INTEGER NOT NULL DEFAULT 1')
+                conn.execute('ALTER TABLE parked_items ADD COLUMN dead_lettered_at REAL')
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _connect(self):
+        """Open a connection (one per operation keeps this safe across threads and workers)"""
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None, uri=self._memory is not None)
+    
+    def park(self, item: Dict, kind: str, reason: str = '', provisional_id: str = None):
+        """Park an item for later analysis (provisional_id links a degraded lead already emitted for it)"""
+        # Drained items come back with their attempt count; parking one again counts another failure
+        attempts = int(item.get('parked_attempts', 0)) + 1
+        item = {key: value for key, value in item.items() if key not in ('provisional_id', 'parked_attempts')}
+        now = time.time()
+        dead_lettered_at = None
+        if attempts >= self.max_attempts:
+            # Keeps failing: stop retrying it, but keep it (and its degraded lead) for inspection
+            logging.warning(f"Dead-lettering {kind} after {attempts} failed analyses: {reason[:200]}")
+            dead_lettered_at = now
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute(
+                        'INSERT INTO parked_items (kind, item, reason, parked_at, provisional_id, attempts, '
+                        'dead_lettered_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (kind, json.dumps(item, ensure_ascii=False, default=str), reason[:500], now,
+                         provisional_id, attempts, dead_lettered_at)
+                    )
+                finally:
+                    conn.close()
+        except Exception as e:
+            logging.error(f"Error parking {kind}: {e}")
+    
+    def drain(self, kind: str, limit: int = 500) -> List[Dict]:
+        """Remove and return up to `limit` parked items of one kind (oldest first)"""
+        # Items a degraded lead was emitted for come back with its provisional_id
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                rows = conn.execute(
+                    'SELECT id, item, provisional_id, attempts FROM parked_items '
+                    'WHERE kind = ? AND dead_lettered_at IS NULL ORDER BY id LIMIT ?', (kind, limit)
+                ).fetchall()
+                conn.executemany('DELETE FROM parked_items WHERE id = ?', [(row[0],) for row in rows])
+                conn.execute('COMMIT')
+            finally:
+                conn.close()
+        
+        items = []
+        for _, item, provisional_id, attempts in rows:
+            item = json.loads(item)
+            if provisional_id:
+                item['provisional_id'] = provisional_id
+            item['parked_attempts'] = attempts
+            items.append(item)
+        return items
+    
+    def parked_provisional_ids(self, provisional_ids: Iterable[str]) -> Set[str]:
+        """Which of these provisional ids still belong to a parked (or dead-lettered) item"""
+        provisional_ids = list(provisional_ids)
+        if not provisional_ids:
+            return set()
+        conn = self._connect()
+        try:
+            placeholders = ','.join('?' * len(provisional_ids))
+            return {row[0] for row in conn.execute(
+                f'SELECT DISTINCT provisional_id FROM parked_items WHERE provisional_id IN ({placeholders})',
+                provisional_ids
+            ).fetchall()}
+        finally:
+            conn.close()
+    
+    def count(self, dead_lettered: bool = False) -> Dict[str, int]:
+        """Count parked (or dead-lettered) items per kind"""
+        try:
+            conn = self._connect()
+            try:
+                condition = 'dead_lettered_at IS NOT NULL' if dead_lettered else 'dead_lettered_at IS NULL'
+                return dict(conn.execute(
+                    f'SELECT kind, COUNT(*) FROM parked_items WHERE {condition} GROUP BY kind'
+                ).fetchall())
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.error(f"Error counting parked items: {e}")
+            return {}
@@ -0,0 +1,342 @@
+"""
+Scrape Pipeline
+Bounded-queue stages (scrape -> pre-filter -> analysis -> persistence) that overlap instead of running back to back
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from services.streaming import CancelToken
+from services.usage_tracker import current_context
+
+_END = object()
+
+class Stage:
+    def __init__(self, name: str, fn: Callable, workers: int = 1, batch_size: int = 1, batch_wait: float = 0.0):
+        """Initialize a stage; fn takes one item (or a list when batch_size > 1) and returns an iterable of outputs"""
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = batch_wait
+        self.input = None
+        
+        self._lock = threading.Lock()
+        self._active = self.workers
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.calls = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.started_at = None
+        self.finished_at = None
+    
+    def record(self, items_in: int, items_out: int, latency: float, error: bool = False):
+        """Count one call of the stage function"""
+        with self._lock:
+            self.calls += 1
+            self.items_in += items_in
+            self.items_out += items_out
+            self.busy_seconds += latency
+            if error:
+                self.errors += 1
+    
+    def observe_depth(self):
+        """Track the deepest the input queue got"""
+        if self.input is not None:
+            depth = self.input.qsize()
+            with self._lock:
+                self.max_queue_depth = max(self.max_queue_depth, depth)
+    
+    def worker_done(self) -> bool:
+        """Mark one worker finished; returns whether it was the last"""
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self.finished_at = time.time()
+            return self._active == 0
+    
+    def get_stats(self) -> Dict:
+        """Throughput, queue depth and latency of the stage"""
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            return {
+                'workers': self.workers,
+                'batch_size': self.batch_size,
+                'items_in': self.items_in,
+                'items_out': self.items_out,
+                'errors': self.errors,
+                'queue_depth': self.input.qsize() if self.input is not None else 0,
+                'max_queue_depth': self.max_queue_depth,
+                'avg_latency_ms': round(self.busy_seconds * 1000 / self.calls, 1) if self.calls else None,
+                'throughput_per_sec': round(self.items_in / elapsed, 2) if elapsed > 0 else None,
+                'running': self.started_at is not None and self.finished_at is None
+            }
+
+class Pipeline:
+    def __init__(self, name: str, source: Callable[[CancelToken], Iterable], stages: List[Stage],
+                 queue_size: int = None):
+        """Initialize a pipeline fed by source(cancel) and ending in the last stage's outputs"""
+        self.name = name
+        self.id = f"{name}-{uuid.uuid4().hex[:8]}"
+        self.source = source
+        self.scrape = Stage('scrape', None)
+        self.stages = stages
+        self.queue_size = int(queue_size or os.getenv('PIPELINE_QUEUE_SIZE', 100))
+        self.cancel_token = CancelToken()
+        self.scan_id = current_context().get('scan_id', '')
+        self.started_at = None
+        self.finished_at = None
+        
+        # Bounded queues between stages give backpressure: a slow stage stalls the ones before it
+        for stage in stages:
+            stage.input = queue.Queue(maxsize=self.queue_size)
+        self.output = queue.Queue(maxsize=self.queue_size)
+    
+    def cancel(self):
+        """Stop scraping; items already queued are dropped"""
+        self.cancel_token.cancel()
+    
+    def _put(self, target: queue.Queue, item) -> bool:
+        """Blocking put; between stages it gives up once the pipeline is cancelled (run() always drains the output)"""
+        while True:
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if self.cancel_token.cancelled and target is not self.output:
+                    return False
+    
+    def _downstream(self, index: int) -> queue.Queue:
+        """Queue feeding the stage after stage `index` (-1 is the scraper)"""
+        return self.stages[index + 1].input if index + 1 < len(self.stages) else self.output
+    
+    def _finish(self, stage: Stage, index: int):
+        """Pass end markers on once every worker of a stage is done"""
+        if stage.worker_done():
+            next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            target = self._downstream(index)
+            for _ in range(next_workers):
+                self._put(target, _END)
+    
+    def _run_source(self):
+        """Feed scraped items into the first stage"""
+        target = self._downstream(-1)
+        self.scrape.started_at = time.time()
+        items = None
+        try:
+            items = iter(self.source(self.cancel_token))
+            start = time.time()
+            for item in items:
+                latency = time.time() - start
+                if not self._put(target, item):
+                    break
+                self.scrape.record(1, 1, latency)
+                if self.stages:
+                    self.stages[0].observe_depth()
+                if self.cancel_token.cancelled:
+                    break
+                start = time.time()
+        except Exception as e:
+            logging.error(f"Pipeline {self.id} scrape error: {e}")
+            self.scrape.record(0, 0, 0.0, error=True)
+        finally:
+            # Closing the scraper's generator lets it commit its incremental state right away
+            if hasattr(items, 'close'):
+                items.close()
+            self._finish(self.scrape, -1)
+    
+    def _take_batch(self, stage: Stage):
+        """Next batch for a stage; returns (items, ended)"""
+        while True:
+            try:
+                item = stage.input.get(timeout=0.5)
+                break
+            except queue.Empty:
+                # Cancelled upstream workers may not get their end markers through
+                if self.cancel_token.cancelled:
+                    return [], True
+        if item is _END:
+            return [], True
+        batch = [item]
+        deadline = time.time() + stage.batch_wait
+        while len(batch) < stage.batch_size:
+            remaining = deadline - time.time()
+            try:
+                item = stage.input.get(timeout=remaining) if remaining > 0 else stage.input.get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+    
+    def _run_stage(self, stage: Stage, index: int):
+        """Worker loop of one stage"""
+        target = self._downstream(index)
+        try:
+            while True:
+                batch, ended = self._take_batch(stage)
+                if batch and not self.cancel_token.cancelled:
+                    start = time.time()
+                    try:
+                        outputs = list(stage.fn(batch if stage.batch_size > 1 else batch[0]) or [])
+                        stage.record(len(batch), len(outputs), time.time() - start)
+                    except Exception as e:
+                        logging.error(f"Pipeline {self.id} stage {stage.name} error: {e}")
+                        stage.record(len(batch), 0, time.time() - start, error=True)
+                        outputs = []
+                    for output in outputs:
+                        if not self._put(target, output):
+                            break
+                    if index + 1 < len(self.stages):
+                        self.stages[index + 1].observe_depth()
+                if ended:
+                    break
+        finally:
+            self._finish(stage, index)
+    
+    def run(self) -> Iterator:
+        """Start every stage and yield the final outputs as they arrive"""
+        self.started_at = time.time()
+        _register(self)
+        threads = [self._thread(self._run_source, 'scrape')]
+        for index, stage in enumerate(self.stages):
+            stage.started_at = time.time()
+            threads.extend(self._thread(self._run_stage, f"{stage.name}-{n}", stage, index) for n in range(stage.workers))
+        
+        completed = False
+        try:
+            while True:
+                output = self.output.get()
+                if output is _END:
+                    completed = True
+                    break
+                yield output
+        finally:
+            # A consumer that stops early cancels the scrape; the stages drain and exit
+            if not completed:
+                self.cancel()
+            while any(thread.is_alive() for thread in threads):
+                try:
+                    self.output.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.finished_at = time.time()
+            logging.info(f"Pipeline {self.id} finished in {self.finished_at - self.started_at:.1f}s: {self.summary()}")
+    
+    def _thread(self, target: Callable, label: str, *args) -> threading.Thread:
+        """Start a stage thread in a copy of the caller's context (scan attribution)"""
+        thread = threading.Thread(
+            target=contextvars.copy_context().run, args=(target,) + args,
+            name=f"pipeline-{self.name}-{label}", daemon=True
+        )
+        thread.start()
+        return thread
+    
+    def summary(self) -> str:
+        """One-line item counts per stage for logs"""
+        return ', '.join(
+            f"{stage.name} {stage.items_in}->{stage.items_out}" for stage in [self.scrape] + self.stages
+        )
+    
+    def get_stats(self) -> Dict:
+        """Per-stage throughput, queue depth and latency"""
+        end = self.finished_at or time.time()
+        return {
+            'id': self.id,
+            'name': self.name,
+            'scan_id': self.scan_id,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat() if self.started_at else None,
+            'duration_seconds': round(end - self.started_at, 3) if self.started_at else None,
+            'running': self.started_at is not None and self.finished_at is None,
+            'cancelled': self.cancel_token.cancelled,
+            'queue_size': self.queue_size,
+            'output_queue_depth': self.output.qsize(),
+            'stages': {stage.name: stage.get_stats() for stage in [self.scrape] + self.stages}
+        }
+
+class JsonlLeadSink:
+    def __init__(self, path: str = None):
+        """Initialize the lead persistence file (JSON lines, appended)"""
+        self.path = path or os.getenv('PIPELINE_LEADS_PATH', '../data/leads/leads.jsonl')
+        self._lock = threading.Lock()
+    
+    def write(self, lead: Dict) -> List[Dict]:
+        """Append one lead with its scan id; returns it so the pipeline passes it on"""
+        record = dict(lead, scan_id=current_context().get('scan_id', ''), persisted_at=datetime.now().isoformat())
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        return [lead]
+
+class LeadPipelineFactory:
+    def __init__(self, gemini_service, sink: JsonlLeadSink = None):
+        """Initialize stage settings for scrape -> pre-filter -> analysis -> persistence pipelines"""
+        self.gemini_service = gemini_service
+        self.sink = sink or JsonlLeadSink()
+        self.persist = os.getenv('PIPELINE_PERSIST', 'True').lower() == 'true'
+        self.prefilter_workers = int(os.getenv('PIPELINE_PREFILTER_WORKERS', 2))
+        self.analyze_workers = int(os.getenv('PIPELINE_ANALYZE_WORKERS', 2))
+        self.persist_workers = int(os.getenv('PIPELINE_PERSIST_WORKERS', 1))
+        self.batch_wait = float(os.getenv('PIPELINE_BATCH_WAIT_MS', 500)) / 1000
+    
+    def build(self, name: str, source: Callable[[CancelToken], Iterable], item_kind: str = 'post',
+              batch_size: int = None) -> Pipeline:
+        """Pipeline that turns scraped posts/comments into persisted leads"""
+        gemini = self.gemini_service
+        
+        def prefilter(item):
+            passed = gemini.screen_item(item, item_kind)
+            return [] if passed is None else [(item, passed)]
+        
+        def analyze(batch):
+            return gemini.analyze_screened(batch, item_kind=item_kind)
+        
+        stages = [
+            Stage('prefilter', prefilter, self.prefilter_workers),
+            Stage('analyze', analyze, self.analyze_workers, batch_size or gemini.batch_size, self.batch_wait)
+        ]
+        if self.persist:
+            stages.append(Stage('persist', self.sink.write, self.persist_workers))
+        return Pipeline(name, source, stages)
+
+# Running and recently finished pipelines, for /api/pipeline/stats
+_recent = deque(maxlen=int(os.getenv('PIPELINE_STATS_HISTORY', 20)))
+_recent_lock = threading.Lock()
+
+def _register(pipeline: Pipeline):
+    """Track a pipeline for stats"""
+    with _recent_lock:
+        _recent.append(pipeline)
+
+def get_stats(scan_id: str = None) -> Dict:
+    """Stats of running and recent pipelines (optionally of one scan), plus totals per stage"""
+    with _recent_lock:
+        pipelines = list(_recent)
+    runs = [pipeline.get_stats() for pipeline in reversed(pipelines) if not scan_id or pipeline.scan_id == scan_id]
+    
+    totals = {}
+    for run in runs:
+        for name, stage in run['stages'].items():
+            total = totals.setdefault(name, {'items_in': 0, 'items_out': 0, 'errors': 0})
+            for key in total:
+                total[key] += stage[key]
+    return {
+        'running': sum(1 for run in runs if run['running']),
+        'stage_totals': totals,
+        'pipelines': runs
+    }
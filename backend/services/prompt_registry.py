@@ -0,0 +1,372 @@
+"""
+Prompt Registry
+Versioned, precompiled prompt templates with token budgeting, truncation and size histograms
+"""
+
+import hashlib
+import logging
+import os
+import textwrap
+import threading
+from string import Template
+from typing import Dict, List, Tuple
+
+# Upper bounds (estimated tokens) of the prompt size histogram buckets
+SIZE_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192)
+
+TRUNCATION_MARKER = ' [...] '
+
+def estimate_tokens(text: str) -> int:
+    """Fast token estimate: ~4 bytes of UTF-8 per token (Devanagari costs more per character)"""
+    if text.isascii():
+        return len(text) // 4 + 1
+    return len(text.encode('utf-8')) // 4 + 1
+
+def truncate_middle(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """Cut text down to a token budget, keeping the head and the tail"""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text, False
+    
+    # Scale the character budget by this text's own bytes-per-character ratio
+    chars_per_token = len(text) / max(estimate_tokens(text), 1)
+    keep = max(int(max_tokens * chars_per_token) - len(TRUNCATION_MARKER), 2)
+    head = keep * 2 // 3
+    tail = keep - head
+    return text[:head].rstrip() + TRUNCATION_MARKER + text[-tail:].lstrip(), True
+
+class PromptTemplate:
+    def __init__(self, family: str, variant: str, version: str, text: str):
+        """Compile a prompt template ($name placeholders, indentation stripped once)"""
+        self.family = family
+        self.variant = variant
+        self.version = str(version)
+        self.template = Template(textwrap.dedent(text).strip('\n'))
+    
+    def render(self, **values) -> str:
+        """Fill in the template"""
+        return self.template.substitute(values)
+
+class PromptRegistry:
+    def __init__(self, templates: List[PromptTemplate] = None):
+        """Register templates and read active versions, A/B tests and tier budgets"""
+        self._lock = threading.Lock()
+        self.templates = {}
+        self.active = {}
+        
+        for template in templates if templates is not None else DEFAULT_TEMPLATES:
+            self.register(template)
+        
+        # PROMPT_ACTIVE_VERSIONS="intent=1,quality=2" pins versions (default: newest registered)
+        for family, version in self._parse_pairs(os.getenv('PROMPT_ACTIVE_VERSIONS', '')):
+            if (family, version) in {(key[0], key[2]) for key in self.templates}:
+                self.active[family] = version
+            else:
+                logging.warning(f"Unknown prompt version {family}={version}, keeping {self.active.get(family)}")
+        
+        # PROMPT_AB_TESTS="intent=2:0.1" sends 10% of content (stable by content hash) to version 2
+        self.experiments = {}
+        for family, spec in self._parse_pairs(os.getenv('PROMPT_AB_TESTS', '')):
+            version, _, share = spec.partition(':')
+            if (family, version) not in {(key[0], key[2]) for key in self.templates}:
+                logging.warning(f"Ignoring prompt A/B test {family}={spec}: unknown version")
+                continue
+            try:
+                self.experiments[family] = (version, float(share or 0.5))
+            except ValueError:
+                logging.warning(f"Invalid prompt A/B test {family}={spec}")
+        
+        # Content token budget per cascade tier
+        self.budgets = {
+            'screen': int(os.getenv('PROMPT_BUDGET_SCREEN_TOKENS', 256)),
+            'extract': int(os.getenv('PROMPT_BUDGET_EXTRACT_TOKENS', 768))
+        }
+        self.log_every = int(os.getenv('PROMPT_HISTOGRAM_LOG_EVERY', 500))
+        
+        self.histograms = {}
+        self.truncations = {tier: 0 for tier in self.budgets}
+        self.outcomes = {}
+        
+        logging.info(f"Prompt Registry initialized (active={self.active}, experiments={self.experiments})")
+    
+    def _parse_pairs(self, value: str) -> List[Tuple[str, str]]:
+        """Parse "a=1,b=2" settings"""
+        pairs = []
+        for part in value.split(','):
+            name, sep, setting = part.partition('=')
+            if sep and name.strip():
+                pairs.append((name.strip(), setting.strip()))
+        return pairs
+    
+    def register(self, template: PromptTemplate):
+        """Add a template; the newest version of a family becomes active"""
+        self.templates[(template.family, template.variant, template.version)] = template
+        current = self.active.get(template.family)
+        if current is None or int(template.version) > int(current):
+            self.active[template.family] = template.version
+    
+    def version_for(self, family: str, content: str = '') -> str:
+        """Prompt version that handles this content (A/B split is stable per content)"""
+        experiment = self.experiments.get(family)
+        if experiment and content:
+            version, share = experiment
+            bucket = int.from_bytes(hashlib.blake2b(content.encode('utf-8'), digest_size=4).digest(), 'big')
+            if bucket / 0xFFFFFFFF < share:
+                return version
+        return self.active[family]
+    
+    def live_versions(self, family: str) -> List[str]:
+        """Versions currently in use (active plus any experiment)"""
+        versions = [self.active[family]]
+        if family in self.experiments:
+            versions.append(self.experiments[family][0])
+        return versions
+    
+    def fit(self, content: str, tier: str) -> str:
+        """Truncate content to the tier's token budget (head and tail kept)"""
+        content, truncated = truncate_middle(content or '', self.budgets.get(tier, 0))
+        if truncated:
+            with self._lock:
+                self.truncations[tier] += 1
+        return content
+    
+    def _template(self, family: str, variant: str, version: str = None) -> PromptTemplate:
+        """Look up a template (an experiment version may not define every variant)"""
+        template = self.templates.get((family, variant, version or self.active[family]))
+        return template or self.templates[(family, variant, self.active[family])]
+    
+    def fragment(self, family: str, variant: str, version: str = None, **values) -> str:
+        """Render a template that is embedded in another prompt (not counted on its own)"""
+        return self._template(family, variant, version).render(**values)
+    
+    def render(self, family: str, variant: str, version: str = None, **values) -> str:
+        """Render a template and record its size"""
+        template = self._template(family, variant, version)
+        prompt = template.render(**values)
+        self._record_size(f"{family}.{variant}.v{template.version}", estimate_tokens(prompt))
+        return prompt
+    
+    def _record_size(self, name: str, tokens: int):
+        """Add a prompt to the size histogram, logging it periodically"""
+        with self._lock:
+            histogram = self.histograms.setdefault(name, {
+                'count': 0, 'total_tokens': 0, 'max_tokens': 0,
+                'buckets': {str(bound): 0 for bound in SIZE_BUCKETS + ('inf',)}
+            })
+            histogram['count'] += 1
+            histogram['total_tokens'] += tokens
+            histogram['max_tokens'] = max(histogram['max_tokens'], tokens)
+            bucket = next((bound for bound in SIZE_BUCKETS if tokens <= bound), 'inf')
+            histogram['buckets'][str(bucket)] += 1
+            
+            if self.log_every and histogram['count'] % self.log_every == 0:
+                filled = {bound: count for bound, count in histogram['buckets'].items() if count}
+                logging.info(
+                    f"Prompt sizes {name}: n={histogram['count']} "
+                    f"avg={histogram['total_tokens'] // histogram['count']} max={histogram['max_tokens']} "
+                    f"tokens, buckets(<=)={filled}"
+                )
+    
+    def record_outcome(self, family: str, version: str, outcome: str):
+        """Count an outcome per prompt version for A/B comparison"""
+        with self._lock:
+            counts = self.outcomes.setdefault(family, {}).setdefault(version, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+    
+    def get_stats(self) -> Dict:
+        """Active versions, experiments, truncations, size histograms and A/B outcomes"""
+        with self._lock:
+            return {
+                'active_versions': dict(self.active),
+                'experiments': {family: {'version': version, 'share': share}
+                                for family, (version, share) in self.experiments.items()},
+                'budgets': dict(self.budgets),
+                'truncations': dict(self.truncations),
+                'sizes': {name: dict(histogram, buckets=dict(histogram['buckets']),
+                                     avg_tokens=histogram['total_tokens'] // histogram['count'])
+                          for name, histogram in self.histograms.items()},
+                'outcomes': {family: {version: dict(counts) for version, counts in versions.items()}
+                             for family, versions in self.outcomes.items()}
+            }
+
+DEFAULT_TEMPLATES = [
+    PromptTemplate('screen', 'batch', '1', '''
+        Decide for EACH social media post whether its author is personally looking to buy or rent property
+        (not a broker, builder or ad promoting property).
+        
+        Posts (JSON array of objects with "id" and "content"):
+        $posts_json
+        
+        Respond with ONLY a JSON array, one object per post:
+        [{"id": "the post id exactly as given", "is_lead": true/false, "confidence": 0.0-1.0}]
+        '''),
+    
+    PromptTemplate('intent', 'single', '1', '''
+        You are a real estate lead qualification expert. Analyze this social media content for lead intent:
+        
+        Content: "$content"
+        
+        PRIORITY: Focus on HIGH-INTENT leads with direct contact information or clear buying signals.
+        
+        Determine:
+        1. Is this person actively looking for property? (Yes/No)
+        2. What type of property? (1BHK, 2BHK, 3BHK, Villa, Commercial, etc.)
+        3. Location preference? (Gurgaon, Delhi, Mumbai, etc.)
+        4. Budget range? (if mentioned)
+        5. Timeline? (urgent, within month, etc.)
+        6. Contact information? (phone, email, WhatsApp if visible)
+        7. Lead score (1-10, where 10 is highest intent - PRIORITIZE contacts with phone/email)
+        8. Language used (Hindi/English/Both)
+        9. Buying intent level (High/Medium/Low)
+        10. Contact method mentioned (Call, DM, WhatsApp, Email)
+        
+        IMPORTANT: Only mark as lead if:
+        - Direct contact info is present (phone/email)
+        - Clear buying intent ("looking for", "need", "want to buy")
+        - Specific requirements mentioned
+        - Timeline is mentioned ("urgent", "immediately", "this month")
+        $contact_instructions
+        Respond in JSON format:
+        {
+            "is_lead": true/false,
+            "property_type": "2BHK",
+            "location": "Gurgaon",
+            "budget_range": "50L-70L",
+            "timeline": "within_month",
+            "contact_available": true/false,
+            "contact_method": "phone/email/whatsapp/dm",
+            "buying_intent": "High/Medium/Low",
+            "lead_score": 8,
+            "language": "English",
+            "confidence": 0.85$contact_fields
+        }
+        '''),
+    
+    PromptTemplate('intent', 'batch', '1', '''
+        You are a real estate lead qualification expert. Analyze EACH of these social media posts for lead intent.
+        
+        Posts (JSON array of objects with "id" and "content"):
+        $posts_json
+        
+        PRIORITY: Focus on HIGH-INTENT leads with direct contact information or clear buying signals.
+        
+        IMPORTANT: Only mark a post as lead if:
+        - Direct contact info is present (phone/email)
+        - Clear buying intent ("looking for", "need", "want to buy")
+        - Specific requirements mentioned
+        - Timeline is mentioned ("urgent", "immediately", "this month")
+        $contact_instructions
+        Respond with ONLY a JSON array containing exactly one object per post, in this format:
+        [
+            {
+                "id": "the post id exactly as given",
+                "is_lead": true/false,
+                "property_type": "2BHK",
+                "location": "Gurgaon",
+                "budget_range": "50L-70L",
+                "timeline": "within_month",
+                "contact_available": true/false,
+                "contact_method": "phone/email/whatsapp/dm",
+                "buying_intent": "High/Medium/Low",
+                "lead_score": 8,
+                "language": "English",
+                "confidence": 0.85$contact_fields
+            }
+        ]
+        '''),
+    
+    # Folded into the intent prompts in combined intent + contact mode
+    PromptTemplate('intent', 'contact_instructions', '1', '''
+        ALSO extract ALL contact information present in the content:
+        - Name (any name mentioned)
+        - Phone number in any format (9876543210, +91-9876543210, 98765-43210); Indian numbers start with 6,7,8,9
+        - Email address, WhatsApp number, social media handles (@username)
+        - Contact phrases ("call me", "DM me", "contact me", "reach out")
+        Use null for anything that is not present.
+        '''),
+    
+    PromptTemplate('intent', 'contact_fields', '1', '''
+        "contact": {
+            "name": "extracted name or null",
+            "phone": "extracted phone or null",
+            "email": "extracted email or null",
+            "whatsapp": "extracted whatsapp or null",
+            "social_handle": "extracted social handle or null",
+            "contact_phrase": "extracted contact phrase or null"
+        }'''),
+    
+    PromptTemplate('contact', 'single', '1', '''
+        Extract ALL possible contact information from this text:
+        
+        "$content"
+        
+        AGGRESSIVELY search for:
+        1. Name (any name mentioned)
+        2. Phone number (any format: 9876543210, +91-9876543210, 98765-43210, etc.)
+        3. Email address (any format)
+        4. WhatsApp number (any format)
+        5. Social media handles (@username)
+        6. Contact phrases ("call me", "DM me", "contact me", "reach out")
+        
+        IMPORTANT:
+        - Look for Indian phone numbers (starting with 6,7,8,9)
+        - Look for email patterns (contains @ and .)
+        - Look for WhatsApp mentions
+        - Extract even partial contact info
+        
+        Respond in JSON format:
+        {
+            "name": "extracted name or null",
+            "phone": "extracted phone or null",
+            "email": "extracted email or null",
+            "whatsapp": "extracted whatsapp or null",
+            "social_handle": "extracted social handle or null",
+            "contact_phrase": "extracted contact phrase or null"
+        }
+        '''),
+    
+    PromptTemplate('quality', 'single', '2', '''
+        Analyze this lead data for quality and priority:
+        
+        Lead Data: $lead_json
+        
+        Provide:
+        1. Quality score (1-10)
+        2. Priority level (High/Medium/Low)
+        3. Recommended next action
+        4. Risk factors
+        5. Opportunity assessment
+        
+        Respond in JSON format:
+        {
+            "quality_score": 8,
+            "priority": "High",
+            "recommended_action": "Call immediately",
+            "risk_factors": ["No phone number"],
+            "opportunity_assessment": "Strong intent, ready to buy",
+            "follow_up_suggestion": "Send property recommendations"
+        }
+        '''),
+    
+    PromptTemplate('quality', 'batch', '2', '''
+        Analyze EACH of these real estate leads for quality and priority.
+        
+        Leads (JSON array, each with an "id"):
+        $leads_json
+        
+        For each lead provide: quality score (1-10), priority (High/Medium/Low), recommended next action,
+        risk factors, opportunity assessment and a follow-up suggestion.
+        
+        Respond with ONLY a JSON array containing exactly one object per lead, in this format:
+        [
+            {
+                "id": "the lead id exactly as given",
+                "quality_score": 8,
+                "priority": "High",
+                "recommended_action": "Call immediately",
+                "risk_factors": ["No phone number"],
+                "opportunity_assessment": "Strong intent, ready to buy",
+                "follow_up_suggestion": "Send property recommendations"
+            }
+        ]
+        ''')
+]
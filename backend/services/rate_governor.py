@@ -0,0 +1,173 @@
+"""
+Scrape Rate Governor
+Adaptive per-platform request pacing: backs off on throttling, probes back up on success
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+from services.rate_limiter import TokenBucketLimiter
+from services.usage_tracker import current_context
+
+# Error texts that mean the platform is pushing back rather than the request being bad
+THROTTLE_MARKERS = (
+    '429', 'too many requests', 'toomanyrequests', 'rate limit', 'please wait', 'try again later',
+    'temporarily blocked'
+)
+
+class RateGovernor:
+    def __init__(self, platform: str, delay_min: float = None, delay_max: float = None,
+                 requests_per_minute: float = None):
+        """Initialize pacing from SCRAPING_DELAY_MIN/MAX (seconds) and SCRAPING_RATE_LIMIT (req/min)"""
+        self.platform = platform
+        self.delay_min = float(delay_min if delay_min is not None else os.getenv('SCRAPING_DELAY_MIN', 2))
+        self.delay_max = max(self.delay_min, float(
+            delay_max if delay_max is not None else os.getenv('SCRAPING_DELAY_MAX', 5)
+        ))
+        self.backoff_factor = float(os.getenv('SCRAPING_BACKOFF_FACTOR', 2))
+        self.backoff_max = max(self.delay_max, float(os.getenv('SCRAPING_BACKOFF_MAX', 300)))
+        self.probe_factor = float(os.getenv('SCRAPING_PROBE_FACTOR', 0.8))
+        self.jitter = float(os.getenv('SCRAPING_JITTER', 0.2))
+        
+        # Sustained ceiling shared by all workers; the adaptive interval spaces requests under it
+        requests_per_minute = requests_per_minute or float(os.getenv('SCRAPING_RATE_LIMIT', 10))
+        self.limiter = TokenBucketLimiter(f"scrape:{platform}", requests_per_minute)
+        self.ceiling_interval = 60 / requests_per_minute
+        # Spacing below the ceiling's would only queue on the limiter, so probing stops at whichever is slower
+        self.min_interval = max(self.delay_min, self.ceiling_interval)
+        if self.min_interval > self.delay_min:
+            logging.info(
+                f"{platform}: SCRAPING_RATE_LIMIT={requests_per_minute:g}/min spaces requests at least "
+                f"{self.min_interval:.1f}s apart (above SCRAPING_DELAY_MIN={self.delay_min:g}s)"
+            )
+        
+        self._lock = threading.Lock()
+        self.interval = self.min_interval
+        self._next_at = 0.0
+        self._random = random.Random()
+        
+        self.requests = 0
+        self.successes = 0
+        self.throttles = {}
+        self.backoffs = 0
+        self.total_wait_seconds = 0.0
+        self.max_interval = self.interval
+        self.last_throttle = None
+        # Wait time per scheduler scan (most recent scans only)
+        self.scan_waits = OrderedDict()
+    
+    def wait(self) -> float:
+        """Block until the next request may go out; returns seconds waited"""
+        start = time.time()
+        with self._lock:
+            # Reserve a slot so concurrent callers are spaced too, not released together
+            interval = self.interval * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+            slot = max(start, self._next_at)
+            self._next_at = slot + interval
+            self.requests += 1
+        
+        if slot > start:
+            time.sleep(slot - start)
+        self.limiter.acquire()
+        
+        waited = time.time() - start
+        self._record_wait(waited)
+        return waited
+    
+    def _record_wait(self, waited: float):
+        """Add wait time to the totals of the platform and the current scan"""
+        scan_id = current_context().get('scan_id', '')
+        with self._lock:
+            self.total_wait_seconds += waited
+            if scan_id:
+                self.scan_waits[scan_id] = self.scan_waits.pop(scan_id, 0.0) + waited
+                while len(self.scan_waits) > 50:
+                    self.scan_waits.popitem(last=False)
+    
+    def record_success(self):
+        """Probe back towards the configured rate after a request went through"""
+        with self._lock:
+            self.successes += 1
+            self.interval = max(self.min_interval, self.interval * self.probe_factor)
+    
+    def record_throttle(self, reason: str):
+        """Slow down after a 429, login wall or empty page"""
+        with self._lock:
+            self.throttles[reason] = self.throttles.get(reason, 0) + 1
+            self.backoffs += 1
+            self.interval = min(self.backoff_max, max(self.delay_max, self.interval * self.backoff_factor))
+            self.max_interval = max(self.max_interval, self.interval)
+            self.last_throttle = time.time()
+            # The cool-down starts now, not after requests already queued at the old pace
+            self._next_at = max(self._next_at, time.time() + self.interval)
+            interval = self.interval
+        logging.warning(f"{self.platform} throttled ({reason}), spacing requests {interval:.1f}s apart")
+    
+    def record_error(self, error: Exception) -> bool:
+        """Back off if an error is the platform throttling us; returns whether it was"""
+        reason = self.throttle_reason(error)
+        if reason:
+            self.record_throttle(reason)
+        return reason is not None
+    
+    @staticmethod
+    def throttle_reason(error: Exception) -> str:
+        """Classify an error as throttling ('rate_limited' or 'login_wall'), or None"""
+        text = f"{type(error).__name__} {error}".lower()
+        if 'login' in text or 'checkpoint' in text:
+            return 'login_wall'
+        if any(marker in text for marker in THROTTLE_MARKERS):
+            return 'rate_limited'
+        return None
+    
+    def scan_wait_seconds(self, scan_id: str) -> float:
+        """Seconds this platform spent waiting during one scan"""
+        with self._lock:
+            return round(self.scan_waits.get(scan_id, 0.0), 3)
+    
+    def get_stats(self) -> Dict:
+        """Get current pacing and throttle counters"""
+        with self._lock:
+            return {
+                'interval_seconds': round(self.interval, 3),
+                'delay_min': self.delay_min,
+                'delay_max': self.delay_max,
+                'ceiling_interval_seconds': round(self.ceiling_interval, 3),
+                'min_interval_seconds': round(self.min_interval, 3),
+                'backoff_max': self.backoff_max,
+                'max_interval_seconds': round(self.max_interval, 3),
+                'requests': self.requests,
+                'successes': self.successes,
+                'throttles': dict(self.throttles),
+                'backoffs': self.backoffs,
+                'last_throttle': self.last_throttle,
+                'total_wait_seconds': round(self.total_wait_seconds, 3),
+                'limiter': self.limiter.get_stats()
+            }
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+def get_governor(platform: str) -> RateGovernor:
+    """Shared governor of a platform (one per process)"""
+    with _governors_lock:
+        if platform not in _governors:
+            _governors[platform] = RateGovernor(platform)
+        return _governors[platform]
+
+def scan_wait_seconds(scan_id: str) -> Dict[str, float]:
+    """Seconds spent waiting per platform during one scan"""
+    with _governors_lock:
+        governors = dict(_governors)
+    return {platform: governor.scan_wait_seconds(scan_id) for platform, governor in governors.items()}
+
+def get_stats() -> Dict:
+    """Pacing stats of every platform governor"""
+    with _governors_lock:
+        governors = dict(_governors)
+    return {platform: governor.get_stats() for platform, governor in governors.items()}
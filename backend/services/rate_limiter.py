@@ -0,0 +1,190 @@
+"""
+Rate Limiter Service
+Token-bucket limiter shared across threads and worker processes through SQLite
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+class TokenBucketLimiter:
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float = None, db_path: str = None):
+        """Initialize limiter with requests-per-minute and optional tokens-per-minute budgets"""
+        self.name = name
+        self.requests_per_minute = float(requests_per_minute)
+        self.tokens_per_minute = float(tokens_per_minute) if tokens_per_minute else None
+        self.db_path = db_path or os.getenv('RATE_LIMIT_DB_PATH', '../data/cache/rate_limits.db')
+        
+        # Wait statistics for this process
+        self._stats_lock = threading.Lock()
+        self.total_acquired = 0
+        self.total_waited = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.waiting_now = 0
+        
+        # In-process fallback when the shared database is unavailable
+        self._local_lock = threading.Lock()
+        self._local_state = None
+        self.shared = True
+        
+        try:
+            self._init_db()
+        except Exception as e:
+            logging.warning(f"Shared rate limit store unavailable, limiting per process: {e}")
+            self.shared = False
+        
+        logging.info(
+            f"Rate limiter '{name}' initialized ({self.requests_per_minute:g} req/min, "
+            f"{self.tokens_per_minute or 'unlimited'} tokens/min, shared={self.shared})"
+        )
+    
+    def _init_db(self):
+        """Create the shared bucket table"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    requests REAL NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def acquire(self, tokens: int = 1) -> float:
+        """Block until one request and `tokens` tokens are available; returns seconds waited"""
+        start = time.time()
+        waiting = False
+        
+        try:
+            while True:
+                wait = self._take_shared(tokens) if self.shared else self._take_local(tokens)
+                if wait <= 0:
+                    break
+                
+                if not waiting:
+                    waiting = True
+                    with self._stats_lock:
+                        self.waiting_now += 1
+                
+                # Re-check at least once a second - other workers draw from the same bucket
+                time.sleep(min(wait, 1.0))
+        finally:
+            if waiting:
+                with self._stats_lock:
+                    self.waiting_now -= 1
+        
+        waited = time.time() - start
+        with self._stats_lock:
+            self.total_acquired += 1
+            if waiting:
+                self.total_waited += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        
+        if waited >= 1:
+            logging.info(f"Rate limiter '{self.name}' queued caller for {waited:.1f}s")
+        
+        return waited
+    
+    def _refill(self, requests: float, tokens: float, elapsed: float):
+        """Refill both buckets for the elapsed time"""
+        requests = min(self.requests_per_minute, requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            tokens = min(self.tokens_per_minute, tokens + elapsed * self.tokens_per_minute / 60)
+        return requests, tokens
+    
+    def _consume(self, requests: float, tokens: float, needed_tokens: int):
+        """Try to take one request and the needed tokens; returns (requests, tokens, wait_seconds)"""
+        if self.tokens_per_minute:
+            # A single oversized request may use the whole bucket but never waits forever
+            needed_tokens = min(needed_tokens, self.tokens_per_minute)
+        else:
+            needed_tokens = 0
+        
+        if requests >= 1 and tokens >= needed_tokens:
+            return requests - 1, tokens - needed_tokens, 0.0
+        
+        wait = 0.0
+        if requests < 1:
+            wait = (1 - requests) * 60 / self.requests_per_minute
+        if needed_tokens and tokens < needed_tokens:
+            wait = max(wait, (needed_tokens - tokens) * 60 / self.tokens_per_minute)
+        return requests, tokens, wait
+    
+    def _take_shared(self, needed_tokens: int) -> float:
+        """Take from the SQLite-backed bucket shared by all workers"""
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        except Exception as e:
+            logging.warning(f"Rate limit store error, limiting per process: {e}")
+            self.shared = False
+            return self._take_local(needed_tokens)
+        
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            row = conn.execute(
+                'SELECT requests, tokens, updated_at FROM buckets WHERE name = ?', (self.name,)
+            ).fetchone()
+            
+            if row:
+                requests, tokens = self._refill(row[0], row[1], now - row[2])
+            else:
+                requests, tokens = self.requests_per_minute, self.tokens_per_minute or 0
+            
+            requests, tokens, wait = self._consume(requests, tokens, needed_tokens)
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets (name, requests, tokens, updated_at) VALUES (?, ?, ?, ?)',
+                (self.name, requests, tokens, now)
+            )
+            conn.execute('COMMIT')
+            return wait
+        
+        except Exception as e:
+            logging.warning(f"Rate limit store error, limiting per process: {e}")
+            self.shared = False
+            return self._take_local(needed_tokens)
+        finally:
+            conn.close()
+    
+    def _take_local(self, needed_tokens: int) -> float:
+        """Take from the in-process bucket"""
+        with self._local_lock:
+            now = time.time()
+            if self._local_state is None:
+                requests, tokens = self.requests_per_minute, self.tokens_per_minute or 0
+            else:
+                last_requests, last_tokens, updated_at = self._local_state
+                requests, tokens = self._refill(last_requests, last_tokens, now - updated_at)
+            
+            requests, tokens, wait = self._consume(requests, tokens, needed_tokens)
+            self._local_state = (requests, tokens, now)
+            return wait
+    
+    def get_stats(self) -> Dict:
+        """Get limiter configuration and wait statistics"""
+        with self._stats_lock:
+            return {
+                'name': self.name,
+                'requests_per_minute': self.requests_per_minute,
+                'tokens_per_minute': self.tokens_per_minute,
+                'shared': self.shared,
+                'total_acquired': self.total_acquired,
+                'total_waited': self.total_waited,
+                'waiting_now': self.waiting_now,
+                'total_wait_seconds': round(self.total_wait_seconds, 3),
+                'avg_wait_seconds': round(self.total_wait_seconds / self.total_waited, 3) if self.total_waited else 0.0,
+                'max_wait_seconds': round(self.max_wait_seconds, 3)
+            }
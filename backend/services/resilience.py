@@ -0,0 +1,171 @@
+"""
+Resilience Helpers
+Retry with exponential backoff and a circuit breaker for external API calls
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict
+
+# Exception class names (anywhere in the MRO) that indicate a transient failure
+RETRYABLE_ERROR_NAMES = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError',
+    'DeadlineExceeded', 'GatewayTimeout', 'BadGateway', 'Aborted', 'RetryError',
+    'ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout', 'TimeoutError'
+}
+
+# Message fragments that indicate a transient failure
+RETRYABLE_MESSAGE_HINTS = (
+    '429', '500', '502', '503', '504', 'rate limit', 'quota', 'resource exhausted',
+    'timed out', 'timeout', 'temporarily', 'unavailable', 'connection reset'
+)
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call"""
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = None, base_delay: float = None,
+                 max_delay: float = None, max_elapsed: float = None):
+        """Initialize retry policy (exponential backoff with full jitter)"""
+        self.max_attempts = max_attempts or int(os.getenv('GEMINI_RETRY_MAX_ATTEMPTS', 4))
+        self.base_delay = base_delay or float(os.getenv('GEMINI_RETRY_BASE_DELAY', 1))
+        self.max_delay = max_delay or float(os.getenv('GEMINI_RETRY_MAX_DELAY', 30))
+        self.max_elapsed = max_elapsed or float(os.getenv('GEMINI_RETRY_MAX_ELAPSED', 60))
+        
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.give_ups = 0
+    
+    def is_retryable(self, error: Exception) -> bool:
+        """Check whether an error is worth retrying"""
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return True
+        if any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__):
+            return True
+        message = str(error).lower()
+        return any(hint in message for hint in RETRYABLE_MESSAGE_HINTS)
+    
+    def call(self, func: Callable[[], Any]) -> Any:
+        """Call func, retrying retryable errors until attempts or elapsed budget run out"""
+        start = time.time()
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            try:
+                return func()
+            except Exception as e:
+                if not self.is_retryable(e):
+                    raise
+                
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+                if attempt >= self.max_attempts or time.time() - start + delay > self.max_elapsed:
+                    with self._lock:
+                        self.give_ups += 1
+                    logging.warning(f"Giving up after {attempt} attempts: {e}")
+                    raise
+                
+                with self._lock:
+                    self.retries += 1
+                logging.warning(f"Transient error (attempt {attempt}/{self.max_attempts}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+    
+    def get_stats(self) -> Dict:
+        """Get retry statistics"""
+        with self._lock:
+            return {
+                'max_attempts': self.max_attempts,
+                'max_elapsed_seconds': self.max_elapsed,
+                'retries': self.retries,
+                'give_ups': self.give_ups
+            }
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None):
+        """Initialize circuit breaker"""
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv('GEMINI_CIRCUIT_FAILURE_THRESHOLD', 5))
+        self.reset_timeout = reset_timeout or float(os.getenv('GEMINI_CIRCUIT_RESET_SECONDS', 60))
+        
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.rejected_calls = 0
+        self.times_opened = 0
+        self._trial_in_flight = False
+    
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.time() - self.opened_at < self.reset_timeout:
+                    self.rejected_calls += 1
+                    raise CircuitOpenError(f"Circuit '{self.name}' is open")
+                # Cool-down elapsed - let one trial call probe the endpoint
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self.rejected_calls += 1
+                    raise CircuitOpenError(f"Circuit '{self.name}' is half-open, trial call in flight")
+                self._trial_in_flight = True
+    
+    def allows_calls(self) -> bool:
+        """Check (without side effects) whether a call would currently be let through"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.time() - self.opened_at >= self.reset_timeout
+            if self.state == self.HALF_OPEN:
+                return not self._trial_in_flight
+            return True
+    
+    def record_success(self):
+        """Record a successful call"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logging.info(f"Circuit '{self.name}' closed after successful trial call")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        """Record a failed call, opening the circuit past the threshold"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logging.warning(
+                        f"Circuit '{self.name}' opened after {self.consecutive_failures} consecutive failures"
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.time()
+    
+    def get_status(self) -> Dict:
+        """Get breaker state for health checks"""
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(0.0, round(self.reset_timeout - (time.time() - self.opened_at), 1))
+            return {
+                'name': self.name,
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'times_opened': self.times_opened,
+                'rejected_calls': self.rejected_calls,
+                'retry_in_seconds': retry_in
+            }
@@ -0,0 +1,205 @@
+"""
+Gemini Response Parser
+Fast JSON parsing with precompiled fallbacks and validation into typed result objects
+"""
+
+import json
+import re
+import threading
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+# Fallbacks for replies that wrap the JSON in prose or markdown fences
+_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(.*?)\s*```', re.DOTALL | re.IGNORECASE)
+
+_decoder = json.JSONDecoder()
+
+class ResponseParseError(ValueError):
+    """Raised when a response holds no JSON of the expected shape"""
+
+def _to_bool(value: Any) -> Optional[bool]:
+    """Coerce JSON-ish booleans ("true", "yes", 1)"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ('true', 'yes', 'y', '1'):
+            return True
+        if lowered in ('false', 'no', 'n', '0'):
+            return False
+    return None
+
+def _to_int(value: Any) -> Optional[int]:
+    """Coerce a score to int"""
+    try:
+        return int(round(float(value)))
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value: Any) -> Optional[float]:
+    """Coerce a confidence to float"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_str(value: Any) -> Optional[str]:
+    """Coerce a text field, treating empty/null-like values as missing"""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        value = ', '.join(str(part) for part in value)
+    value = str(value).strip()
+    return value if value and value.lower() not in ('null', 'none') else None
+
+class _Result:
+    # Fields that must be present (after coercion) for the result to be valid
+    REQUIRED = ()
+    
+    @classmethod
+    def from_dict(cls, data: Any):
+        """Validate and coerce a parsed JSON object into this result type"""
+        if not isinstance(data, dict):
+            raise ResponseParseError(f"{cls.__name__}: expected a JSON object, got {type(data).__name__}")
+        
+        values = {}
+        for result_field in fields(cls):
+            raw = data.get(result_field.name)
+            converter = result_field.metadata.get('convert')
+            values[result_field.name] = converter(raw) if converter and raw is not None else raw
+        
+        missing = [name for name in cls.REQUIRED if values.get(name) is None]
+        if missing:
+            raise ResponseParseError(f"{cls.__name__}: missing or invalid {', '.join(missing)}")
+        return cls(**values)
+    
+    def to_dict(self) -> Dict:
+        """Plain dict of the fields that were present"""
+        return {result_field.name: getattr(self, result_field.name)
+                for result_field in fields(self) if getattr(self, result_field.name) is not None}
+
+def _field(convert=None):
+    """Optional result field with a coercion function"""
+    return field(default=None, metadata={'convert': convert} if convert else {})
+
+@dataclass
+class LeadIntentResult(_Result):
+    REQUIRED = ('is_lead',)
+    
+    is_lead: Optional[bool] = _field(_to_bool)
+    id: Optional[str] = _field(_to_str)
+    property_type: Optional[str] = _field(_to_str)
+    location: Optional[str] = _field(_to_str)
+    budget_range: Optional[str] = _field(_to_str)
+    timeline: Optional[str] = _field(_to_str)
+    contact_available: Optional[bool] = _field(_to_bool)
+    contact_method: Optional[str] = _field(_to_str)
+    buying_intent: Optional[str] = _field(_to_str)
+    lead_score: Optional[int] = _field(_to_int)
+    language: Optional[str] = _field(_to_str)
+    confidence: Optional[float] = _field(_to_float)
+    contact: Optional[Dict] = _field(lambda value: value if isinstance(value, dict) else None)
+
+@dataclass
+class ScreenResult(_Result):
+    REQUIRED = ('is_lead',)
+    
+    is_lead: Optional[bool] = _field(_to_bool)
+    id: Optional[str] = _field(_to_str)
+    confidence: Optional[float] = _field(_to_float)
+
+@dataclass
+class ContactResult(_Result):
+    name: Optional[str] = _field(_to_str)
+    phone: Optional[str] = _field(_to_str)
+    email: Optional[str] = _field(_to_str)
+    whatsapp: Optional[str] = _field(_to_str)
+    social_handle: Optional[str] = _field(_to_str)
+    contact_phrase: Optional[str] = _field(_to_str)
+
+@dataclass
+class LeadQualityResult(_Result):
+    REQUIRED = ('quality_score',)
+    
+    quality_score: Optional[int] = _field(_to_int)
+    priority: Optional[str] = _field(_to_str)
+    recommended_action: Optional[str] = _field(_to_str)
+    risk_factors: Optional[List] = _field(lambda value: value if isinstance(value, list) else [str(value)])
+    opportunity_assessment: Optional[str] = _field(_to_str)
+    follow_up_suggestion: Optional[str] = _field(_to_str)
+    id: Optional[str] = _field(_to_str)
+
+class ResponseParser:
+    def __init__(self):
+        """Initialize parser counters"""
+        self._lock = threading.Lock()
+        self.stats = {'fast_path': 0, 'fallback': 0, 'failures': 0, 'retries': 0}
+    
+    def _count(self, key: str):
+        """Increment a counter"""
+        with self._lock:
+            self.stats[key] += 1
+    
+    def load_json(self, text: str, expected_type: type = dict) -> Any:
+        """Decode the JSON value of the expected type (dict or list) held in a response"""
+        text = (text or '').strip()
+        
+        # Fast path: structured output, or a model that followed the instructions
+        try:
+            value = json.loads(text)
+            if isinstance(value, expected_type):
+                self._count('fast_path')
+                return value
+        except ValueError:
+            pass
+        
+        candidates = [match.group(1) for match in _FENCE_PATTERN.finditer(text)]
+        opener = '{' if expected_type is dict else '['
+        start = text.find(opener)
+        if start != -1:
+            candidates.append(text[start:])
+        
+        for candidate in candidates:
+            try:
+                # raw_decode stops at the end of the first value, ignoring trailing prose
+                value, _ = _decoder.raw_decode(candidate.lstrip())
+            except ValueError:
+                continue
+            if isinstance(value, dict) and expected_type is list:
+                value = next((item for item in value.values() if isinstance(item, list)), None)
+            if isinstance(value, expected_type):
+                self._count('fallback')
+                return value
+        
+        self._count('failures')
+        raise ResponseParseError(f"No JSON {expected_type.__name__} found in response: {text[:120]!r}")
+    
+    def parse(self, text: str, result_type: type) -> _Result:
+        """Parse one response into a typed result"""
+        data = self.load_json(text, dict)
+        try:
+            return result_type.from_dict(data)
+        except ResponseParseError:
+            self._count('failures')
+            raise
+    
+    def parse_list(self, text: str, result_type: type) -> List[_Result]:
+        """Parse a batch response, skipping entries that fail validation"""
+        results = []
+        for item in self.load_json(text, list):
+            try:
+                results.append(result_type.from_dict(item))
+            except ResponseParseError:
+                continue
+        return results
+    
+    def record_retry(self):
+        """Count a request re-sent because its reply could not be parsed"""
+        self._count('retries')
+    
+    def get_stats(self) -> Dict:
+        """Get parser counters"""
+        with self._lock:
+            return dict(self.stats)
@@ -9,6 +9,7 @@ import threading
 import logging
 import requests
 import json
+import uuid
 from datetime import datetime
 import os
 
@@ -47,12 +48,37 @@ class SchedulerService:
             
             total_leads_found = 0
             
+            # Every request of this scan carries its id so Gemini usage can be attributed to it
+            scan_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+            headers = {'X-Scan-Id': scan_id}
+            
+            # Retry posts parked during a Gemini outage
+            try:
+                reprocess_response = requests.post(
+                    f"{self.backend_url}/api/leads/reprocess",
+                    json={},
+                    headers=headers,
+                    timeout=300  # 5 minutes timeout
+                )
+                
+                if reprocess_response.status_code == 200:
+                    reprocessed_leads = len(reprocess_response.json().get('leads', []))
+                    total_leads_found += reprocessed_leads
+                    if reprocessed_leads:
+                        logging.info(f"♻️ Parked posts: Found {reprocessed_leads} leads")
+                else:
+                    logging.warning(f"❌ Parked post reprocessing failed: {reprocess_response.status_code}")
+                    
+            except Exception as e:
+                logging.error(f"❌ Parked post reprocessing error: {e}")
+            
             # Instagram scanning
             try:
                 logging.info("📱 Scanning Instagram...")
                 instagram_response = requests.post(
                     f"{self.backend_url}/api/scrape/instagram",
                     json={"hashtags": self.config['hashtags']},
+                    headers=headers,
                     timeout=300  # 5 minutes timeout
                 )
                 
@@ -73,6 +99,7 @@ class SchedulerService:
                 facebook_response = requests.post(
                     f"{self.backend_url}/api/scrape/facebook",
                     json={"groups": self.config['facebook_groups']},
+                    headers=headers,
                     timeout=300  # 5 minutes timeout
                 )
                 
@@ -94,6 +121,7 @@ class SchedulerService:
                     youtube_response = requests.post(
                         f"{self.backend_url}/api/scrape/youtube",
                         json={"video_ids": self.config['youtube_videos']},
+                        headers=headers,
                         timeout=300  # 5 minutes timeout
                     )
                     
@@ -111,18 +139,71 @@ class SchedulerService:
             logging.info(f"🎉 Scan completed! Total leads found: {total_leads_found}")
             
             # Save scan results
-            self.save_scan_results(total_leads_found)
-            
+            self.save_scan_results(
+                total_leads_found, scan_id, self.get_scan_usage(scan_id), self.get_scan_waits(scan_id),
+                self.get_scan_pipelines(scan_id)
+            )
+        
         except Exception as e:
             logging.error(f"❌ Scan failed: {e}")
     
-    def save_scan_results(self, leads_count):
+    def get_scan_usage(self, scan_id):
+        """Fetch the Gemini tokens and cost spent by one scan"""
+        try:
+            response = requests.get(
+                f"{self.backend_url}/api/gemini/usage",
+                params={'scan_id': scan_id},
+                timeout=30
+            )
+            if response.status_code == 200:
+                return response.json().get('usage')
+            logging.warning(f"❌ Gemini usage lookup failed: {response.status_code}")
+        except Exception as e:
+            logging.error(f"❌ Gemini usage lookup error: {e}")
+        return None
+    
+    def get_scan_waits(self, scan_id):
+        """Fetch the seconds each platform's scraper spent rate-limited during one scan"""
+        try:
+            response = requests.get(
+                f"{self.backend_url}/api/scrape/governor",
+                params={'scan_id': scan_id},
+                timeout=30
+            )
+            if response.status_code == 200:
+                return response.json().get('scan_wait_seconds')
+            logging.warning(f"❌ Scrape wait lookup failed: {response.status_code}")
+        except Exception as e:
+            logging.error(f"❌ Scrape wait lookup error: {e}")
+        return None
+    
+    def get_scan_pipelines(self, scan_id):
+        """Fetch the per-stage item counts of the pipelines one scan ran"""
+        try:
+            response = requests.get(
+                f"{self.backend_url}/api/pipeline/stats",
+                params={'scan_id': scan_id},
+                timeout=30
+            )
+            if response.status_code == 200:
+                return response.json().get('stats', {}).get('stage_totals')
+            logging.warning(f"❌ Pipeline stats lookup failed: {response.status_code}")
+        except Exception as e:
+            logging.error(f"❌ Pipeline stats lookup error: {e}")
+        return None
+    
+    def save_scan_results(self, leads_count, scan_id=None, gemini_usage=None, scrape_wait_seconds=None,
+                          pipeline_stages=None):
         """Save scan results to file"""
         try:
             scan_data = {
                 'timestamp': datetime.now().isoformat(),
+                'scan_id': scan_id,
                 'leads_found': leads_count,
-                'status': 'completed'
+                'status': 'completed',
+                'gemini_usage': gemini_usage,
+                'scrape_wait_seconds': scrape_wait_seconds,
+                'pipeline_stages': pipeline_stages
             }
             
             # Create logs directory if it doesn't exist
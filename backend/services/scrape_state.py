@@ -0,0 +1,254 @@
+"""
+Scrape State Store
+Persistent seen-set and per-source high-water marks for incremental scraping
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+class ScrapeStateStore:
+    def __init__(self, db_path: str = None):
+        """Initialize SQLite-backed scrape state"""
+        self.db_path = db_path or os.getenv('SCRAPE_STATE_DB_PATH', '../data/cache/scrape_state.db')
+        self.seen_ttl = float(os.getenv('SCRAPE_SEEN_TTL_DAYS', 30)) * 86400
+        self._lock = threading.Lock()
+        self._memory = None
+        
+        try:
+            self._init_db()
+        except (OSError, sqlite3.Error) as e:
+            # An unwritable data directory must not stop the scrapers from starting
+            logging.warning(f"Scrape state {self.db_path} unavailable, keeping it in memory for this process: {e}")
+            self.db_path = f"file:scrape_state_{id(self)}?mode=memory&cache=shared"
+            # The shared in-memory database lives as long as one connection to it stays open
+            self._memory = sqlite3.connect(self.db_path, uri=True, check_same_thread=False)
+            self._init_db()
+    
+    def _init_db(self):
+        """Create the seen-set and high-water mark tables"""
+        directory = os.path.dirname(self.db_path) if self._memory is None else ''
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS seen_posts (
+                    platform TEXT NOT NULL,
+                    post_id TEXT NOT NULL,
+                    source TEXT,
+                    seen_at REAL NOT NULL,
+                    PRIMARY KEY (platform, post_id)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_seen_posts_seen_at ON seen_posts (seen_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS high_water_marks (
+                    platform TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    newest_timestamp REAL NOT NULL,
+                    newest_post_id TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (platform, source)
+                )
+            ''')
+            # Newest post of walks that stopped before reaching the mark; it becomes the mark once a walk completes
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pending_marks (
+                    platform TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    newest_timestamp REAL NOT NULL,
+                    newest_post_id TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (platform, source)
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _connect(self):
+        """Open a connection (one per operation keeps this safe across threads and workers)"""
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None, uri=self._memory is not None)
+    
+    def get_mark(self, platform: str, source: str) -> Optional[Dict]:
+        """High-water mark (newest post timestamp and id) of one source"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT newest_timestamp, newest_post_id FROM high_water_marks WHERE platform = ? AND source = ?',
+                (platform, source)
+            ).fetchone()
+        finally:
+            conn.close()
+        return {'timestamp': row[0], 'post_id': row[1]} if row else None
+    
+    def is_seen(self, platform: str, post_id: str) -> bool:
+        """Check whether a post was scraped before"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                'SELECT 1 FROM seen_posts WHERE platform = ? AND post_id = ?', (platform, str(post_id))
+            ).fetchone() is not None
+        finally:
+            conn.close()
+    
+    def commit(self, platform: str, source: str, post_ids: List[str], newest_timestamp: float = None,
+               newest_post_id: str = None, complete: bool = True):
+        """Record scraped posts and advance the source's high-water mark (never moves it back)"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(
+                    'INSERT OR REPLACE INTO seen_posts (platform, post_id, source, seen_at) VALUES (?, ?, ?, ?)',
+                    [(platform, str(post_id), source, now) for post_id in post_ids]
+                )
+                # A walk stopped part-way (limit, cancel, error) left unscraped posts below it: hold its newest post back
+                if complete:
+                    pending = conn.execute(
+                        'SELECT newest_timestamp, newest_post_id FROM pending_marks WHERE platform = ? AND source = ?',
+                        (platform, source)
+                    ).fetchone()
+                    if pending and (newest_timestamp is None or pending[0] > newest_timestamp):
+                        newest_timestamp, newest_post_id = pending
+                    conn.execute('DELETE FROM pending_marks WHERE platform = ? AND source = ?', (platform, source))
+                    table = 'high_water_marks'
+                else:
+                    table = 'pending_marks'
+                if newest_timestamp is not None:
+                    conn.execute(f'''
+                        INSERT INTO {table} (platform, source, newest_timestamp, newest_post_id, updated_at)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (platform, source) DO UPDATE SET
+                            newest_timestamp = excluded.newest_timestamp,
+                            newest_post_id = excluded.newest_post_id,
+                            updated_at = excluded.updated_at
+                        WHERE excluded.newest_timestamp > {table}.newest_timestamp
+                    ''', (platform, source, newest_timestamp, newest_post_id, now))
+                conn.execute('DELETE FROM seen_posts WHERE seen_at < ?', (now - self.seen_ttl,))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            finally:
+                conn.close()
+    
+    def reset(self, platform: str, source: str = None) -> int:
+        """Forget the high-water marks of a platform (or one source) so the next run rescans"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                if source:
+                    conn.execute('DELETE FROM pending_marks WHERE platform = ? AND source = ?', (platform, source))
+                    cursor = conn.execute(
+                        'DELETE FROM high_water_marks WHERE platform = ? AND source = ?', (platform, source)
+                    )
+                else:
+                    conn.execute('DELETE FROM pending_marks WHERE platform = ?', (platform,))
+                    cursor = conn.execute('DELETE FROM high_water_marks WHERE platform = ?', (platform,))
+                return cursor.rowcount
+            finally:
+                conn.close()
+    
+    def cursor(self, platform: str, source: str, stop_after_seen: int = None) -> 'ScrapeCursor':
+        """Start an incremental walk over one source's feed"""
+        if stop_after_seen is None:
+            stop_after_seen = int(os.getenv('SCRAPE_STOP_AFTER_SEEN', 3))
+        return ScrapeCursor(self, platform, source, stop_after_seen)
+    
+    def get_stats(self) -> Dict:
+        """Count seen posts and high-water marks per platform"""
+        try:
+            conn = self._connect()
+            try:
+                seen = dict(conn.execute('SELECT platform, COUNT(*) FROM seen_posts GROUP BY platform').fetchall())
+                marks = dict(conn.execute('SELECT platform, COUNT(*) FROM high_water_marks GROUP BY platform').fetchall())
+            finally:
+                conn.close()
+            return {'seen_posts': seen, 'high_water_marks': marks}
+        except Exception as e:
+            logging.error(f"Error reading scrape state: {e}")
+            return {}
+
+# Feeds are newest first: once a few posts in a row are at or below the mark, everything after them is known too
+class ScrapeCursor:
+    NEW = 'new'
+    SEEN = 'seen'
+    STOP = 'stop'
+    
+    def __init__(self, store: ScrapeStateStore, platform: str, source: str, stop_after_seen: int):
+        """Initialize a walk from the source's stored high-water mark"""
+        self.store = store
+        self.platform = platform
+        self.source = source
+        self.stop_after_seen = max(1, stop_after_seen)
+        self.mark = store.get_mark(platform, source)
+        
+        self.new_ids = []
+        self.newest_timestamp = None
+        self.newest_post_id = None
+        self.skipped = 0
+        self.stopped = False
+        self.exhausted = False
+        self._consecutive_known = 0
+        # Posts handed out as new but not yet recorded: the walk is not complete while any remain
+        self._unconfirmed = set()
+    
+    def check(self, post_id: str, timestamp: float = None) -> str:
+        """Classify the next post in the feed: new, already seen, or the point to stop walking"""
+        below_mark = timestamp is not None and self.mark is not None and timestamp <= self.mark['timestamp']
+        if not below_mark and not self.store.is_seen(self.platform, post_id):
+            self._consecutive_known = 0
+            self._unconfirmed.add(str(post_id))
+            return self.NEW
+        
+        self.skipped += 1
+        # Seen posts above the mark come from an earlier walk that stopped part-way: older posts may still be new
+        if not below_mark:
+            return self.SEEN
+        self._consecutive_known += 1
+        if self._consecutive_known >= self.stop_after_seen:
+            self.stopped = True
+            return self.STOP
+        return self.SEEN
+    
+    def end_of_feed(self):
+        """Note that the walk reached the end of the feed"""
+        self.exhausted = True
+    
+    @property
+    def complete(self) -> bool:
+        """Whether every post newer than the old mark has been recorded"""
+        return (self.stopped or self.exhausted) and not self._unconfirmed
+    
+    def add(self, post_id: str, timestamp: float = None):
+        """Record a newly scraped post"""
+        self.new_ids.append(str(post_id))
+        self._unconfirmed.discard(str(post_id))
+        if timestamp is not None and (self.newest_timestamp is None or timestamp > self.newest_timestamp):
+            self.newest_timestamp = timestamp
+            self.newest_post_id = str(post_id)
+    
+    def commit(self):
+        """Persist the new posts and, if the walk completed, the advanced high-water mark"""
+        try:
+            self.store.commit(self.platform, self.source, self.new_ids, self.newest_timestamp, self.newest_post_id,
+                              complete=self.complete)
+        except Exception as e:
+            logging.error(f"Error saving scrape state for {self.platform}/{self.source}: {e}")
+    
+    def summary(self) -> str:
+        """One-line description of the walk for logs"""
+        if self.stopped:
+            reason = 'reached already-scraped posts'
+        elif self.exhausted:
+            reason = 'feed exhausted'
+        else:
+            reason = 'stopped early, mark kept'
+        return f"{len(self.new_ids)} new, {self.skipped} already scraped ({reason})"
@@ -0,0 +1,99 @@
+"""
+Single-Flight Coalescing
+Concurrent callers asking for the same analysis share one in-flight call
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+# Result handed to waiters when the leader gave up without an answer - they retry themselves
+_RELEASED = object()
+
+class SingleFlight:
+    def __init__(self, name: str):
+        """Initialize an empty set of in-flight calls"""
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        
+        self.executed = 0
+        self.coalesced = 0
+    
+    def claim(self, key: str) -> Tuple[Future, bool]:
+        """Join the call in flight for key, or become its leader; returns (future, is_leader)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            
+            future = Future()
+            self._calls[key] = future
+            self.executed += 1
+            return future, True
+    
+    def resolve(self, key: str, result: Any = None, error: Exception = None):
+        """Finish the leader's call and wake every waiter"""
+        with self._lock:
+            future = self._calls.pop(key, None)
+        if future is None:
+            return
+        
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    def release(self, key: str):
+        """Give up a claim without a result (waiters run the call themselves)"""
+        with self._lock:
+            if key in self._calls:
+                self.executed -= 1
+        self.resolve(key, _RELEASED)
+    
+    def join(self, future: Future) -> Any:
+        """Wait for a call claimed by someone else (None if it was released without a result)"""
+        result = future.result()
+        if result is _RELEASED:
+            return None
+        with self._lock:
+            self.coalesced += 1
+        return result
+    
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Run func once per key at a time; concurrent callers share its result or error"""
+        while True:
+            future, leader = self.claim(key)
+            
+            if not leader:
+                try:
+                    result = future.result()
+                except Exception:
+                    with self._lock:
+                        self.coalesced += 1
+                    raise
+                if result is _RELEASED:
+                    continue
+                with self._lock:
+                    self.coalesced += 1
+                return result
+            
+            try:
+                result = func()
+            except Exception as e:
+                self.resolve(key, error=e)
+                raise
+            self.resolve(key, result)
+            return result
+    
+    def get_stats(self) -> Dict:
+        """Get coalescing statistics"""
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                'name': self.name,
+                'in_flight': len(self._calls),
+                'calls_executed': self.executed,
+                'calls_saved': self.coalesced,
+                'saved_ratio': round(self.coalesced / total, 3) if total else 0.0
+            }
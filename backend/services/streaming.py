@@ -0,0 +1,88 @@
+"""
+Scraper Streaming Helpers
+Cancellation tokens, item normalization and an async bridge for the scrapers' item iterators
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from contextlib import closing
+from typing import AsyncIterator, Callable, Dict, Iterator
+
+class CancelToken:
+    def __init__(self, parent: 'CancelToken' = None):
+        """Initialize an un-cancelled token (also cancelled whenever its parent is)"""
+        self._event = threading.Event()
+        self.parent = parent
+    
+    def cancel(self):
+        """Ask the scraper to stop after the item it is fetching"""
+        self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() was called on this token or its parent"""
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+def normalize_item(item: Dict, platform: str, source: str) -> Dict:
+    """Tag a scraped item with the platform and the source (hashtag, group, video) it came from"""
+    item.setdefault('platform', platform)
+    item.setdefault('scraped_from', source)
+    return item
+
+class _StreamError:
+    def __init__(self, error: Exception):
+        """Carries a producer exception across to the consumer"""
+        self.error = error
+
+_DONE = object()
+
+async def aiterate(iterate: Callable[..., Iterator[Dict]], *args, cancel: CancelToken = None,
+                   buffer: int = 100, **kwargs) -> AsyncIterator[Dict]:
+    """Run a scraper's item iterator on a worker thread and yield its items asynchronously"""
+    # At most `buffer` items wait for the consumer, so a slow consumer pauses the scraper instead of
+    # growing memory; leaving the loop early (break, aclose or task cancellation) cancels the scraper
+    cancel = cancel or CancelToken()
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max(1, buffer))
+    
+    def put(item) -> bool:
+        """Hand one item to the event loop, giving up once the consumer is gone"""
+        if cancel.cancelled:
+            return False
+        try:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        except RuntimeError:
+            # The event loop already closed
+            return False
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return True
+            except concurrent.futures.TimeoutError:
+                if cancel.cancelled:
+                    future.cancel()
+                    return False
+    
+    def produce():
+        """Drive the blocking iterator and forward its items"""
+        try:
+            with closing(iterate(*args, cancel=cancel, **kwargs)) as items:
+                for item in items:
+                    if not put(item):
+                        return
+        except Exception as e:
+            put(_StreamError(e))
+        put(_DONE)
+    
+    threading.Thread(target=produce, name=f"stream-{getattr(iterate, '__name__', 'scraper')}", daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StreamError):
+                raise item.error
+            yield item
+    finally:
+        cancel.cancel()
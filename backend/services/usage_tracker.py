@@ -0,0 +1,220 @@
+"""
+Gemini Usage Tracker
+Token counts, latency and cost per call type, rolled up per platform, scan and day
+"""
+
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Tuple
+
+# USD per million input/output tokens; GEMINI_PRICING overrides ("model=in:out,...")
+DEFAULT_PRICING = {
+    'gemini-2.0-flash-001': (0.10, 0.40),
+    'gemini-2.0-flash': (0.10, 0.40),
+    'gemini-2.0-flash-lite-001': (0.075, 0.30),
+    'gemini-2.0-flash-lite': (0.075, 0.30),
+    'gemini-1.5-flash': (0.075, 0.30),
+    'gemini-1.5-pro': (1.25, 5.00)
+}
+
+# Scan and platform of the work in progress (copied into analysis worker threads)
+_usage_context = contextvars.ContextVar('gemini_usage_context', default={})
+
+def current_context() -> Dict:
+    """Scan id and platform the current Gemini calls are attributed to"""
+    return _usage_context.get()
+
+@contextmanager
+def usage_context(**values):
+    """Attribute Gemini calls made inside the block to a scan and/or platform"""
+    merged = dict(_usage_context.get())
+    merged.update({name: value for name, value in values.items() if value})
+    token = _usage_context.set(merged)
+    try:
+        yield merged
+    finally:
+        _usage_context.reset(token)
+
+def set_scan(scan_id: str):
+    """Attribute the rest of this request's Gemini calls to a scan (None clears it)"""
+    context = {name: value for name, value in _usage_context.get().items() if name != 'scan_id'}
+    if scan_id:
+        context['scan_id'] = scan_id
+    _usage_context.set(context)
+
+def _parse_pricing(spec: str) -> Dict[str, Tuple[float, float]]:
+    """Parse "model=in:out,..." prices (USD per million tokens)"""
+    pricing = {}
+    for entry in (spec or '').split(','):
+        model, _, prices = entry.strip().partition('=')
+        if not prices:
+            continue
+        try:
+            input_price, _, output_price = prices.partition(':')
+            pricing[model.strip()] = (float(input_price), float(output_price or input_price))
+        except ValueError:
+            logging.warning(f"Ignoring invalid GEMINI_PRICING entry '{entry}'")
+    return pricing
+
+class UsageTracker:
+    def __init__(self, db_path: str = None):
+        """Initialize SQLite-backed usage rollups"""
+        self.db_path = db_path or os.getenv('GEMINI_USAGE_DB_PATH', '../data/cache/gemini_usage.db')
+        self.enabled = os.getenv('GEMINI_USAGE_TRACKING', 'True').lower() == 'true'
+        self.pricing = dict(DEFAULT_PRICING, **_parse_pricing(os.getenv('GEMINI_PRICING', '')))
+        self._lock = threading.Lock()
+        
+        if self.enabled:
+            try:
+                self._init_db()
+            except (OSError, sqlite3.Error) as e:
+                logging.error(f"Gemini usage store {self.db_path} unavailable, continuing without usage tracking: {e}")
+                self.enabled = False
+    
+    def _init_db(self):
+        """Create the usage rollup table"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS gemini_usage (
+                    day TEXT NOT NULL,
+                    scan_id TEXT NOT NULL,
+                    platform TEXT NOT NULL,
+                    call_type TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    errors INTEGER NOT NULL DEFAULT 0,
+                    estimated_calls INTEGER NOT NULL DEFAULT 0,
+                    input_tokens INTEGER NOT NULL DEFAULT 0,
+                    output_tokens INTEGER NOT NULL DEFAULT 0,
+                    latency_ms REAL NOT NULL DEFAULT 0,
+                    cost_usd REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, scan_id, platform, call_type, model)
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _connect(self):
+        """Open a connection (one per operation keeps this safe across threads and workers)"""
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+    
+    def cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        """Cost of one call in USD (0 for models without a price, e.g. the stub)"""
+        input_price, output_price = self.pricing.get(model, (0.0, 0.0))
+        return (input_tokens * input_price + output_tokens * output_price) / 1000000
+    
+    def record(self, call_type: str, model: str, input_tokens: int, output_tokens: int,
+               latency: float, estimated: bool = False, error: bool = False):
+        """Record one model call under the current scan/platform context"""
+        if not self.enabled:
+            return
+        
+        context = current_context()
+        row = (
+            date.today().isoformat(), context.get('scan_id', ''), context.get('platform', 'unknown'),
+            call_type, model, 0 if error else 1, 1 if error else 0, 1 if estimated and not error else 0,
+            input_tokens, output_tokens, latency * 1000, self.cost(model, input_tokens, output_tokens)
+        )
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    conn.execute('''
+                        INSERT INTO gemini_usage (day, scan_id, platform, call_type, model, calls, errors,
+                                                  estimated_calls, input_tokens, output_tokens, latency_ms, cost_usd)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (day, scan_id, platform, call_type, model) DO UPDATE SET
+                            calls = calls + excluded.calls,
+                            errors = errors + excluded.errors,
+                            estimated_calls = estimated_calls + excluded.estimated_calls,
+                            input_tokens = input_tokens + excluded.input_tokens,
+                            output_tokens = output_tokens + excluded.output_tokens,
+                            latency_ms = latency_ms + excluded.latency_ms,
+                            cost_usd = cost_usd + excluded.cost_usd
+                    ''', row)
+                finally:
+                    conn.close()
+        except Exception as e:
+            logging.error(f"Error recording Gemini usage: {e}")
+    
+    def _rollup(self, group_by: str, where: str = '', params: Tuple = ()) -> Dict:
+        """Sum usage grouped by one column"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(f'''
+                SELECT {group_by}, SUM(calls), SUM(errors), SUM(estimated_calls), SUM(input_tokens),
+                       SUM(output_tokens), SUM(latency_ms), SUM(cost_usd)
+                FROM gemini_usage {where} GROUP BY {group_by} ORDER BY {group_by}
+            ''', params).fetchall()
+        finally:
+            conn.close()
+        
+        rollup = {}
+        for key, calls, errors, estimated, input_tokens, output_tokens, latency_ms, cost in rows:
+            attempts = calls + errors
+            rollup[key or 'unattributed'] = {
+                'calls': calls,
+                'errors': errors,
+                'estimated_calls': estimated,
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'avg_latency_ms': round(latency_ms / attempts, 1) if attempts else None,
+                'cost_usd': round(cost, 6)
+            }
+        return rollup
+    
+    def scan_summary(self, scan_id: str) -> Dict:
+        """Totals and per call type/platform breakdown for one scan"""
+        if not self.enabled:
+            return {'enabled': False}
+        where, params = 'WHERE scan_id = ?', (scan_id,)
+        totals = self._rollup('scan_id', where, params).get(scan_id, {})
+        return dict(
+            totals,
+            by_call_type=self._rollup('call_type', where, params),
+            by_platform=self._rollup('platform', where, params)
+        )
+    
+    def get_report(self, days: int = 7, scans: int = 20) -> Dict:
+        """Usage rollups per call type, platform, model, recent day and recent scan"""
+        if not self.enabled:
+            return {'enabled': False}
+        try:
+            conn = self._connect()
+            try:
+                recent_days = [row[0] for row in conn.execute(
+                    'SELECT DISTINCT day FROM gemini_usage ORDER BY day DESC LIMIT ?', (days,)
+                )]
+                recent_scans = [row[0] for row in conn.execute('''
+                    SELECT scan_id FROM gemini_usage WHERE scan_id != ''
+                    GROUP BY scan_id ORDER BY MAX(day) DESC, scan_id DESC LIMIT ?
+                ''', (scans,))]
+            finally:
+                conn.close()
+            
+            report = {'enabled': self.enabled}
+            for group_by in ('call_type', 'platform', 'model'):
+                report[f'by_{group_by}'] = self._rollup(group_by)
+            if recent_days:
+                report['by_day'] = self._rollup(
+                    'day', f"WHERE day IN ({', '.join('?' * len(recent_days))})", tuple(recent_days)
+                )
+            if recent_scans:
+                report['by_scan'] = self._rollup(
+                    'scan_id', f"WHERE scan_id IN ({', '.join('?' * len(recent_scans))})", tuple(recent_scans)
+                )
+            return report
+        except Exception as e:
+            logging.error(f"Error reading Gemini usage: {e}")
+            return {'enabled': self.enabled, 'error': str(e)}
@@ -4,12 +4,14 @@ Handles YouTube comments scraping using youtube-comment-downloader
 """
 
 import logging
-from typing import List, Dict
+from typing import AsyncIterator, Iterator, List, Dict
 import time
-import random
+
+from services.rate_governor import get_governor
+from services.streaming import CancelToken, aiterate, normalize_item
 
 try:
-    from youtube_comment_downloader import YoutubeCommentDownloader
+    from youtube_comment_downloader import YoutubeCommentDownloader, SORT_BY_POPULAR
     YOUTUBE_AVAILABLE = True
 except ImportError:
     YOUTUBE_AVAILABLE = False
@@ -24,16 +26,24 @@ class YouTubeService:
         else:
             self.downloader = None
             logging.warning("YouTube Service initialized without comment downloader")
+        # Shared adaptive pacing of video requests
+        self.governor = get_governor('youtube')
     
     def scrape_comments(self, video_ids: List[str]) -> List[Dict]:
         """Scrape comments from YouTube videos"""
-        all_comments = []
-        
+        return list(self.iter_comments(video_ids))
+    
+    def iter_comments(self, video_ids: List[str], max_comments: int = 50,
+                      cancel: CancelToken = None) -> Iterator[Dict]:
+        """Yield up to max_comments comments per video as the downloader pages them in"""
         if not self.downloader:
             logging.error("YouTube comment downloader not available")
-            return all_comments
+            return
         
+        total = 0
         for video_id in video_ids:
+            if cancel and cancel.cancelled:
+                break
             try:
                 logging.info(f"Scraping YouTube comments from video: {video_id}")
                 
@@ -43,49 +53,51 @@ class YouTubeService:
                 else:
                     video_url = video_id
                 
-                comments = self._scrape_video_comments(video_url)
-                all_comments.extend(comments)
-                
-                # Delay between videos
-                time.sleep(random.randint(5, 10))
+                self.governor.wait()
+                for comment in self._iter_video_comments(video_url, video_id, max_comments, cancel):
+                    total += 1
+                    yield comment
                 
             except Exception as e:
                 logging.error(f"Error scraping video {video_id}: {e}")
                 continue
         
-        logging.info(f"Total YouTube comments scraped: {len(all_comments)}")
-        return all_comments
+        logging.info(f"Total YouTube comments scraped: {total}")
     
-    def _scrape_video_comments(self, video_url: str, max_comments: int = 50) -> List[Dict]:
-        """Scrape comments from a specific YouTube video"""
-        comments = []
+    def aiter_comments(self, video_ids: List[str], **kwargs) -> AsyncIterator[Dict]:
+        """Async variant of iter_comments"""
+        return aiterate(self.iter_comments, video_ids, **kwargs)
+    
+    def _iter_video_comments(self, video_url: str, video_id: str, max_comments: int = 50,
+                             cancel: CancelToken = None) -> Iterator[Dict]:
+        """Yield comments from a specific YouTube video"""
+        count = 0
         
         try:
-            # Get comments using the downloader
+            # Get comments using the downloader (a lazy generator: long threads are never held in memory)
             comments_data = self.downloader.get_comments_from_url(video_url, sort_by=SORT_BY_POPULAR)
             
-            count = 0
             for comment_data in comments_data:
-                if count >= max_comments:
+                if count >= max_comments or (cancel and cancel.cancelled):
                     break
                 
                 try:
                     # Process and structure comment data
                     processed_comment = self._process_comment_data(comment_data, video_url)
-                    if processed_comment:
-                        comments.append(processed_comment)
-                        count += 1
-                        
                 except Exception as e:
                     logging.error(f"Error processing comment: {e}")
                     continue
+                
+                if processed_comment:
+                    count += 1
+                    yield normalize_item(processed_comment, 'youtube', video_id)
             
-            logging.info(f"Scraped {len(comments)} comments from video")
+            logging.info(f"Scraped {count} comments from video")
+            self.governor.record_success()
             
         except Exception as e:
             logging.error(f"Error scraping comments from {video_url}: {e}")
-        
-        return comments
+            self.governor.record_error(e)
     
     def _process_comment_data(self, comment_data: Dict, video_url: str) -> Dict:
         """Process and structure comment data"""
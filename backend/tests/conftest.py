@@ -0,0 +1,40 @@
+"""
+Test Configuration
+Backend modules run against temporary data paths and the offline stub model (no API key, no network)
+"""
+
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Every on-disk store, pointed into the test's temporary directory
+DATA_PATHS = {
+    'GEMINI_CACHE_PATH': 'gemini_cache.db',
+    'PARKED_ITEMS_DB_PATH': 'parked_items.db',
+    'RATE_LIMIT_DB_PATH': 'rate_limits.db',
+    'GEMINI_USAGE_DB_PATH': 'gemini_usage.db',
+    'SCRAPE_STATE_DB_PATH': 'scrape_state.db',
+    'NEAR_DUPLICATE_INDEX_PATH': 'near_duplicates.json',
+    'LEAD_CLASSIFIER_MODEL_PATH': 'lead_classifier.json',
+    'GEMINI_RECORDINGS_PATH': 'gemini_recordings.jsonl',
+    'PIPELINE_LEADS_PATH': 'leads.jsonl',
+    'INSTAGRAM_SESSION_DIR': 'sessions'
+}
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Fresh data directory, stub Gemini backend and deterministic settings for each test"""
+    for variable, name in DATA_PATHS.items():
+        monkeypatch.setenv(variable, str(tmp_path / name))
+    monkeypatch.setenv('GEMINI_BACKEND', 'stub')
+    monkeypatch.setenv('LEAD_PREFILTER_AUDIT_RATE', '0')
+    monkeypatch.setenv('GEMINI_RETRY_BASE_DELAY', '0.001')
+    monkeypatch.setenv('GEMINI_RETRY_MAX_DELAY', '0.001')
+    monkeypatch.setenv('GEMINI_RATE_LIMIT', '100000')
+    monkeypatch.setenv('PIPELINE_BATCH_WAIT_MS', '20')
+    return tmp_path
@@ -0,0 +1,75 @@
+import time
+
+from services.analysis_cache import AnalysisCache
+
+def test_round_trip_and_key_lookup():
+    cache = AnalysisCache()
+    cache.set('intent', 'Need a 3BHK', 'v1', 'model-a', {'is_lead': True})
+    
+    assert cache.get('intent', 'Need a 3BHK', 'v1', 'model-a') == {'is_lead': True}
+    assert cache.get('intent', 'Need a 3BHK', 'v1', 'model-b') is None
+    key = AnalysisCache.make_key('intent', 'Need a 3BHK', 'v1', 'model-a')
+    assert cache.get_by_key(key) == {'is_lead': True}
+
+def test_key_depends_on_kind_version_and_model_but_not_whitespace():
+    key = AnalysisCache.make_key('intent', 'Need  a 3BHK ', 'v1', 'model-a')
+    
+    assert key == AnalysisCache.make_key('intent', 'Need a 3BHK', 'v1', 'model-a')
+    assert key != AnalysisCache.make_key('screen', 'Need a 3BHK', 'v1', 'model-a')
+    assert key != AnalysisCache.make_key('intent', 'Need a 3BHK', 'v2', 'model-a')
+    assert key != AnalysisCache.make_key('intent', 'Need a 3BHK', 'v1', 'model-b')
+
+def test_expired_entries_miss():
+    cache = AnalysisCache(ttl_hours=1)
+    cache.set('intent', 'Need a 3BHK', 'v1', 'model-a', {'is_lead': True})
+    cache._conn.execute('UPDATE analyses SET created_at = ?', (time.time() - 7200,))
+    
+    assert cache.get('intent', 'Need a 3BHK', 'v1', 'model-a') is None
+    assert cache.get_stats()['entries'] == 0
+
+def test_invalidate_by_kind():
+    cache = AnalysisCache()
+    cache.set('intent', 'a post', 'v1', 'model-a', {'is_lead': True})
+    cache.set('screen', 'a post', 'v1', 'model-a', {'is_lead': True})
+    
+    assert cache.invalidate('screen') == 1
+    assert cache.get('screen', 'a post', 'v1', 'model-a') is None
+    assert cache.get('intent', 'a post', 'v1', 'model-a') is not None
+
+def test_purge_stale_versions_keeps_the_current_one():
+    cache = AnalysisCache()
+    for version in ('v1', 'v2'):
+        cache.set('intent', 'a post', version, 'model-a', {'version': version})
+    
+    assert cache.purge_stale_versions({'intent': 'v2'}) == 1
+    assert cache.get('intent', 'a post', 'v1', 'model-a') is None
+    assert cache.get('intent', 'a post', 'v2', 'model-a') == {'version': 'v2'}
+
+def test_size_eviction_drops_least_recently_used():
+    cache = AnalysisCache(max_entries=2)
+    for index in range(3):
+        cache.set('intent', f'post {index}', 'v1', 'model-a', {'index': index})
+    cache.get('intent', 'post 0', 'v1', 'model-a')
+    cache._conn.execute("UPDATE analyses SET last_access = 0 WHERE content = 'post 1'")
+    cache.evict()
+    
+    assert cache.get('intent', 'post 1', 'v1', 'model-a') is None
+    assert cache.get('intent', 'post 0', 'v1', 'model-a') == {'index': 0}
+
+def test_unwritable_path_disables_cache(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    cache = AnalysisCache(db_path=str(blocker / 'cache.db'))
+    
+    assert cache.enabled is False
+    cache.set('intent', 'a post', 'v1', 'model-a', {'is_lead': True})
+    assert cache.get('intent', 'a post', 'v1', 'model-a') is None
+
+def test_purge_keeps_every_live_version():
+    cache = AnalysisCache()
+    for version in ('v1', 'v2', 'v3'):
+        cache.set('intent', 'a post', version, 'model-a', {'version': version})
+    
+    assert cache.purge_stale_versions({'intent': ['v2', 'v3']}) == 1
+    assert cache.get('intent', 'a post', 'v1', 'model-a') is None
+    assert cache.get('intent', 'a post', 'v3', 'model-a') == {'version': 'v3'}
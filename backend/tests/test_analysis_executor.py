@@ -0,0 +1,43 @@
+import threading
+import time
+
+import pytest
+
+from services import analysis_executor
+from services.analysis_executor import AnalysisExecutor
+
+@pytest.fixture(autouse=True)
+def fresh_slots(monkeypatch):
+    monkeypatch.setenv('GEMINI_MAX_CONCURRENCY', '2')
+    monkeypatch.setattr(analysis_executor, '_call_slots', None)
+
+def test_map_preserves_order_and_isolates_failures():
+    def work(item):
+        if item == 3:
+            raise ValueError('bad item')
+        time.sleep(0.01 * (5 - item))
+        return item * 10
+    
+    assert AnalysisExecutor().map(work, range(5)) == [0, 10, 20, None, 40]
+
+def test_model_calls_are_capped_across_executors():
+    executors = [AnalysisExecutor(), AnalysisExecutor()]
+    
+    def call(executor):
+        with executor.model_call():
+            time.sleep(0.05)
+    
+    threads = [threading.Thread(target=call, args=(executors[n % 2],)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert executors[0].slots is executors[1].slots
+    stats = [executor.get_stats() for executor in executors]
+    assert sum(stat['calls'] for stat in stats) == 6
+    assert all(stat['max_in_flight'] <= 2 for stat in stats)
+    assert sum(stat['total_slot_wait_seconds'] for stat in stats) > 0
+
+def test_single_worker_runs_inline():
+    assert AnalysisExecutor(max_workers=1).map(lambda item: item + 1, [1, 2]) == [2, 3]
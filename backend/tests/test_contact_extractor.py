@@ -0,0 +1,63 @@
+import pytest
+
+from utils.contact_extractor import ContactExtractor
+
+@pytest.mark.parametrize('value, expected', [
+    ('98765 43210', '+919876543210'),
+    ('+91-98765-43210', '+919876543210'),
+    ('09876543210', '+919876543210'),
+    ('0091 9876543210', '+919876543210'),
+    ('12345 67890', None),
+    ('44 9876543210', None),
+    ('98765', None),
+    ('', None)
+])
+def test_normalize_phone_to_e164(value, expected):
+    assert ContactExtractor().normalize_phone(value) == expected
+
+def test_extracts_every_contact_field():
+    contact = ContactExtractor().extract(
+        'Call me at 98765 43210 or whatsapp 9123456789, mail Ravi@Example.com, my name is Ravi Kumar, insta @ravi.homes'
+    )
+    
+    assert contact['name'] == 'Ravi Kumar'
+    assert contact['phone'] == '+919876543210'
+    assert contact['whatsapp'] == '+919123456789'
+    assert contact['email'] == 'ravi@example.com'
+    assert contact['social_handle'] == '@ravi.homes'
+    assert contact['phones'] == ['+919876543210', '+919123456789']
+
+@pytest.mark.parametrize('text', [
+    'I am Interested in a 3BHK, call 9876543210',
+    'I am Looking for a flat in Sector 65',
+    "Hi, I'm Urgent buyer",
+    'This is Gurgaon at its best'
+])
+def test_phrases_that_are_not_introductions_give_no_name(text):
+    assert ContactExtractor().extract(text)['name'] is None
+
+def test_whatsapp_link():
+    extractor = ContactExtractor()
+    contact = extractor.extract('Details on wa.me/919988776655')
+    
+    assert contact['whatsapp'] == '+919988776655'
+    assert extractor.has_contact(contact)
+
+def test_no_contact():
+    extractor = ContactExtractor()
+    
+    assert not extractor.has_contact(extractor.extract('Looking for a 2BHK in sector 56'))
+
+def test_merge_keeps_local_values_and_normalizes_llm_phones():
+    extractor = ContactExtractor()
+    
+    merged = extractor.merge({'phone': None, 'email': 'a@b.com'},
+                             {'phone': '98765 43210', 'email': 'x@y.com', 'name': 'N/A'})
+    assert merged == {'phone': '+919876543210', 'email': 'a@b.com'}
+    assert extractor.merge({}, {'phone': '123'}) == {'phone': None}
+
+def test_merge_prefers_the_llm_name():
+    extractor = ContactExtractor()
+    
+    assert extractor.merge({'name': 'Ravi'}, {'name': 'Ravi Kumar'})['name'] == 'Ravi Kumar'
+    assert extractor.merge({'name': 'Ravi'}, {'name': 'unknown'})['name'] == 'Ravi'
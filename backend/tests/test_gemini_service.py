@@ -0,0 +1,151 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services.gemini_service import GeminiService
+from services.pipeline import LeadPipelineFactory
+from services.usage_tracker import usage_context
+
+LEAD_POST = {'shortcode': 'lead1', 'caption': 'Looking to buy 3BHK flat in sector 65 gurgaon budget 1.5 cr call 9876543210'}
+CROSS_POST = {'shortcode': 'lead2', 'caption': LEAD_POST['caption'] + ' #m3m #realestate'}
+OTHER_POST = {'shortcode': 'other1', 'caption': 'Sunset at the beach, lovely evening with friends'}
+
+@pytest.fixture
+def gemini():
+    return GeminiService()
+
+@pytest.fixture
+def extract_calls(gemini, monkeypatch):
+    """Count calls that reach the extraction model"""
+    calls = []
+    model = gemini.tier_models['extract']
+    generate = model.generate_content
+    
+    def counted(*args, **kwargs):
+        calls.append(1)
+        return generate(*args, **kwargs)
+    
+    monkeypatch.setattr(model, 'generate_content', counted)
+    return calls
+
+def test_find_leads_end_to_end(gemini):
+    leads = gemini.analyze_posts_for_leads([LEAD_POST, OTHER_POST])
+    
+    assert len(leads) == 1
+    lead = leads[0]
+    assert lead['phone'] == '+919876543210'
+    assert lead['requirement'] == '3 BHK Apartment'
+    assert lead['location'] == 'Sector 65'
+    assert (lead['budget_min'], lead['budget_max']) == (15000000, 15000000)
+    assert lead['post_url'] == 'https://www.instagram.com/p/lead1/'
+    assert gemini.get_stats()['cascade']['tiers']['rules']['entered'] == 2
+
+def test_repeat_analysis_is_served_from_cache(gemini, extract_calls):
+    gemini.analyze_posts_for_leads([LEAD_POST])
+    gemini.analyze_posts_for_leads([LEAD_POST])
+    
+    assert len(extract_calls) == 1
+
+def test_near_duplicate_reuses_canonical_analysis(gemini, extract_calls):
+    gemini.analyze_posts_for_leads([LEAD_POST])
+    leads = gemini.analyze_posts_for_leads([CROSS_POST])
+    
+    assert len(extract_calls) == 1
+    assert leads[0]['canonical_post_id'] == 'instagram:lead1'
+    entry = gemini.near_duplicates.entries['instagram:lead1']
+    assert 'analysis' not in entry and entry['analysis_ref']['cache_key']
+
+def test_near_duplicate_is_reanalyzed_after_cache_invalidation(gemini, extract_calls):
+    gemini.analyze_posts_for_leads([LEAD_POST])
+    gemini.invalidate_cache()
+    leads = gemini.analyze_posts_for_leads([CROSS_POST])
+    
+    # The canonical analysis is gone, so the copy must not be answered from the index
+    assert len(extract_calls) == 2
+    assert len(leads) == 1
+
+def test_lead_quality_is_scored_in_batches(gemini, extract_calls):
+    leads = gemini.analyze_posts_for_leads([LEAD_POST])
+    calls_before = len(extract_calls)
+    scored = gemini.analyze_lead_quality([dict(leads[0], name=f'Buyer {n}') for n in range(5)])
+    
+    assert len(scored) == 5
+    assert all(lead['quality_score'] and lead['priority'] for lead in scored)
+    assert len(extract_calls) - calls_before == 1
+
+def test_stub_backend_needs_no_api_key(gemini, monkeypatch):
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    
+    assert GeminiService().get_stats()['backend']['mode'] == 'stub'
+
+def test_model_calls_are_attributed_to_the_scan(gemini):
+    with usage_context(scan_id='scan-1'):
+        gemini.analyze_posts_for_leads([LEAD_POST])
+    
+    summary = gemini.get_usage('scan-1')
+    assert summary['calls'] >= 1
+    assert summary['by_platform'].keys() == {'instagram'}
+
+def train_classifier(gemini):
+    """Fit the local classifier on a few labeled posts"""
+    samples = [{'content': f'looking to buy {n} bhk flat in gurgaon budget {n} cr call me', 'is_lead': True,
+                'lead_score': 8} for n in range(1, 6)]
+    samples += [{'content': f'beautiful sunset photo number {n} at the beach today', 'is_lead': False,
+                 'lead_score': 1} for n in range(1, 6)]
+    gemini.classifier.fit(samples, epochs=20)
+
+def test_outage_parks_posts_and_reprocess_replaces_degraded_lead(gemini):
+    gemini.retry_policy.max_attempts = 1
+    train_classifier(gemini)
+    post = {'shortcode': 'L1', 'caption': 'Looking to buy 3 bhk flat in gurgaon budget 2 cr call me 9876543210'}
+    
+    gemini.backend.faults.error_rate = 1.0
+    degraded = gemini.analyze_posts_for_leads([post])
+    assert [(lead['analysis_source'], lead['provisional_id']) for lead in degraded] == [('local_classifier', 'instagram:L1')]
+    assert gemini.parked.count() == {'post': 1}
+    
+    # Still failing: the post stays parked and no second degraded lead is emitted
+    gemini.circuit_breaker.record_success()
+    result = gemini.reprocess_parked()
+    assert result == {'leads': [], 'retracted_provisional_ids': []}
+    assert gemini.parked.count() == {'post': 1}
+    
+    gemini.backend.faults.error_rate = 0.0
+    gemini.circuit_breaker.record_success()
+    result = gemini.reprocess_parked()
+    assert [lead['replaces_provisional_id'] for lead in result['leads']] == ['instagram:L1']
+    assert gemini.parked.count() == {}
+
+def test_classifier_verdicts_do_not_grade_the_prefilter(gemini):
+    gated = {'is_lead': False, 'lead_score': 1, 'confidence': 0.9, 'exit_tier': 'classifier'}
+    gemini._analyze_candidate(('k', OTHER_POST['caption'], OTHER_POST), gated, meta={'passed_filter': True})
+    
+    assert sum(gemini.prefilter.confusion.values()) == 0
+
+def test_unparseable_reply_is_not_parked(gemini, monkeypatch):
+    train_classifier(gemini)
+    monkeypatch.setattr(gemini.tier_models['extract'], 'generate_content', lambda *args, **kwargs: SimpleNamespace(text='no json'))
+    post = {'shortcode': 'L1', 'caption': 'Looking to buy 3 bhk flat in gurgaon budget 2 cr call me 9876543210'}
+    
+    # Asking again later would get the same reply: the local verdict is final, not provisional
+    leads = gemini.analyze_posts_for_leads([post])
+    assert [(lead['analysis_source'], 'provisional_id' in lead) for lead in leads] == [('local_classifier', False)]
+    assert gemini.parked.count() == {}
+
+def test_leads_keep_every_matched_hashtag(gemini):
+    leads = gemini.analyze_posts_for_leads([dict(LEAD_POST, hashtag='gurgaon', hashtags=['gurgaon', 'm3m'])])
+    
+    assert leads[0]['hashtags'] == ['gurgaon', 'm3m']
+
+def test_lead_pipeline_persists_leads(gemini, data_dir):
+    posts = [LEAD_POST, OTHER_POST, {'shortcode': 'short', 'caption': 'hi'}]
+    pipeline = LeadPipelineFactory(gemini).build('instagram', lambda cancel: iter(posts))
+    
+    leads = list(pipeline.run())
+    assert [lead['post_url'] for lead in leads] == ['https://www.instagram.com/p/lead1/']
+    persisted = [json.loads(line) for line in (data_dir / 'leads.jsonl').read_text().splitlines()]
+    assert [lead['post_url'] for lead in persisted] == ['https://www.instagram.com/p/lead1/']
+    stages = pipeline.get_stats()['stages']
+    assert stages['prefilter']['items_in'] == 3
+    assert stages['persist']['items_out'] == 1
@@ -0,0 +1,88 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('instaloader')
+
+from services.instaloader_pool import InstaloaderPool
+
+class FakeCookies(dict):
+    def get_dict(self):
+        return dict(self)
+
+def fake_loader():
+    """Stand-in for an Instaloader instance (no network)"""
+    return SimpleNamespace(context=SimpleNamespace(_session=SimpleNamespace(cookies=FakeCookies(), headers={})))
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = InstaloaderPool(size=2)
+    monkeypatch.setattr(pool, '_create', lambda slot: (slot, fake_loader()))
+    return pool
+
+def test_loaders_are_reused(pool):
+    with pool.acquire() as first:
+        pass
+    with pool.acquire() as second:
+        pass
+    
+    assert first is second
+    assert pool.get_stats()['created'] == 1
+
+def test_pool_never_grows_past_its_size(pool):
+    release = threading.Event()
+    borrowed = []
+    
+    def borrow():
+        with pool.acquire() as loader:
+            borrowed.append(loader)
+            release.wait()
+    
+    threads = [threading.Thread(target=borrow) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while len(borrowed) < 2:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert pool.get_stats()['created'] == 2
+    assert len({id(loader) for loader in borrowed}) == 2
+
+def test_session_cookies_are_saved_and_restored(data_dir):
+    pool = InstaloaderPool(size=1)
+    loader = fake_loader()
+    loader.context._session.cookies['sessionid'] = 'abc'
+    pool._save(0, loader)
+    
+    assert (data_dir / 'sessions' / 'instagram_0.json').exists()
+    assert pool.get_stats()['sessions_saved'] == 1
+
+def test_failed_creation_frees_its_slot(monkeypatch):
+    pool = InstaloaderPool(size=1)
+    failures = [RuntimeError('connection refused')]
+    
+    def create(slot):
+        if failures:
+            raise failures.pop()
+        return slot, fake_loader()
+    
+    monkeypatch.setattr(pool, '_create', create)
+    with pytest.raises(RuntimeError):
+        with pool.acquire():
+            pass
+    assert pool.get_stats()['created'] == 0
+    
+    with pool.acquire() as loader:
+        assert loader is not None
+    assert pool.get_stats()['created'] == 1
+
+def test_acquire_times_out_when_every_loader_stays_busy(pool):
+    pool.acquire_timeout = 0.05
+    
+    with pool.acquire(), pool.acquire():
+        with pytest.raises(TimeoutError):
+            with pool.acquire():
+                pass
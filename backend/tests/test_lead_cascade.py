@@ -0,0 +1,31 @@
+from services.lead_cascade import LeadCascade
+
+def test_screen_rejects_only_confident_non_leads(monkeypatch):
+    monkeypatch.setenv('LEAD_CASCADE_SCREEN_THRESHOLD', '0.7')
+    cascade = LeadCascade()
+    
+    assert cascade.screen_rejects({'is_lead': False, 'confidence': 0.9})
+    assert cascade.screen_rejects({'is_lead': False, 'confidence': 0.7})
+    assert not cascade.screen_rejects({'is_lead': False, 'confidence': 0.5})
+    assert not cascade.screen_rejects({'is_lead': True, 'confidence': 0.95})
+    assert not cascade.screen_rejects({'is_lead': False, 'confidence': 'high'})
+
+def test_extract_threshold(monkeypatch):
+    monkeypatch.setenv('LEAD_CASCADE_EXTRACT_MIN_CONFIDENCE', '0.6')
+    cascade = LeadCascade()
+    
+    assert cascade.extract_accepts({'confidence': 0.8})
+    assert cascade.extract_accepts({})
+    assert not cascade.extract_accepts({'confidence': 0.4})
+
+def test_exit_rates_per_tier():
+    cascade = LeadCascade()
+    cascade.record('rules', exited=True)
+    cascade.record('rules', exited=False)
+    cascade.record('screen', exited=False)
+    cascade.record_reused()
+    
+    stats = cascade.get_stats(rules_threshold=3)
+    assert stats['tiers']['rules'] == {'entered': 2, 'exited': 1, 'exit_rate': 0.5, 'threshold': 3}
+    assert stats['tiers']['extract']['exit_rate'] is None
+    assert stats['reused_analyses'] == 1
@@ -0,0 +1,58 @@
+from utils.lead_classifier import LeadClassifier, split_samples
+
+LEADS = [
+    'looking for 3bhk flat in sector 56 budget 1.5 cr',
+    'need 2bhk on rent near golf course road urgently',
+    'want to buy a villa in dlf phase 5 please suggest',
+    'searching for builder floor around 80 lakh',
+    'flat chahiye sector 57 mein budget 1 cr'
+]
+OTHERS = [
+    'new launch luxury apartments book now site visit',
+    'sunset view from our balcony tonight',
+    'best deals on ready to move flats call now',
+    'happy diwali to all our clients',
+    'our project possession offer limited units'
+]
+
+def samples():
+    return ([{'content': text, 'is_lead': True, 'lead_score': 8} for text in LEADS] +
+            [{'content': text, 'is_lead': False, 'lead_score': 2} for text in OTHERS])
+
+def test_untrained_classifier_is_unavailable():
+    assert not LeadClassifier().available
+
+def test_fit_separates_training_samples():
+    classifier = LeadClassifier()
+    classifier.fit(samples(), epochs=20)
+    
+    report = classifier.evaluate(samples())
+    assert classifier.available
+    assert report['accuracy'] == 1.0
+    lead, other = classifier.predict_batch(['looking for 3bhk flat budget 1 cr', 'book now site visit offer'])
+    assert lead['is_lead'] and lead['lead_score'] > other['lead_score']
+    assert not other['is_lead']
+
+def test_gate_and_escalation_thresholds(monkeypatch):
+    monkeypatch.setenv('LEAD_CLASSIFIER_GATE_THRESHOLD', '0.1')
+    monkeypatch.setenv('LEAD_CLASSIFIER_ESCALATE_THRESHOLD', '0.9')
+    classifier = LeadClassifier()
+    
+    assert classifier.gates({'lead_probability': 0.05})
+    assert not classifier.gates({'lead_probability': 0.5})
+    assert classifier.escalates({'lead_probability': 0.95})
+
+def test_saved_model_is_loaded_on_start():
+    classifier = LeadClassifier()
+    classifier.fit(samples())
+    classifier.save()
+    
+    reloaded = LeadClassifier()
+    assert reloaded.available
+    assert reloaded.predict_batch(LEADS) == classifier.predict_batch(LEADS)
+
+def test_split_is_deterministic():
+    train, test = split_samples(samples(), 0.3)
+    
+    assert (train, test) == split_samples(samples(), 0.3)
+    assert len(train) + len(test) == 10
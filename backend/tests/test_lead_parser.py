@@ -0,0 +1,47 @@
+import pytest
+
+from utils.lead_parser import LeadParser
+
+def test_parses_property_budget_and_location():
+    parsed = LeadParser().parse('Looking for 3BHK flat in sector 56 budget 1-1.5 cr')
+    
+    assert parsed['property_category'] == 'apartment'
+    assert parsed['property_type'] == '3 BHK Apartment'
+    assert parsed['bhk'] == 3
+    assert (parsed['budget_min'], parsed['budget_max']) == (10000000, 15000000)
+    assert parsed['budget_range'] == '₹1 Cr - ₹1.5 Cr'
+    assert parsed['location'] == 'Sector 56'
+
+@pytest.mark.parametrize('text, budget_min, budget_max, display', [
+    ('80 lakh to 1.2 cr builder floor', 8000000, 12000000, '₹80 L - ₹1.2 Cr'),
+    ('villa wanted above 5 cr', 50000000, None, '₹5 Cr+'),
+    ('Need 2 bhk on rent under 40k per month', None, 40000, 'Up to ₹40K/month'),
+    ('budget 75 lakh', 7500000, 7500000, '₹75 L'),
+    ('mera budget 1.2cr tak hai', None, 12000000, 'Up to ₹1.2 Cr'),
+    ('2 bhk flat, 60 lakh max', None, 6000000, 'Up to ₹60 L')
+])
+def test_budget_forms(text, budget_min, budget_max, display):
+    budget = LeadParser().parse_budget(text)
+    
+    assert (budget['budget_min'], budget['budget_max']) == (budget_min, budget_max)
+    assert budget['budget_range'] == display
+
+def test_words_containing_budget_markers_are_not_budgets():
+    parser = LeadParser()
+    
+    assert parser.parse_budget('open 24 hours 5 days a week') == {}
+    # "thunder" is not the "under" modifier, so the amount is exact rather than a ceiling
+    assert parser.parse_budget('thunder 5 lakh')['budget_range'] == '₹5 L'
+
+def test_ambiguous_location_is_dropped():
+    parser = LeadParser()
+    parsed = parser.parse('Need flat in sector 56 or sector 57')
+    
+    assert 'location' not in parsed
+    assert parser.get_stats()['ambiguous_location'] == 1
+
+def test_locality_and_unknown_property():
+    parser = LeadParser()
+    
+    assert parser.parse_location('flat near golf course road') == {'location': 'Golf Course Road'}
+    assert parser.parse_property('any suggestions?') == {}
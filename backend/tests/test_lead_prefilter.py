@@ -0,0 +1,68 @@
+import pytest
+
+from utils.lead_prefilter import BUDGET_PATTERN, LeadPrefilter
+
+def test_buyer_post_passes_with_signals():
+    result = LeadPrefilter(min_score=3).score('Looking for a 3BHK flat, budget 1.5 cr, urgent. Call me 9876543210')
+    
+    assert result['passed']
+    assert result['signals'] == ['intent', 'property', 'budget', 'contact', 'timeline']
+    assert result['score'] == 7
+
+def test_promotion_is_penalized():
+    result = LeadPrefilter(min_score=3).score('New launch! 3BHK flats for sale, book now, site visit, price starts 1.2 cr')
+    
+    assert not result['passed']
+    assert 'promotional:5' in result['signals']
+
+def test_hinglish_and_hindi_intent():
+    prefilter = LeadPrefilter(min_score=3)
+    
+    assert prefilter.score('2bhk flat chahiye sector 56 mein')['passed']
+    assert prefilter.score('मुझे गुड़गांव में घर चाहिए')['passed']
+
+@pytest.mark.parametrize('text', [
+    'first course of the dinner',
+    'thunder storm 5 tonight',
+    'within reach 24 hours',
+    'minrs 5 left'
+])
+def test_budget_words_need_word_boundaries(text):
+    assert not BUDGET_PATTERN.search(text)
+
+@pytest.mark.parametrize('text', [
+    'budget 80 lakh',
+    'budget: 1.5cr',
+    'under 50k',
+    'up to 2 cr',
+    'Rs. 45,000',
+    'INR 9000000',
+    '₹1.2 Cr',
+    'बजट 50 लाख',
+    '1-1.5 cr'
+])
+def test_budget_phrases_match(text):
+    assert BUDGET_PATTERN.search(text)
+
+def test_budget_word_without_amount_does_not_match():
+    assert not BUDGET_PATTERN.search('what is your budget?')
+
+def test_rejected_posts_skip_the_llm_unless_audited():
+    prefilter = LeadPrefilter(min_score=3, audit_rate=0)
+    
+    assert prefilter.check('Sunset at the beach') == (False, False, prefilter.score('Sunset at the beach'))
+    audited = LeadPrefilter(min_score=3, audit_rate=1)
+    analyze, passed, _ = audited.check('Sunset at the beach')
+    assert analyze and not passed
+    assert audited.get_report()['audited'] == 1
+
+def test_report_scales_recall_by_audit_rate():
+    prefilter = LeadPrefilter(min_score=3, audit_rate=0.5)
+    for _ in range(3):
+        prefilter.record_outcome(True, True)
+    prefilter.record_outcome(True, False)
+    prefilter.record_outcome(False, True)
+    
+    report = prefilter.get_report()
+    assert report['precision'] == 0.75
+    assert report['recall'] == 0.6
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from services.model_backends import (FaultInjector, InjectedFault, ModelBackend, RecordingStore, ReplayMissError,
+                                     StubModel)
+
+def test_stub_answers_single_and_batch_prompts():
+    model = StubModel()
+    
+    single = json.loads(model.generate_content('Content: "Looking for 2BHK flat urgently, call 9876543210"\n').text)
+    assert single['is_lead'] is True
+    batch = json.loads(model.generate_content(
+        'Posts (JSON array of objects with "id" and "content"):\n'
+        '[{"id": "a", "content": "need 3bhk flat budget 1 cr"}, {"id": "b", "content": "sunset at the beach"}]\n'
+    ).text)
+    assert [(verdict['id'], verdict['is_lead']) for verdict in batch] == [('a', True), ('b', False)]
+
+def test_fault_injector_fails_at_the_configured_rate():
+    faults = FaultInjector(latency_ms='0', error_rate=1.0, seed='1')
+    
+    with pytest.raises(InjectedFault):
+        faults.apply()
+    assert faults.get_stats()['injected_errors'] == 1
+    FaultInjector(error_rate=0.0).apply()
+
+def test_replay_serves_recordings_and_falls_back_to_stub(monkeypatch):
+    store = RecordingStore()
+    store.append('gemini-2.0-flash-001', 'recorded prompt', '{"is_lead": false}', None, 0.1)
+    monkeypatch.setenv('GEMINI_BACKEND', 'replay')
+    backend = ModelBackend()
+    model = backend.model('gemini-2.0-flash-001')
+    
+    assert model.generate_content('recorded prompt').text == '{"is_lead": false}'
+    assert json.loads(model.generate_content('Content: "need 2bhk flat urgently"\n').text)['is_lead']
+    stats = backend.get_stats()
+    assert (stats['replay_hits'], stats['replay_misses']) == (1, 1)
+
+def test_strict_replay_raises_on_unrecorded_prompts(monkeypatch):
+    monkeypatch.setenv('GEMINI_BACKEND', 'replay')
+    monkeypatch.setenv('GEMINI_REPLAY_STRICT', 'True')
+    
+    with pytest.raises(ReplayMissError):
+        ModelBackend().model('gemini-2.0-flash-001').generate_content('never recorded')
+
+def test_live_backend_needs_an_api_key(monkeypatch):
+    monkeypatch.setenv('GEMINI_BACKEND', 'genai')
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    
+    with pytest.raises(ValueError):
+        ModelBackend()
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        ModelBackend('bogus')
@@ -0,0 +1,86 @@
+import json
+
+from utils.near_duplicate import NearDuplicateIndex
+
+CAPTION = 'Looking for a spacious 3BHK flat in sector 56 Gurgaon with budget around 1.5 crore, possession within 3 months'
+REPOST = CAPTION + ' #gurgaon #realestate @broker https://example.com/post'
+
+def test_short_text_has_no_fingerprint():
+    assert NearDuplicateIndex().fingerprint('need 2bhk flat') is None
+
+def test_reposts_share_a_fingerprint():
+    index = NearDuplicateIndex()
+    
+    assert index.fingerprint(CAPTION) == index.fingerprint(REPOST)
+
+def test_find_returns_canonical_entry_with_its_analysis_ref():
+    index = NearDuplicateIndex()
+    ref = {'kind': 'intent', 'cache_key': 'abc', 'prompt_version': 'v1', 'model': 'stub'}
+    index.add('instagram:1', CAPTION, 'https://example.com/1', analysis_ref=ref)
+    
+    match = index.find(REPOST, 'instagram:2')
+    assert match['id'] == 'instagram:1'
+    assert match['analysis_ref'] == ref
+    assert 'analysis' not in match
+    assert index.get_stats()['duplicates_found'] == 1
+
+def test_unrelated_text_does_not_match():
+    index = NearDuplicateIndex()
+    index.add('instagram:1', CAPTION)
+    
+    assert index.find('Sunset over the Aravalli hills today was absolutely beautiful and calm', 'instagram:2') is None
+
+def test_own_entry_wins_and_is_not_counted_as_duplicate():
+    index = NearDuplicateIndex()
+    index.add('instagram:1', CAPTION)
+    index.add('instagram:2', REPOST)
+    
+    assert index.find(CAPTION, 'instagram:2')['id'] == 'instagram:2'
+    assert index.get_stats()['duplicates_found'] == 0
+
+def test_edited_post_is_reindexed():
+    index = NearDuplicateIndex()
+    index.add('instagram:1', CAPTION)
+    edited = 'Sold out, thanks everyone for the overwhelming response to our listing this week'
+    index.add('instagram:1', edited)
+    
+    assert index.get_stats()['fingerprints'] == 1
+    assert index.find(CAPTION, 'instagram:9') is None
+    assert index.find(edited, 'instagram:9')['id'] == 'instagram:1'
+
+def test_oldest_entries_are_evicted():
+    index = NearDuplicateIndex(max_entries=10)
+    for number in range(12):
+        index.add(f'post:{number}', f'unique caption number {number} about a completely different topic {number * 7}')
+    
+    assert index.get_stats()['fingerprints'] <= 10
+    assert 'post:0' not in index.entries
+
+def test_saves_are_throttled_and_reloaded(data_dir, monkeypatch):
+    monkeypatch.setenv('NEAR_DUPLICATE_SAVE_EVERY', '2')
+    monkeypatch.setenv('NEAR_DUPLICATE_SAVE_INTERVAL_SECONDS', '3600')
+    path = data_dir / 'near_duplicates.json'
+    index = NearDuplicateIndex()
+    
+    index.add('instagram:1', CAPTION, analysis_ref={'cache_key': 'abc'})
+    index.maybe_save()
+    assert not path.exists()
+    
+    index.add('instagram:2', 'Another caption long enough to be fingerprinted by the index for sure')
+    index.maybe_save()
+    assert path.exists()
+    assert index.get_stats()['unsaved_changes'] == 0
+    
+    reloaded = NearDuplicateIndex()
+    assert reloaded.find(REPOST, 'instagram:3')['analysis_ref'] == {'cache_key': 'abc'}
+
+def test_legacy_embedded_analyses_are_dropped(data_dir):
+    index = NearDuplicateIndex()
+    fingerprint = format(index.fingerprint(CAPTION), '016x')
+    (data_dir / 'near_duplicates.json').write_text(json.dumps({'entries': [
+        {'id': 'instagram:1', 'fingerprint': fingerprint, 'url': '', 'analysis': {'is_lead': True}, 'added_at': 0}
+    ]}))
+    
+    match = NearDuplicateIndex().find(REPOST, 'instagram:2')
+    assert match['id'] == 'instagram:1'
+    assert 'analysis' not in match
@@ -0,0 +1,63 @@
+from services.parked_items import ParkedItemStore
+
+def test_drain_returns_oldest_first_and_removes():
+    store = ParkedItemStore()
+    store.park({'caption': 'first'}, 'post', 'timeout')
+    store.park({'caption': 'second'}, 'post', 'timeout')
+    store.park({'text': 'a comment'}, 'comment', 'timeout')
+    
+    assert store.count() == {'post': 2, 'comment': 1}
+    assert store.drain('post', limit=1) == [{'caption': 'first', 'parked_attempts': 1}]
+    assert store.drain('post') == [{'caption': 'second', 'parked_attempts': 1}]
+    assert store.count() == {'comment': 1}
+
+def test_drain_of_empty_kind():
+    store = ParkedItemStore()
+    
+    assert store.drain('comment') == []
+    assert store.count() == {}
+
+def test_provisional_id_round_trips_without_being_stored_in_the_item():
+    store = ParkedItemStore()
+    store.park({'caption': 'a post', 'provisional_id': 'stale'}, 'post', 'timeout', 'instagram:abc')
+    
+    assert store.parked_provisional_ids(['instagram:abc', 'instagram:other']) == {'instagram:abc'}
+    assert store.drain('post') == [{'caption': 'a post', 'provisional_id': 'instagram:abc', 'parked_attempts': 1}]
+    assert store.parked_provisional_ids(['instagram:abc']) == set()
+
+def test_older_database_gains_provisional_column(tmp_path):
+    import sqlite3
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE parked_items (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, '
+                 'item TEXT NOT NULL, reason TEXT, parked_at REAL NOT NULL)')
+    conn.execute("INSERT INTO parked_items (kind, item, reason, parked_at) VALUES ('post', '{\"caption\": \"old\"}', '', 0)")
+    conn.commit()
+    conn.close()
+    
+    store = ParkedItemStore(db_path=path)
+    assert store.drain('post') == [{'caption': 'old', 'parked_attempts': 1}]
+
+def test_unwritable_directory_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    store = ParkedItemStore(db_path=str(blocker / 'parked.db'))
+    
+    store.park({'caption': 'kept'}, 'post', 'timeout', 'instagram:abc')
+    assert store.count() == {'post': 1}
+    assert store.drain('post') == [{'caption': 'kept', 'provisional_id': 'instagram:abc', 'parked_attempts': 1}]
+
+def test_item_failing_too_often_is_dead_lettered(monkeypatch):
+    monkeypatch.setenv('PARKED_ITEMS_MAX_ATTEMPTS', '2')
+    store = ParkedItemStore()
+    store.park({'caption': 'flaky'}, 'post', 'timeout', 'instagram:abc')
+    
+    item = store.drain('post')[0]
+    assert item['parked_attempts'] == 1
+    store.park(item, 'post', 'timeout', item['provisional_id'])
+    
+    # Not handed out again, but its degraded lead is kept
+    assert store.drain('post') == []
+    assert store.count() == {}
+    assert store.count(dead_lettered=True) == {'post': 1}
+    assert store.parked_provisional_ids(['instagram:abc']) == {'instagram:abc'}
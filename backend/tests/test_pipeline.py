@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+
+from services import pipeline as pipeline_module
+from services.pipeline import JsonlLeadSink, LeadPipelineFactory, Pipeline, Stage
+from services.usage_tracker import usage_context
+
+def numbers(count):
+    def source(cancel):
+        for number in range(count):
+            if cancel.cancelled:
+                return
+            yield number
+    return source
+
+def test_items_flow_through_every_stage():
+    stages = [
+        Stage('double', lambda item: [item * 2], workers=3),
+        Stage('sum', lambda batch: [sum(batch)], batch_size=5, batch_wait=0.05)
+    ]
+    pipeline = Pipeline('test', numbers(20), stages, queue_size=4)
+    
+    assert sum(pipeline.run()) == sum(number * 2 for number in range(20))
+    stats = pipeline.get_stats()
+    assert stats['stages']['scrape']['items_out'] == 20
+    assert stats['stages']['double']['items_in'] == 20
+    assert stats['stages']['sum']['items_in'] == 20
+    assert not stats['running']
+
+def test_stage_errors_are_counted_and_skipped():
+    def fail_on_odd(item):
+        if item % 2:
+            raise ValueError('odd')
+        return [item]
+    
+    pipeline = Pipeline('test', numbers(10), [Stage('even', fail_on_odd)])
+    
+    assert sorted(pipeline.run()) == [0, 2, 4, 6, 8]
+    assert pipeline.get_stats()['stages']['even']['errors'] == 5
+
+def test_bounded_queues_apply_backpressure():
+    produced = []
+    
+    def source(cancel):
+        for number in range(50):
+            produced.append(number)
+            yield number
+    
+    def slow(item):
+        time.sleep(0.01)
+        return [item]
+    
+    pipeline = Pipeline('test', source, [Stage('slow', slow)], queue_size=2)
+    outputs = pipeline.run()
+    next(outputs)
+    time.sleep(0.05)
+    
+    # Scraper is held back by the two bounded queues instead of reading the whole feed
+    assert len(produced) < 20
+    assert pipeline.get_stats()['stages']['slow']['max_queue_depth'] <= 2
+    outputs.close()
+
+def test_consumer_stopping_early_cancels_the_scrape():
+    def endless(cancel):
+        number = 0
+        while not cancel.cancelled:
+            yield number
+            number += 1
+    
+    pipeline = Pipeline('test', endless, [Stage('pass', lambda item: [item], workers=2)], queue_size=5)
+    outputs = pipeline.run()
+    assert [next(outputs) for _ in range(3)]
+    outputs.close()
+    
+    assert pipeline.get_stats()['cancelled']
+    assert not any(thread.name.startswith('pipeline-test') for thread in threading.enumerate())
+
+def test_stats_are_filtered_by_scan():
+    with usage_context(scan_id='scan-pipeline'):
+        pipeline = Pipeline('scoped', numbers(3), [Stage('pass', lambda item: [item])])
+        list(pipeline.run())
+    
+    stats = pipeline_module.get_stats('scan-pipeline')
+    assert [run['id'] for run in stats['pipelines']] == [pipeline.id]
+    assert stats['stage_totals']['pass']['items_out'] == 3
+
+def test_sink_appends_leads_with_scan_id(data_dir):
+    sink = JsonlLeadSink()
+    with usage_context(scan_id='scan-1'):
+        assert sink.write({'post_id': '1'}) == [{'post_id': '1'}]
+    
+    record = json.loads((data_dir / 'leads.jsonl').read_text())
+    assert record['post_id'] == '1'
+    assert record['scan_id'] == 'scan-1'
+
+class FakeGemini:
+    batch_size = 2
+    
+    def screen_item(self, item, item_kind):
+        return None if item['caption'] == 'drop' else item['caption'].startswith('lead')
+    
+    def analyze_screened(self, batch, item_kind='post'):
+        return [dict(item, is_lead=True) for item, passed in batch if passed]
+
+def test_factory_builds_prefilter_analyze_persist(data_dir):
+    items = [{'caption': caption} for caption in ('lead one', 'nothing', 'drop', 'lead two')]
+    pipeline = LeadPipelineFactory(FakeGemini()).build('fake', lambda cancel: iter(items))
+    
+    leads = list(pipeline.run())
+    assert sorted(lead['caption'] for lead in leads) == ['lead one', 'lead two']
+    assert [stage.name for stage in pipeline.stages] == ['prefilter', 'analyze', 'persist']
+    assert len((data_dir / 'leads.jsonl').read_text().splitlines()) == 2
@@ -0,0 +1,51 @@
+from services.prompt_registry import PromptRegistry, PromptTemplate, estimate_tokens, truncate_middle
+
+def registry():
+    return PromptRegistry([
+        PromptTemplate('intent', 'single', '1', '''
+            Analyze: "$content"
+            '''),
+        PromptTemplate('intent', 'single', '2', '''
+            Analyze carefully: "$content"
+            ''')
+    ])
+
+def test_newest_version_is_active_and_rendered():
+    prompts = registry()
+    
+    assert prompts.version_for('intent', 'any post') == '2'
+    assert prompts.render('intent', 'single', content='need a flat') == 'Analyze carefully: "need a flat"'
+    assert prompts.render('intent', 'single', '1', content='need a flat') == 'Analyze: "need a flat"'
+    assert prompts.get_stats()['sizes']['intent.single.v2']['count'] == 1
+
+def test_pinned_version(monkeypatch):
+    monkeypatch.setenv('PROMPT_ACTIVE_VERSIONS', 'intent=1')
+    
+    assert registry().version_for('intent') == '1'
+
+def test_ab_split_is_stable_per_content(monkeypatch):
+    monkeypatch.setenv('PROMPT_ACTIVE_VERSIONS', 'intent=1')
+    monkeypatch.setenv('PROMPT_AB_TESTS', 'intent=2:0.5')
+    prompts = registry()
+    
+    versions = {f'post {n}': prompts.version_for('intent', f'post {n}') for n in range(200)}
+    assert set(versions.values()) == {'1', '2'}
+    assert all(prompts.version_for('intent', content) == version for content, version in versions.items())
+    assert prompts.live_versions('intent') == ['1', '2']
+
+def test_truncation_keeps_head_and_tail():
+    text = 'start ' + 'filler ' * 500 + 'end'
+    truncated, cut = truncate_middle(text, 50)
+    
+    assert cut
+    assert truncated.startswith('start') and truncated.endswith('end')
+    assert estimate_tokens(truncated) <= 55
+    assert truncate_middle('short text', 50) == ('short text', False)
+
+def test_fit_counts_truncations_per_tier(monkeypatch):
+    monkeypatch.setenv('PROMPT_BUDGET_SCREEN_TOKENS', '20')
+    prompts = registry()
+    prompts.fit('word ' * 100, 'screen')
+    prompts.fit('word ' * 100, 'extract')
+    
+    assert prompts.get_stats()['truncations'] == {'screen': 1, 'extract': 0}
@@ -0,0 +1,62 @@
+import time
+
+from services.rate_governor import RateGovernor
+from services.usage_tracker import usage_context
+
+def governor(**overrides):
+    settings = dict(delay_min=0.01, delay_max=0.05, requests_per_minute=6000)
+    settings.update(overrides)
+    return RateGovernor('test', **settings)
+
+def test_throttle_backs_off_and_success_probes_back():
+    pacing = governor()
+    pacing.record_throttle('rate_limited')
+    assert pacing.interval == 0.05
+    
+    pacing.record_throttle('rate_limited')
+    assert pacing.interval == 0.1
+    for _ in range(20):
+        pacing.record_success()
+    assert pacing.interval == 0.01
+    assert pacing.get_stats()['throttles'] == {'rate_limited': 2}
+
+def test_concurrent_waits_are_spaced():
+    pacing = governor(delay_min=0.05, delay_max=0.05)
+    pacing.jitter = 0
+    start = time.time()
+    for _ in range(3):
+        pacing.wait()
+    
+    assert time.time() - start >= 0.09
+
+def test_wait_is_attributed_to_the_scan():
+    pacing = governor(delay_min=0.02, delay_max=0.02)
+    with usage_context(scan_id='scan-1'):
+        pacing.wait()
+        pacing.wait()
+    
+    assert pacing.scan_wait_seconds('scan-1') > 0
+
+def test_throttle_reason():
+    assert RateGovernor.throttle_reason(Exception('429 Too Many Requests')) == 'rate_limited'
+    assert RateGovernor.throttle_reason(Exception('Please wait a few minutes')) == 'rate_limited'
+    assert RateGovernor.throttle_reason(Exception('Redirected to login page')) == 'login_wall'
+    assert RateGovernor.throttle_reason(ValueError('bad shortcode')) is None
+
+def test_record_error_only_backs_off_on_throttling():
+    pacing = governor()
+    
+    assert not pacing.record_error(ValueError('bad shortcode'))
+    assert pacing.get_stats()['backoffs'] == 0
+    assert pacing.record_error(Exception('checkpoint required'))
+    assert pacing.get_stats()['throttles'] == {'login_wall': 1}
+
+def test_spacing_never_probes_below_the_rate_ceiling():
+    pacing = RateGovernor('slow', delay_min=2, delay_max=5, requests_per_minute=10)
+    assert pacing.interval == 6
+    
+    pacing.record_throttle('rate_limited')
+    for _ in range(20):
+        pacing.record_success()
+    assert pacing.interval == 6
+    assert pacing.get_stats()['min_interval_seconds'] == 6
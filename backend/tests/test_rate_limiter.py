@@ -0,0 +1,57 @@
+import sqlite3
+import threading
+import time
+
+from services.rate_limiter import TokenBucketLimiter
+
+def set_bucket(limiter, requests, tokens=0):
+    """Put the shared bucket in a known state"""
+    conn = sqlite3.connect(limiter.db_path)
+    conn.execute('INSERT OR REPLACE INTO buckets (name, requests, tokens, updated_at) VALUES (?, ?, ?, ?)',
+                 (limiter.name, requests, tokens, time.time()))
+    conn.commit()
+    conn.close()
+
+def test_burst_up_to_capacity_does_not_wait():
+    limiter = TokenBucketLimiter('burst', requests_per_minute=600)
+    
+    assert max(limiter.acquire() for _ in range(5)) < 0.05
+    assert limiter.get_stats()['total_waited'] == 0
+
+def test_empty_bucket_waits_for_refill():
+    limiter = TokenBucketLimiter('refill', requests_per_minute=300)
+    set_bucket(limiter, 0)
+    
+    # One request refills every 0.2s at 300 req/min
+    waited = limiter.acquire()
+    assert 0.1 <= waited < 1
+    assert limiter.get_stats()['total_waited'] == 1
+
+def test_token_budget_limits_large_requests():
+    limiter = TokenBucketLimiter('tokens', requests_per_minute=1000, tokens_per_minute=6000)
+    set_bucket(limiter, 1000, 0)
+    
+    # 60 tokens refill in 0.6s at 6000 tokens/min
+    assert 0.3 <= limiter.acquire(tokens=60) < 1.5
+
+def test_bucket_is_shared_between_limiters_with_the_same_name():
+    first = TokenBucketLimiter('shared', requests_per_minute=300)
+    second = TokenBucketLimiter('shared', requests_per_minute=300)
+    set_bucket(first, 1)
+    first.acquire()
+    
+    assert first.shared and second.shared
+    assert second.acquire() >= 0.1
+
+def test_falls_back_to_per_process_bucket(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    limiter = TokenBucketLimiter('local', requests_per_minute=600, db_path=str(blocker / 'limits.db'))
+    
+    assert limiter.shared is False
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.get_stats()['total_acquired'] == 10
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from services.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+class ResourceExhausted(Exception):
+    pass
+
+def test_retryable_errors():
+    policy = RetryPolicy()
+    
+    assert policy.is_retryable(ResourceExhausted('quota'))
+    assert policy.is_retryable(TimeoutError())
+    assert policy.is_retryable(RuntimeError('503 Service Unavailable'))
+    assert not policy.is_retryable(ValueError('bad prompt'))
+    assert not policy.is_retryable(CircuitOpenError('open'))
+
+def test_retries_transient_errors_until_success():
+    policy = RetryPolicy(max_attempts=4, base_delay=0.001)
+    attempts = []
+    
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ResourceExhausted('429')
+        return 'ok'
+    
+    assert policy.call(flaky) == 'ok'
+    assert policy.get_stats()['retries'] == 2
+
+def test_gives_up_after_max_attempts():
+    policy = RetryPolicy(max_attempts=2, base_delay=0.001)
+    
+    with pytest.raises(ResourceExhausted):
+        policy.call(lambda: (_ for _ in ()).throw(ResourceExhausted('429')))
+    assert policy.get_stats()['give_ups'] == 1
+
+def test_permanent_errors_are_not_retried():
+    policy = RetryPolicy(max_attempts=4, base_delay=0.001)
+    attempts = []
+    
+    def broken():
+        attempts.append(1)
+        raise ValueError('bad prompt')
+    
+    with pytest.raises(ValueError):
+        policy.call(broken)
+    assert len(attempts) == 1
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allows_calls()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.get_status()['rejected_calls'] == 1
+
+def test_breaker_half_open_allows_one_trial():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allows_calls()
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=0.01)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.02)
+    
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.get_status()['times_opened'] == 2
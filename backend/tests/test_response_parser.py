@@ -0,0 +1,52 @@
+import pytest
+
+from services.response_parser import (LeadIntentResult, ResponseParseError, ResponseParser,
+                                      ScreenResult)
+
+def test_plain_json_takes_the_fast_path():
+    parser = ResponseParser()
+    
+    assert parser.load_json('{"is_lead": true}') == {'is_lead': True}
+    assert parser.get_stats()['fast_path'] == 1
+
+def test_fenced_and_prose_wrapped_json_falls_back():
+    parser = ResponseParser()
+    
+    assert parser.load_json('Here you go:\n```json\n{"is_lead": false}\n```') == {'is_lead': False}
+    assert parser.load_json('Result: {"is_lead": true} hope this helps {x}') == {'is_lead': True}
+    assert parser.load_json('[{"id": "1"}] trailing', list) == [{'id': '1'}]
+    assert parser.get_stats()['fallback'] == 3
+
+def test_list_wrapped_in_an_object_is_unwrapped():
+    assert ResponseParser().load_json('{"results": [{"id": "1"}]}', list) == [{'id': '1'}]
+
+def test_no_json_raises():
+    parser = ResponseParser()
+    
+    with pytest.raises(ResponseParseError):
+        parser.load_json('I cannot help with that')
+    assert parser.get_stats()['failures'] == 1
+
+def test_fields_are_coerced():
+    result = ResponseParser().parse(
+        '{"is_lead": "yes", "lead_score": "7.6", "confidence": "0.9", "location": "null", "budget_range": ["50L", "1Cr"]}',
+        LeadIntentResult
+    )
+    
+    assert result.is_lead is True
+    assert result.lead_score == 8
+    assert result.confidence == 0.9
+    assert result.location is None
+    assert result.to_dict() == {'is_lead': True, 'lead_score': 8, 'confidence': 0.9, 'budget_range': '50L, 1Cr'}
+
+def test_missing_required_field_raises():
+    parser = ResponseParser()
+    
+    with pytest.raises(ResponseParseError):
+        parser.parse('{"lead_score": 8}', LeadIntentResult)
+    assert parser.get_stats()['failures'] == 1
+
+def test_parse_list_skips_invalid_entries():
+    results = ResponseParser().parse_list('[{"id": "1", "is_lead": true}, {"id": "2"}, "junk"]', ScreenResult)
+    
+    assert [result.id for result in results] == ['1']
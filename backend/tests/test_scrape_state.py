@@ -0,0 +1,88 @@
+from services.scrape_state import ScrapeCursor, ScrapeStateStore
+
+def test_commit_records_seen_posts_and_mark():
+    store = ScrapeStateStore()
+    store.commit('instagram', 'mumbai', ['a', 'b'], 200.0, 'b')
+    
+    assert store.is_seen('instagram', 'a')
+    assert not store.is_seen('youtube', 'a')
+    assert store.get_mark('instagram', 'mumbai') == {'timestamp': 200.0, 'post_id': 'b'}
+
+def test_mark_never_moves_back():
+    store = ScrapeStateStore()
+    store.commit('instagram', 'mumbai', ['b'], 200.0, 'b')
+    store.commit('instagram', 'mumbai', ['a'], 100.0, 'a')
+    
+    assert store.get_mark('instagram', 'mumbai')['post_id'] == 'b'
+
+def test_reset_forgets_marks():
+    store = ScrapeStateStore()
+    store.commit('instagram', 'mumbai', ['a'], 100.0, 'a')
+    store.commit('instagram', 'pune', ['b'], 100.0, 'b')
+    
+    assert store.reset('instagram', 'mumbai') == 1
+    assert store.get_mark('instagram', 'mumbai') is None
+    assert store.reset('instagram') == 1
+    assert store.get_stats()['high_water_marks'] == {}
+
+def test_cursor_stops_after_consecutive_known_posts():
+    store = ScrapeStateStore()
+    store.commit('instagram', 'mumbai', ['old1', 'old2'], 100.0, 'old2')
+    cursor = store.cursor('instagram', 'mumbai', stop_after_seen=2)
+    
+    assert cursor.check('new1', 300.0) == ScrapeCursor.NEW
+    cursor.add('new1', 300.0)
+    assert cursor.check('old2', 100.0) == ScrapeCursor.SEEN
+    assert cursor.check('new2', 250.0) == ScrapeCursor.NEW
+    cursor.add('new2', 250.0)
+    assert cursor.check('old1', 90.0) == ScrapeCursor.SEEN
+    assert cursor.check('older', 50.0) == ScrapeCursor.STOP
+    assert cursor.summary() == '2 new, 3 already scraped (reached already-scraped posts)'
+    
+    cursor.commit()
+    assert store.get_mark('instagram', 'mumbai') == {'timestamp': 300.0, 'post_id': 'new1'}
+    assert store.is_seen('instagram', 'new2')
+
+def test_interrupted_walk_keeps_the_mark_until_a_walk_completes():
+    store = ScrapeStateStore()
+    store.commit('instagram', 'mumbai', ['old'], 100.0, 'old')
+    
+    # Stopped by the post limit: the posts between the mark and 'p2' have not been scraped yet
+    cursor = store.cursor('instagram', 'mumbai', stop_after_seen=1)
+    for post_id, timestamp in (('p3', 300.0), ('p2', 200.0)):
+        assert cursor.check(post_id, timestamp) == ScrapeCursor.NEW
+        cursor.add(post_id, timestamp)
+    cursor.commit()
+    assert store.get_mark('instagram', 'mumbai') == {'timestamp': 100.0, 'post_id': 'old'}
+    
+    # The next walk skips what it already took without stopping there, and picks up the gap
+    cursor = store.cursor('instagram', 'mumbai', stop_after_seen=1)
+    assert cursor.check('p3', 300.0) == ScrapeCursor.SEEN
+    assert cursor.check('p2', 200.0) == ScrapeCursor.SEEN
+    assert cursor.check('gap', 150.0) == ScrapeCursor.NEW
+    cursor.add('gap', 150.0)
+    assert cursor.check('old', 100.0) == ScrapeCursor.STOP
+    cursor.commit()
+    assert store.get_mark('instagram', 'mumbai') == {'timestamp': 300.0, 'post_id': 'p3'}
+
+def test_walk_is_complete_only_once_every_new_post_is_taken():
+    store = ScrapeStateStore()
+    cursor = store.cursor('instagram', 'mumbai')
+    cursor.check('p1', 100.0)
+    cursor.check('p2', 90.0)
+    cursor.add('p1', 100.0)
+    cursor.end_of_feed()
+    
+    assert not cursor.complete
+    cursor.commit()
+    assert store.get_mark('instagram', 'mumbai') is None
+    assert not store.is_seen('instagram', 'p2')
+
+def test_unwritable_directory_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    store = ScrapeStateStore(db_path=str(blocker / 'scrape_state.db'))
+    
+    store.commit('instagram', 'mumbai', ['a'], 100.0, 'a')
+    assert store.is_seen('instagram', 'a')
+    assert store.get_mark('instagram', 'mumbai') == {'timestamp': 100.0, 'post_id': 'a'}
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight('test')
+    calls = []
+    started = threading.Event()
+    
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return 'result'
+    
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do('key', slow))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join()
+    
+    assert results == ['result'] * 5
+    assert len(calls) == 1
+    stats = flight.get_stats()
+    assert (stats['calls_executed'], stats['calls_saved'], stats['in_flight']) == (1, 4, 0)
+
+def test_errors_propagate_to_waiters():
+    flight = SingleFlight('test')
+    future, leader = flight.claim('key')
+    waiter, is_leader = flight.claim('key')
+    assert leader and not is_leader
+    
+    flight.resolve('key', error=RuntimeError('boom'))
+    with pytest.raises(RuntimeError):
+        flight.join(waiter)
+
+def test_released_claim_lets_waiters_run_themselves():
+    flight = SingleFlight('test')
+    flight.claim('key')
+    waiter, _ = flight.claim('key')
+    flight.release('key')
+    
+    assert flight.join(waiter) is None
+    assert flight.get_stats()['calls_executed'] == 0
+    assert flight.do('key', lambda: 'fresh') == 'fresh'
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight('test')
+    
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.get_stats()['calls_saved'] == 0
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from services.streaming import CancelToken, aiterate, normalize_item
+
+def test_child_token_follows_parent():
+    parent = CancelToken()
+    child = CancelToken(parent)
+    child_only = CancelToken()
+    
+    parent.cancel()
+    assert child.cancelled
+    assert not child_only.cancelled
+
+def test_normalize_item_keeps_existing_tags():
+    assert normalize_item({'platform': 'facebook'}, 'instagram', '#gurgaon') == {
+        'platform': 'facebook', 'scraped_from': '#gurgaon'
+    }
+
+def scraper(count, cancel=None):
+    for number in range(count):
+        if cancel.cancelled:
+            return
+        yield {'n': number}
+
+def test_aiterate_yields_every_item():
+    async def collect():
+        return [item['n'] async for item in aiterate(scraper, 5)]
+    
+    assert asyncio.run(collect()) == [0, 1, 2, 3, 4]
+
+def test_leaving_early_cancels_the_scraper():
+    token = CancelToken()
+    
+    async def first_two():
+        items = []
+        stream = aiterate(scraper, 1000, cancel=token, buffer=2)
+        async for item in stream:
+            items.append(item['n'])
+            if len(items) == 2:
+                break
+        await stream.aclose()
+        return items
+    
+    assert asyncio.run(first_two()) == [0, 1]
+    assert token.cancelled
+
+def test_scraper_errors_reach_the_consumer():
+    def broken(cancel=None):
+        yield {'n': 0}
+        raise RuntimeError('login required')
+    
+    async def collect():
+        return [item async for item in aiterate(broken)]
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(collect())
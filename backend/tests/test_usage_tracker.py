@@ -0,0 +1,39 @@
+from services.usage_tracker import UsageTracker, usage_context
+
+def test_calls_roll_up_per_scan_and_call_type(monkeypatch):
+    monkeypatch.setenv('GEMINI_PRICING', 'model-a=1.0:2.0')
+    tracker = UsageTracker()
+    with usage_context(scan_id='scan-1', platform='instagram'):
+        tracker.record('intent', 'model-a', 1000, 500, 0.2)
+        tracker.record('intent', 'model-a', 1000, 500, 0.4, estimated=True)
+        tracker.record('contact', 'model-a', 0, 0, 0.1, error=True)
+    
+    summary = tracker.scan_summary('scan-1')
+    assert summary['calls'] == 2
+    assert summary['errors'] == 1
+    assert summary['estimated_calls'] == 1
+    assert summary['cost_usd'] == 0.004
+    assert summary['by_call_type']['intent']['avg_latency_ms'] == 300.0
+    assert summary['by_platform']['instagram']['calls'] == 2
+
+def test_unpriced_models_cost_nothing():
+    assert UsageTracker().cost('stub', 1000, 1000) == 0
+
+def test_report_groups_by_model():
+    tracker = UsageTracker()
+    tracker.record('intent', 'model-a', 10, 5, 0.1)
+    tracker.record('screen', 'model-b', 10, 5, 0.1)
+    
+    report = tracker.get_report()
+    assert set(report['by_model']) == {'model-a', 'model-b'}
+    assert set(report['by_call_type']) == {'intent', 'screen'}
+
+def test_unwritable_path_disables_tracking(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    tracker = UsageTracker(db_path=str(blocker / 'usage.db'))
+    
+    assert tracker.enabled is False
+    tracker.record('intent', 'model-a', 10, 5, 0.1)
+    assert tracker.get_report() == {'enabled': False}
+    assert tracker.scan_summary('scan-1') == {'enabled': False}
@@ -0,0 +1,144 @@
+"""
+Contact Extractor
+Deterministic regex extraction of phones, emails, WhatsApp numbers and social handles
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Indian mobile numbers: optional +91/091/0 prefix, then 10 digits starting 6-9 with any spacing/dashes
+PHONE_PATTERN = re.compile(
+    r'(?<![\w+])'
+    r'(?:\(?(?:\+|00)?\s*91\)?[\s.-]*|0[\s.-]*)?'
+    r'([6-9](?:[\s.-]?\d){9})'
+    r'(?![\d])'
+)
+
+EMAIL_PATTERN = re.compile(r'(?<![\w.+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}(?![\w-])')
+
+# wa.me / api.whatsapp.com links carry the number directly
+WHATSAPP_LINK_PATTERN = re.compile(r'(?:wa\.me/|api\.whatsapp\.com/send\?phone=)\+?(\d{10,13})', re.IGNORECASE)
+
+# "WhatsApp", "whats app", "WA" followed (within a few words) by a number
+WHATSAPP_MENTION_PATTERN = re.compile(r'\b(?:whats\s?app|wa|watsapp|whatsaap|व्हाट्सएप)\b', re.IGNORECASE)
+
+HANDLE_PATTERN = re.compile(r'(?<![\w.@])@([A-Za-z0-9_](?:[A-Za-z0-9_.]{0,28}[A-Za-z0-9_])?)')
+
+CONTACT_PHRASE_PATTERN = re.compile(
+    r'\b(?:call|dm|message|msg|ping|inbox|text|whatsapp|contact|reach(?:\s+out\s+to)?)\s+(?:me|us)\b'
+    r'|\breach\s+out\b'
+    r'|\b(?:call|contact|whatsapp|msg|message)\s+(?:on|at)\b'
+    r'|\b(?:call|msg|message|contact)\s+(?:karo|kare|karein|kijiye)\b'
+    r'|\bsampark\s+(?:karein|kare|karo)\b'
+    r'|संपर्क\s+करें',
+    re.IGNORECASE
+)
+
+# Weaker signal used only to decide whether an LLM pass is worthwhile
+CONTACT_INTENT_PATTERN = re.compile(
+    r'\b(?:contact|call|phone|mobile|mob|number|no\.|whats\s?app|email|e-mail|mail|dm|inbox|reach|ping|msg|sampark)\b'
+    r'|संपर्क|नंबर|फोन',
+    re.IGNORECASE
+)
+
+# Explicit introductions only: "I am Looking for..." or "this is Urgent" would read as names
+NAME_PATTERN = re.compile(
+    r'\b(?i:my\s+name\s+is|name\s*[:\-])\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)'
+)
+
+CONTACT_FIELDS = ('name', 'phone', 'email', 'whatsapp', 'social_handle', 'contact_phrase')
+
+class ContactExtractor:
+    def normalize_phone(self, value: str) -> Optional[str]:
+        """Normalize an Indian mobile number to E.164 (+91XXXXXXXXXX)"""
+        if not value:
+            return None
+        digits = re.sub(r'\D', '', str(value))
+        if len(digits) < 10:
+            return None
+        local = digits[-10:]
+        if local[0] not in '6789':
+            return None
+        # Anything before the last 10 digits must be a country/trunk prefix
+        if digits[:-10] not in ('', '0', '91', '091', '0091'):
+            return None
+        return f"+91{local}"
+    
+    def extract_phones(self, text: str) -> List[str]:
+        """All distinct phone numbers in text, normalized to E.164, in order of appearance"""
+        phones = []
+        for match in PHONE_PATTERN.finditer(text):
+            phone = self.normalize_phone(match.group(1))
+            if phone and phone not in phones:
+                phones.append(phone)
+        return phones
+    
+    def extract_whatsapp(self, text: str) -> List[str]:
+        """Numbers explicitly marked as WhatsApp"""
+        numbers = []
+        for match in WHATSAPP_LINK_PATTERN.finditer(text):
+            phone = self.normalize_phone(match.group(1))
+            if phone and phone not in numbers:
+                numbers.append(phone)
+        
+        for mention in WHATSAPP_MENTION_PATTERN.finditer(text):
+            window = text[mention.end():mention.end() + 40]
+            match = PHONE_PATTERN.search(window)
+            if match:
+                phone = self.normalize_phone(match.group(1))
+                if phone and phone not in numbers:
+                    numbers.append(phone)
+        return numbers
+    
+    def extract(self, text: str) -> Dict:
+        """Extract contact details in the same shape as the Gemini contact response"""
+        text = text or ''
+        
+        phones = self.extract_phones(text)
+        emails = list(dict.fromkeys(email.lower() for email in EMAIL_PATTERN.findall(text)))
+        whatsapp = self.extract_whatsapp(text)
+        handles = list(dict.fromkeys(f"@{handle}" for handle in HANDLE_PATTERN.findall(text)))
+        phrase = CONTACT_PHRASE_PATTERN.search(text)
+        name = NAME_PATTERN.search(text)
+        
+        return {
+            'name': name.group(1) if name else None,
+            'phone': phones[0] if phones else None,
+            'email': emails[0] if emails else None,
+            'whatsapp': whatsapp[0] if whatsapp else None,
+            'social_handle': handles[0] if handles else None,
+            'contact_phrase': phrase.group(0) if phrase else None,
+            'phones': phones,
+            'emails': emails,
+            'handles': handles
+        }
+    
+    def extract_batch(self, texts: Iterable[str]) -> List[Dict]:
+        """Extract contact details from many texts"""
+        extract = self.extract
+        return [extract(text) for text in texts]
+    
+    def has_contact(self, contact: Dict) -> bool:
+        """Check whether an extraction found a way to reach the person"""
+        return bool(contact.get('phone') or contact.get('email') or contact.get('whatsapp') or contact.get('social_handle'))
+    
+    def has_contact_intent(self, text: str) -> bool:
+        """Check whether text suggests contact details are present or offered"""
+        return bool(CONTACT_INTENT_PATTERN.search(text or ''))
+    
+    def merge(self, local: Dict, llm: Dict) -> Dict:
+        """Merge an LLM contact result into a local one; local (normalized) values win, except the name"""
+        merged = dict(local)
+        
+        for field in CONTACT_FIELDS:
+            value = llm.get(field)
+            if isinstance(value, str) and value.strip().lower() in ('', 'null', 'none', 'n/a', 'unknown'):
+                value = None
+            # A regex guess at a name is weaker than the model's reading of the whole post
+            if value and (not merged.get(field) or field == 'name'):
+                if field in ('phone', 'whatsapp'):
+                    # Keep the model's value only if it is a real number
+                    value = self.normalize_phone(value)
+                merged[field] = value
+        
+        return merged
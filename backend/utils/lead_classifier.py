@@ -0,0 +1,345 @@
+"""
+Local Lead Classifier
+Hashed n-gram logistic regression trained from past Gemini analyses - pre-gate and offline fallback
+
+Train / evaluate from the backend directory:
+    python -m utils.lead_classifier train [--db PATH] [--model PATH] [--epochs N] [--test-split 0.2]
+    python -m utils.lead_classifier eval [--db PATH] [--model PATH]
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Tuple
+
+MODEL_FORMAT = 1
+
+# Cache kinds whose stored results carry Gemini's is_lead / lead_score labels
+TRAINING_KINDS = ('intent', 'intent_contact')
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9\u0900-\u097f]+')
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; digit runs collapse to their length (phone numbers, budgets)"""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall((text or '').lower()):
+        tokens.append(f'<d{min(len(token), 10)}>' if token.isdigit() else token)
+    return tokens
+
+class HashedNgramFeaturizer:
+    def __init__(self, n_features: int = 2 ** 18, ngram_max: int = 2):
+        """Initialize the hashing trick featurizer (no vocabulary to fit or store)"""
+        self.n_features = n_features
+        self.ngram_max = ngram_max
+        self._mask = n_features - 1
+    
+    def transform(self, text: str) -> Dict[int, float]:
+        """L2-normalized binary hashed n-gram features of one text"""
+        tokens = tokenize(text)
+        grams = set(tokens)
+        for n in range(2, self.ngram_max + 1):
+            grams.update(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        
+        indices = {zlib.crc32(gram.encode('utf-8')) & self._mask for gram in grams}
+        if not indices:
+            return {}
+        value = 1 / math.sqrt(len(indices))
+        return dict.fromkeys(indices, value)
+
+def _sigmoid(z: float) -> float:
+    """Numerically safe logistic function"""
+    if z >= 0:
+        return 1 / (1 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1 + e)
+
+class LeadClassifier:
+    def __init__(self, model_path: str = None):
+        """Initialize the classifier, loading the trained model when one exists"""
+        self.model_path = model_path or os.getenv('LEAD_CLASSIFIER_MODEL_PATH', '../data/models/lead_classifier.json')
+        self.enabled = os.getenv('LEAD_CLASSIFIER_ENABLED', 'True').lower() == 'true'
+        # Posts below this lead probability stop before the screen tier (0 disables the gate)
+        self.gate_threshold = float(os.getenv('LEAD_CLASSIFIER_GATE_THRESHOLD', 0.05))
+        # Posts at or above this probability skip the screen tier and go straight to extraction
+        self.escalate_threshold = float(os.getenv('LEAD_CLASSIFIER_ESCALATE_THRESHOLD', 0.95))
+        # Answer from the local model while Gemini is down instead of producing no leads
+        self.fallback_enabled = os.getenv('LEAD_CLASSIFIER_FALLBACK', 'True').lower() == 'true'
+        
+        self.featurizer = HashedNgramFeaturizer()
+        self.lead_weights = {}
+        self.lead_bias = 0.0
+        self.score_weights = {}
+        self.score_bias = 5.0
+        self.metrics = {}
+        self.trained_at = None
+        self.loaded = False
+        
+        self._lock = threading.Lock()
+        self.scored = 0
+        self.fallbacks = 0
+        
+        if self.enabled and os.path.exists(self.model_path):
+            try:
+                self.load()
+            except Exception as e:
+                logging.error(f"Could not load lead classifier from {self.model_path}: {e}")
+        
+        logging.info(f"Lead Classifier initialized (available={self.available})")
+    
+    @property
+    def available(self) -> bool:
+        """Whether a trained model is loaded and enabled"""
+        return self.enabled and self.loaded
+    
+    def _dot(self, weights: Dict[int, float], bias: float, features: Dict[int, float]) -> float:
+        """Sparse dot product"""
+        return bias + sum(weights.get(index, 0.0) * value for index, value in features.items())
+    
+    def predict_batch(self, texts: List[str]) -> List[Dict]:
+        """Score texts one by one (sparse dot products): lead probability, lead score and buying intent"""
+        lead_weights, score_weights = self.lead_weights, self.score_weights
+        predictions = []
+        for text in texts:
+            features = self.featurizer.transform(text)
+            probability = _sigmoid(self._dot(lead_weights, self.lead_bias, features))
+            score = max(1, min(10, int(round(self._dot(score_weights, self.score_bias, features)))))
+            predictions.append({
+                'is_lead': probability >= 0.5,
+                'lead_probability': round(probability, 4),
+                'lead_score': score,
+                'buying_intent': 'High' if score >= 7 else 'Medium' if score >= 4 else 'Low',
+                'confidence': round(max(probability, 1 - probability), 4)
+            })
+        
+        with self._lock:
+            self.scored += len(texts)
+        return predictions
+    
+    def gates(self, prediction: Dict) -> bool:
+        """Check whether a prediction is a confident enough non-lead to skip the model tiers"""
+        return prediction['lead_probability'] < self.gate_threshold
+    
+    def escalates(self, prediction: Dict) -> bool:
+        """Check whether a prediction is a confident enough lead to skip the screen tier"""
+        return prediction['lead_probability'] >= self.escalate_threshold
+    
+    def record_fallback(self):
+        """Count a post answered locally while Gemini was unavailable"""
+        with self._lock:
+            self.fallbacks += 1
+    
+    def fit(self, samples: List[Dict], epochs: int = 8, learning_rate: float = 0.5, l2: float = 1e-6,
+            seed: int = 13):
+        """Train both heads with SGD: class-balanced logistic loss for is_lead, squared loss for lead_score"""
+        vectors = [(self.featurizer.transform(sample['content']), sample) for sample in samples]
+        positives = sum(1 for sample in samples if sample['is_lead'])
+        negatives = len(samples) - positives
+        class_weight = {
+            True: len(samples) / (2 * positives) if positives else 1.0,
+            False: len(samples) / (2 * negatives) if negatives else 1.0
+        }
+        
+        lead_weights, score_weights = {}, {}
+        lead_bias = 0.0
+        scores = [sample['lead_score'] for sample in samples if sample.get('lead_score') is not None]
+        score_bias = sum(scores) / len(scores) if scores else 5.0
+        
+        order = list(range(len(vectors)))
+        shuffler = random.Random(seed)
+        for epoch in range(epochs):
+            shuffler.shuffle(order)
+            rate = learning_rate / (1 + epoch)
+            decay = 1 - rate * l2
+            for position in order:
+                features, sample = vectors[position]
+                
+                label = 1.0 if sample['is_lead'] else 0.0
+                error = (_sigmoid(self._dot(lead_weights, lead_bias, features)) - label) * class_weight[sample['is_lead']]
+                for index, value in features.items():
+                    lead_weights[index] = lead_weights.get(index, 0.0) * decay - rate * error * value
+                lead_bias -= rate * error
+                
+                if sample.get('lead_score') is not None:
+                    error = (self._dot(score_weights, score_bias, features) - sample['lead_score']) / 10
+                    for index, value in features.items():
+                        score_weights[index] = score_weights.get(index, 0.0) * decay - rate * error * value
+                    score_bias -= rate * error * 0.1
+        
+        # Near-zero weights only cost memory and model size
+        self.lead_weights = {index: weight for index, weight in lead_weights.items() if abs(weight) >= 1e-4}
+        self.score_weights = {index: weight for index, weight in score_weights.items() if abs(weight) >= 1e-4}
+        self.lead_bias = lead_bias
+        self.score_bias = score_bias
+        self.trained_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.loaded = True
+    
+    def evaluate(self, samples: List[Dict]) -> Dict:
+        """Accuracy, precision/recall/F1 against the Gemini labels, lead score error and throughput"""
+        start = time.perf_counter()
+        predictions = self.predict_batch([sample['content'] for sample in samples])
+        elapsed = time.perf_counter() - start
+        
+        counts = {'tp': 0, 'fp': 0, 'tn': 0, 'fn': 0}
+        score_errors = []
+        for prediction, sample in zip(predictions, samples):
+            if prediction['is_lead']:
+                counts['tp' if sample['is_lead'] else 'fp'] += 1
+            else:
+                counts['fn' if sample['is_lead'] else 'tn'] += 1
+            if sample.get('lead_score') is not None:
+                score_errors.append(abs(prediction['lead_score'] - sample['lead_score']))
+        
+        precision = counts['tp'] / (counts['tp'] + counts['fp']) if counts['tp'] + counts['fp'] else 0.0
+        recall = counts['tp'] / (counts['tp'] + counts['fn']) if counts['tp'] + counts['fn'] else 0.0
+        gated = sum(1 for prediction in predictions if self.gates(prediction))
+        gated_leads = sum(1 for prediction, sample in zip(predictions, samples)
+                          if self.gates(prediction) and sample['is_lead'])
+        return {
+            'samples': len(samples),
+            'accuracy': round((counts['tp'] + counts['tn']) / len(samples), 4) if samples else None,
+            'precision': round(precision, 4),
+            'recall': round(recall, 4),
+            'f1': round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+            'lead_score_mae': round(sum(score_errors) / len(score_errors), 3) if score_errors else None,
+            'gate_rate': round(gated / len(samples), 4) if samples else None,
+            'gated_leads': gated_leads,
+            'posts_per_second': round(len(samples) / elapsed) if elapsed else None,
+            'confusion': counts
+        }
+    
+    def save(self, path: str = None):
+        """Write the model as JSON (atomic replace)"""
+        path = path or self.model_path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        model = {
+            'format': MODEL_FORMAT,
+            'n_features': self.featurizer.n_features,
+            'ngram_max': self.featurizer.ngram_max,
+            'lead': {'bias': self.lead_bias, 'weights': self.lead_weights},
+            'score': {'bias': self.score_bias, 'weights': self.score_weights},
+            'metrics': self.metrics,
+            'trained_at': self.trained_at
+        }
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(model, f, separators=(',', ':'))
+        os.replace(temp_path, path)
+    
+    def load(self, path: str = None):
+        """Read a model written by save()"""
+        with open(path or self.model_path, encoding='utf-8') as f:
+            model = json.load(f)
+        if model.get('format') != MODEL_FORMAT:
+            raise ValueError(f"unsupported model format {model.get('format')}")
+        
+        self.featurizer = HashedNgramFeaturizer(model['n_features'], model['ngram_max'])
+        self.lead_bias = model['lead']['bias']
+        self.lead_weights = {int(index): weight for index, weight in model['lead']['weights'].items()}
+        self.score_bias = model['score']['bias']
+        self.score_weights = {int(index): weight for index, weight in model['score']['weights'].items()}
+        self.metrics = model.get('metrics', {})
+        self.trained_at = model.get('trained_at')
+        self.loaded = True
+    
+    def get_stats(self) -> Dict:
+        """Get model status, thresholds and usage counters"""
+        with self._lock:
+            return {
+                'available': self.available,
+                'trained_at': self.trained_at,
+                'gate_threshold': self.gate_threshold,
+                'escalate_threshold': self.escalate_threshold,
+                'fallback_enabled': self.fallback_enabled,
+                'scored': self.scored,
+                'fallbacks': self.fallbacks,
+                'metrics': self.metrics
+            }
+
+def load_training_samples(db_path: str = None) -> List[Dict]:
+    """Read Gemini-labeled posts from the analysis cache"""
+    db_path = db_path or os.getenv('GEMINI_CACHE_PATH', '../data/cache/gemini_cache.db')
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        rows = conn.execute(
+            f"SELECT content, result FROM analyses WHERE kind IN ({', '.join('?' * len(TRAINING_KINDS))})",
+            TRAINING_KINDS
+        ).fetchall()
+    finally:
+        conn.close()
+    
+    samples = {}
+    for content, result in rows:
+        try:
+            result = json.loads(result)
+        except ValueError:
+            continue
+        if not isinstance(result, dict) or not isinstance(result.get('is_lead'), bool):
+            continue
+        try:
+            score = int(result['lead_score']) if result.get('lead_score') is not None else None
+        except (TypeError, ValueError):
+            score = None
+        # One sample per text, whichever prompt version labeled it last
+        samples[content] = {'content': content, 'is_lead': result['is_lead'], 'lead_score': score}
+    return list(samples.values())
+
+def split_samples(samples: List[Dict], test_split: float) -> Tuple[List[Dict], List[Dict]]:
+    """Deterministic train/test split by content hash (stable as the cache grows)"""
+    train, test = [], []
+    for sample in samples:
+        bucket = zlib.crc32(sample['content'].encode('utf-8')) % 1000
+        (test if bucket < test_split * 1000 else train).append(sample)
+    return train, test
+
+def main(argv: List[str] = None):
+    """Train or evaluate the local classifier from stored Gemini analyses"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('command', choices=('train', 'eval'))
+    parser.add_argument('--db', help='analysis cache database (default GEMINI_CACHE_PATH)')
+    parser.add_argument('--model', help='model file (default LEAD_CLASSIFIER_MODEL_PATH)')
+    parser.add_argument('--epochs', type=int, default=8)
+    parser.add_argument('--test-split', type=float, default=0.2, help='held-out share of the samples')
+    parser.add_argument('--min-samples', type=int, default=int(os.getenv('LEAD_CLASSIFIER_MIN_SAMPLES', 50)))
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    samples = load_training_samples(args.db)
+    train, test = split_samples(samples, args.test_split)
+    print(f"{len(samples)} labeled posts ({sum(1 for s in samples if s['is_lead'])} leads): "
+          f"{len(train)} train / {len(test)} test")
+    
+    if args.command == 'train':
+        if len(train) < args.min_samples:
+            parser.error(f"need at least {args.min_samples} training samples, found {len(train)}")
+        classifier = LeadClassifier(args.model)
+        started = time.perf_counter()
+        classifier.fit(train, epochs=args.epochs)
+        classifier.metrics = dict(
+            classifier.evaluate(test or train),
+            evaluated_on='test' if test else 'train',
+            train_samples=len(train),
+            train_seconds=round(time.perf_counter() - started, 2)
+        )
+        classifier.save()
+        print(f"Saved model to {classifier.model_path}")
+        print(json.dumps(classifier.metrics, indent=2))
+    else:
+        classifier = LeadClassifier(args.model)
+        if not os.path.exists(classifier.model_path):
+            parser.error(f"no trained model at {classifier.model_path}")
+        classifier.load()
+        print(json.dumps(classifier.evaluate(test or samples), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,407 @@
+"""
+Lead Field Parser
+Deterministic property type, budget (in rupees) and Gurgaon location parsing for lead posts
+"""
+
+import re
+import threading
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Tuple
+
+class PropertyCategory(str, Enum):
+    APARTMENT = 'apartment'
+    BUILDER_FLOOR = 'builder_floor'
+    INDEPENDENT_HOUSE = 'independent_house'
+    VILLA = 'villa'
+    PLOT = 'plot'
+    COMMERCIAL = 'commercial'
+    PG = 'pg'
+    STUDIO = 'studio'
+
+CATEGORY_LABELS = {
+    PropertyCategory.APARTMENT: 'Apartment',
+    PropertyCategory.BUILDER_FLOOR: 'Builder Floor',
+    PropertyCategory.INDEPENDENT_HOUSE: 'Independent House',
+    PropertyCategory.VILLA: 'Villa',
+    PropertyCategory.PLOT: 'Plot',
+    PropertyCategory.COMMERCIAL: 'Commercial',
+    PropertyCategory.PG: 'PG',
+    PropertyCategory.STUDIO: 'Studio'
+}
+
+CATEGORY_PATTERNS = [
+    (PropertyCategory.BUILDER_FLOOR, r'builder\s*floor|independent\s+floor|floor\s+for\s+(?:rent|sale)'),
+    (PropertyCategory.VILLA, r'villas?|farm\s*house'),
+    (PropertyCategory.PLOT, r'plots?|land|प्लॉट|जमीन'),
+    (PropertyCategory.COMMERCIAL, r'commercial|office(?:\s+space)?|shops?|showroom|sco|retail\s+space|co-?working|warehouse|दुकान'),
+    (PropertyCategory.PG, r'pg|paying\s+guest|hostel'),
+    (PropertyCategory.STUDIO, r'studio|1\s*rk'),
+    (PropertyCategory.INDEPENDENT_HOUSE, r'independent\s+house|kothi|bungalow|मकान'),
+    (PropertyCategory.APARTMENT, r'flats?|apartments?|condo|penthouse|फ्लैट')
+]
+CATEGORY_PATTERNS = [
+    (category, re.compile(r'(?<!\w)(?:' + pattern + r')(?!\w)', re.IGNORECASE))
+    for category, pattern in CATEGORY_PATTERNS
+]
+
+BHK_PATTERN = re.compile(r'(?<![\d.])([1-9](?:\.5)?)\s*(?:bhk|b\s*h\s*k|bed\s*rooms?|beds?|br)\b', re.IGNORECASE)
+
+# Budgets: amounts need a unit (k/lakh/crore) or a currency marker to count
+_NUMBER = r'(\d+(?:,\d{2,3})*(?:\.\d+)?)'
+_UNIT = r'(thousand|crores|crore|cror|crs|cr|lakhs|lakh|lacs|lac|lkh|l|k)'
+_CURRENCY = r'(?:\brs\b\.?|₹|\binr\b)'
+BUDGET_RANGE_PATTERN = re.compile(
+    rf'{_CURRENCY}?\s*{_NUMBER}\s*{_UNIT}?\s*(?:-|–|to|se)\s*{_CURRENCY}?\s*{_NUMBER}\s*{_UNIT}\b',
+    re.IGNORECASE
+)
+BUDGET_SINGLE_PATTERN = re.compile(
+    rf'(?:\b(?P<modifier>under|upto|up\s+to|within|below|less\s+than|max(?:imum)?|tak|above|over|more\s+than|min(?:imum)?|starting(?:\s+from)?|from)\s+)?'
+    rf'(?:{_CURRENCY}\s*{_NUMBER}\s*{_UNIT}?\b|{_NUMBER}\s*{_UNIT}\b)'
+    # Hindi puts "tak" after the amount ("1.2cr tak"), as English does with "max"
+    rf'(?:\s+(?P<suffix>tak|max(?:imum)?)\b)?',
+    re.IGNORECASE
+)
+MAX_MODIFIERS = ('under', 'upto', 'up to', 'within', 'below', 'less than', 'max', 'maximum', 'tak')
+MIN_MODIFIERS = ('above', 'over', 'more than', 'min', 'minimum', 'starting', 'starting from', 'from')
+
+UNIT_VALUES = {
+    'k': 1e3, 'thousand': 1e3,
+    'l': 1e5, 'lac': 1e5, 'lacs': 1e5, 'lakh': 1e5, 'lakhs': 1e5, 'lkh': 1e5,
+    'cr': 1e7, 'crs': 1e7, 'crore': 1e7, 'crores': 1e7, 'cror': 1e7
+}
+
+RENT_PATTERN = re.compile(
+    r'\b(?:rent(?:al)?|lease|kiraye|kiraya|pg|per\s+month|monthly|p\.?m\.?)\b|/\s*month|किराए',
+    re.IGNORECASE
+)
+
+# Below this a monthly rent is far more likely than a purchase price
+MAX_MONTHLY_RENT = 10e5
+
+# Gurgaon gazetteer: projects (name, sector, aliases) and localities (name, aliases); sectors are generated
+PROJECTS = [
+    ('M3M Heights', 65, ['m3m heights', 'm3mheights']),
+    ('M3M Golf Estate', 65, ['m3m golf estate', 'm3m golfestate']),
+    ('M3M Merlin', 67, ['m3m merlin']),
+    ('M3M Skywalk', 74, ['m3m skywalk']),
+    ('M3M Golf Hills', 79, ['m3m golf hills', 'm3m golfhills']),
+    ('M3M Woodshire', 107, ['m3m woodshire']),
+    ('M3M Crown', 111, ['m3m crown']),
+    ('M3M Capital', 113, ['m3m capital']),
+    ('DLF Camellias', 42, ['dlf camellias', 'the camellias']),
+    ('DLF Magnolias', 42, ['dlf magnolias', 'the magnolias']),
+    ('DLF Aralias', 42, ['dlf aralias', 'the aralias']),
+    ('DLF The Crest', 54, ['dlf the crest', 'dlf crest']),
+    ('DLF Park Place', 54, ['dlf park place']),
+    ('DLF The Arbour', 63, ['dlf the arbour', 'dlf arbour']),
+    ('DLF Privana', 76, ['dlf privana', 'privana']),
+    ('DLF Skycourt', 86, ['dlf skycourt', 'dlf sky court']),
+    ('Ireo Grand Arch', 58, ['ireo grand arch', 'grand arch']),
+    ('Ireo Skyon', 60, ['ireo skyon']),
+    ('Ireo Victory Valley', 67, ['ireo victory valley', 'victory valley']),
+    ('Emaar Palm Drive', 66, ['emaar palm drive', 'palm drive']),
+    ('Emaar Marbella', 66, ['emaar marbella']),
+    ('Emaar Palm Gardens', 83, ['emaar palm gardens']),
+    ('Godrej Aria', 79, ['godrej aria']),
+    ('Godrej Air', 85, ['godrej air']),
+    ('Godrej Meridien', 106, ['godrej meridien']),
+    ('Tata Primanti', 72, ['tata primanti', 'primanti']),
+    ('Tata Gurgaon Gateway', 113, ['tata gurgaon gateway']),
+    ('Sobha City', 108, ['sobha city']),
+    ('Vatika City', 49, ['vatika city']),
+    ('Central Park Resorts', 48, ['central park resorts']),
+    ('Bestech Park View Spa', 47, ['bestech park view spa', 'park view spa']),
+    ('Ambience Caitriona', 24, ['ambience caitriona']),
+    ('Puri Emerald Bay', 104, ['puri emerald bay', 'emerald bay']),
+    ('Experion Windchants', 112, ['experion windchants', 'windchants']),
+    ('Smartworld Orchard', 61, ['smartworld orchard', 'smart world orchard']),
+    ('Elan The Presidential', 106, ['elan the presidential', 'elan presidential'])
+]
+
+LOCALITIES = [
+    ('DLF Phase 1', ['dlf phase 1', 'dlf phase i', 'dlf ph 1']),
+    ('DLF Phase 2', ['dlf phase 2', 'dlf phase ii', 'dlf ph 2']),
+    ('DLF Phase 3', ['dlf phase 3', 'dlf phase iii', 'dlf ph 3']),
+    ('DLF Phase 4', ['dlf phase 4', 'dlf phase iv', 'dlf ph 4']),
+    ('DLF Phase 5', ['dlf phase 5', 'dlf phase v', 'dlf ph 5']),
+    ('Golf Course Road', ['golf course road', 'golf course rd', 'gcr']),
+    ('Golf Course Extension Road', ['golf course extension road', 'golf course extn road', 'golf course ext road', 'gcer']),
+    ('Sohna Road', ['sohna road', 'sohna rd']),
+    ('MG Road', ['mg road', 'm g road']),
+    ('Cyber City', ['cyber city', 'cyber hub', 'cyberhub']),
+    ('Udyog Vihar', ['udyog vihar']),
+    ('Palam Vihar', ['palam vihar']),
+    ('South City 1', ['south city 1', 'south city i']),
+    ('South City 2', ['south city 2', 'south city ii']),
+    ('Sushant Lok 1', ['sushant lok 1', 'sushant lok i']),
+    ('Sushant Lok 2', ['sushant lok 2', 'sushant lok ii']),
+    ('Sushant Lok 3', ['sushant lok 3', 'sushant lok iii']),
+    ('Nirvana Country', ['nirvana country']),
+    ('New Gurgaon', ['new gurgaon', 'new gurugram']),
+    ('Dwarka Expressway', ['dwarka expressway', 'dwarka e way', 'dwarka eway', 'northern peripheral road']),
+    ('Southern Peripheral Road', ['southern peripheral road', 'spr']),
+    ('Manesar', ['manesar']),
+    ('Sohna', ['sohna'])
+]
+
+CITY_ALIASES = ['gurgaon', 'gurugram', 'ggn', 'गुड़गांव', 'गुरुग्राम']
+
+SECTOR_SUFFIXES = ['37c', '37d', '70a', '88a', '88b', '89a', '89b', '95a', '95b', '99a', '102a']
+SECTOR_PREFIXES = ['sector', 'sec', 'sect', 'sector no', 'सेक्टर']
+
+_SPLIT_ALNUM = re.compile(r'(?<=[^\W\d])(?=\d)|(?<=\d)(?=[^\W\d])')
+_NON_WORD = re.compile(r'[\W_]+')
+
+def normalize_text(text: str) -> str:
+    """Lowercase, split letters from digits (sec65 -> sec 65) and collapse punctuation to single spaces"""
+    text = _SPLIT_ALNUM.sub(' ', (text or '').lower())
+    return ' ' + _NON_WORD.sub(' ', text).strip() + ' '
+
+class AhoCorasick:
+    def __init__(self):
+        """Initialize an empty automaton (add patterns, then build)"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+    
+    def add(self, pattern: str, value):
+        """Add a pattern and the value reported when it matches"""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), value))
+    
+    def build(self):
+        """Compute failure links breadth-first"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+    
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, object]]:
+        """Yield (start, end, value) for every pattern occurrence in one pass over text"""
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._output[state]:
+                yield position - length + 1, position + 1, value
+
+def _build_gazetteer() -> AhoCorasick:
+    """Automaton over every gazetteer alias, padded with spaces so matches fall on word boundaries"""
+    matcher = AhoCorasick()
+    
+    def add(alias, entry):
+        matcher.add(normalize_text(alias), entry)
+    
+    sectors = [str(number) for number in range(1, 116)] + SECTOR_SUFFIXES
+    for sector in sectors:
+        entry = {'kind': 'sector', 'sector': sector.upper(), 'name': f'Sector {sector.upper()}'}
+        for prefix in SECTOR_PREFIXES:
+            add(f'{prefix} {sector}', entry)
+    
+    for name, sector, aliases in PROJECTS:
+        entry = {'kind': 'project', 'sector': str(sector), 'name': name}
+        for alias in aliases:
+            add(alias, entry)
+    
+    for name, aliases in LOCALITIES:
+        entry = {'kind': 'locality', 'name': name}
+        for alias in aliases:
+            add(alias, entry)
+    
+    for alias in CITY_ALIASES:
+        add(alias, {'kind': 'city', 'name': 'Gurgaon'})
+    
+    matcher.build()
+    return matcher
+
+def _format_rupees(amount: float) -> str:
+    """Short Indian-unit rendering of an amount (₹1.5 Cr, ₹70 L, ₹30K)"""
+    for divisor, suffix in ((1e7, ' Cr'), (1e5, ' L'), (1e3, 'K')):
+        if amount >= divisor:
+            return f"₹{amount / divisor:.2f}".rstrip('0').rstrip('.') + suffix
+    return f"₹{amount:.0f}"
+
+class LeadParser:
+    def __init__(self):
+        """Initialize the gazetteer matcher and fill counters"""
+        self.gazetteer = _build_gazetteer()
+        self._lock = threading.Lock()
+        self.stats = {'parsed': 0, 'property': 0, 'budget': 0, 'location': 0, 'ambiguous_location': 0}
+    
+    def parse(self, text: str) -> Dict:
+        """Parse property type, budget and location; only confident fields are returned"""
+        parsed = {}
+        parsed.update(self.parse_property(text))
+        parsed.update(self.parse_budget(text))
+        location = self.parse_location(text)
+        if location.get('ambiguous'):
+            location = {}
+            self._count('ambiguous_location')
+        parsed.update(location)
+        
+        with self._lock:
+            self.stats['parsed'] += 1
+            for field, key in (('property', 'property_category'), ('budget', 'budget_range'), ('location', 'location')):
+                if key in parsed:
+                    self.stats[field] += 1
+        return parsed
+    
+    def _count(self, key: str):
+        """Increment a counter"""
+        with self._lock:
+            self.stats[key] += 1
+    
+    def parse_property(self, text: str) -> Dict:
+        """Property category enum, BHK count and a display label"""
+        categories = []
+        for category, pattern in CATEGORY_PATTERNS:
+            match = pattern.search(text or '')
+            if match:
+                categories.append((match.start(), category))
+        
+        bhk_match = BHK_PATTERN.search(text or '')
+        bhk = float(bhk_match.group(1)) if bhk_match else None
+        if bhk is not None and bhk.is_integer():
+            bhk = int(bhk)
+        
+        distinct = {category for _, category in categories}
+        if not distinct:
+            if bhk is None:
+                return {}
+            distinct = {PropertyCategory.APARTMENT}
+            categories = [(0, PropertyCategory.APARTMENT)]
+        if len(distinct) > 1:
+            # "flat" often accompanies a more specific word ("builder floor flat"); anything else is ambiguous
+            distinct.discard(PropertyCategory.APARTMENT)
+            if len(distinct) > 1:
+                return {}
+        category = distinct.pop()
+        
+        label = CATEGORY_LABELS[category]
+        result = {'property_category': category.value, 'property_type': f'{bhk} BHK {label}' if bhk else label}
+        if bhk is not None:
+            result['bhk'] = bhk
+        return result
+    
+    def parse_budget(self, text: str) -> Dict:
+        """Budget as a min/max in rupees (monthly for rents)"""
+        text = text or ''
+        low = high = None
+        
+        match = BUDGET_RANGE_PATTERN.search(text)
+        if match:
+            first, first_unit, second, second_unit = match.groups()
+            high = self._amount(second, second_unit)
+            low = self._amount(first, first_unit or second_unit)
+            if low is not None and high is not None and low > high and not first_unit:
+                # "80 lakh to 1.2 cr" style ranges carry their own units; "1-1.5 cr" shares one
+                low = self._amount(first, second_unit)
+        else:
+            for match in BUDGET_SINGLE_PATTERN.finditer(text):
+                groups = match.groups()
+                number, unit = (groups[1], groups[2]) if groups[1] else (groups[3], groups[4])
+                amount = self._amount(number, unit)
+                if amount is None or (not unit and amount < 1000):
+                    continue
+                modifier = re.sub(r'\s+', ' ', (match.group('modifier') or match.group('suffix') or '').lower())
+                if modifier in MAX_MODIFIERS:
+                    high = amount
+                elif modifier in MIN_MODIFIERS:
+                    low = amount
+                else:
+                    low = high = amount
+                break
+        
+        if low is None and high is None:
+            return {}
+        if low is not None and high is not None and low > high:
+            low, high = high, low
+        
+        monthly = bool(RENT_PATTERN.search(text)) and (high or low) <= MAX_MONTHLY_RENT
+        if low is not None and high is not None:
+            display = _format_rupees(low) if low == high else f'{_format_rupees(low)} - {_format_rupees(high)}'
+        elif high is not None:
+            display = f'Up to {_format_rupees(high)}'
+        else:
+            display = f'{_format_rupees(low)}+'
+        
+        return {
+            'budget_min': int(low) if low is not None else None,
+            'budget_max': int(high) if high is not None else None,
+            'budget_period': 'monthly' if monthly else 'total',
+            'budget_range': display + ('/month' if monthly else '')
+        }
+    
+    def _amount(self, number: str, unit: Optional[str]) -> Optional[float]:
+        """Rupee value of a number and unit"""
+        try:
+            value = float(number.replace(',', ''))
+        except (AttributeError, ValueError):
+            return None
+        return value * UNIT_VALUES.get((unit or '').lower(), 1)
+    
+    def parse_location(self, text: str) -> Dict:
+        """Most specific gazetteer location (project > sector > locality > city)"""
+        normalized = normalize_text(text)
+        matches = self._select_matches(self.gazetteer.iter_matches(normalized))
+        if not matches:
+            return {}
+        
+        projects, sectors, localities = {}, {}, {}
+        for entry in matches:
+            if entry['kind'] == 'project':
+                projects[entry['name']] = entry
+                sectors.setdefault(entry['sector'], entry)
+            elif entry['kind'] == 'sector':
+                sectors.setdefault(entry['sector'], entry)
+            elif entry['kind'] == 'locality':
+                localities[entry['name']] = entry
+        
+        if len(projects) > 1 or len(sectors) > 1:
+            return {'ambiguous': True, 'candidates': sorted(set(projects) | {f'Sector {s}' for s in sectors})}
+        
+        if projects:
+            project = next(iter(projects.values()))
+            return {'location': f"{project['name']}, Sector {project['sector']}", 'project': project['name'],
+                    'sector': project['sector']}
+        if sectors:
+            sector = next(iter(sectors))
+            location = f'Sector {sector}'
+            if len(localities) == 1:
+                location += f', {next(iter(localities))}'
+            return {'location': location, 'sector': sector}
+        if len(localities) > 1:
+            return {'ambiguous': True, 'candidates': sorted(localities)}
+        if localities:
+            return {'location': next(iter(localities))}
+        return {'location': 'Gurgaon'}
+    
+    def _select_matches(self, matches) -> List[Dict]:
+        """Leftmost-longest non-overlapping matches (aliases are space-padded, so they share boundary spaces)"""
+        selected = []
+        last_end = 0
+        for start, end, entry in sorted(matches, key=lambda match: (match[0], -(match[1] - match[0]))):
+            if start + 1 >= last_end:
+                selected.append(entry)
+                last_end = end
+        return selected
+    
+    def get_stats(self) -> Dict:
+        """Get fill counters"""
+        with self._lock:
+            return dict(self.stats)
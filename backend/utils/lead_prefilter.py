@@ -0,0 +1,197 @@
+"""
+Lead Pre-filter
+Fast local rule scoring (English, Hindi, Hinglish) that keeps obvious non-leads away from Gemini
+"""
+
+import logging
+import os
+import random
+import re
+import threading
+from typing import Dict, List, Tuple
+
+def _compile(phrases: List[str]) -> re.Pattern:
+    """Compile a phrase list into one case-insensitive alternation"""
+    return re.compile(r'(?<!\w)(?:' + '|'.join(phrases) + r')(?!\w)', re.IGNORECASE)
+
+# Buying/renting intent
+INTENT_PATTERN = _compile([
+    r'looking\s+for', r'looking\s+to\s+(?:buy|rent|purchase)', r'searching\s+for', r'in\s+search\s+of',
+    r'need(?:ed)?', r'required?', r'requirement', r'want(?:ed)?\s+(?:to\s+(?:buy|rent|purchase)|a|an)',
+    r'interested\s+in\s+(?:buying|renting|purchasing)', r'planning\s+to\s+buy', r'wanted',
+    r'anyone\s+(?:selling|renting|having|has)', r'please\s+suggest', r'any\s+(?:leads?|suggestions?)',
+    r'can\s+anyone\s+help', r'help\s+me\s+find',
+    # Hinglish
+    r'chahiye', r'chaiye', r'chahie', r'dhoo?n?dh?\s*(?:raha|rahi|rahe)', r'dhund\s*(?:raha|rahi|rahe)',
+    r'lena\s+hai', r'leni\s+hai', r'kharidna\s+hai', r'kharidna', r'kiraye\s+(?:pe|par)', r'koi\s+batao',
+    r'batao', r'mil\s+jaye', r'mil\s+jayega',
+    # Hindi (Devanagari)
+    r'चाहिए', r'चाहिये', r'ढूंढ\s*रहा', r'ढूंढ\s*रही', r'खरीदना', r'लेना\s+है', r'किराए\s+पर', r'बताइए', r'बताओ'
+])
+
+# Property requirement
+PROPERTY_PATTERN = _compile([
+    r'[1-6]\s*\.?5?\s*bhk', r'[1-6]\s*bed(?:room)?s?', r'studio', r'penthouse', r'villa', r'flat', r'apartment',
+    r'builder\s+floor', r'independent\s+floor', r'plot', r'house', r'office\s+space', r'shop', r'pg',
+    r'फ्लैट', r'मकान', r'प्लॉट', r'घर'
+])
+
+# Budget mentions: a budget word or currency marker followed by an amount, or an amount with a unit
+BUDGET_PATTERN = re.compile(
+    r'(?:\b(?:budget|under|upto|up\s+to|within|inr|rs)\b\.?|बजट|₹)\s*:?\s*\d[\d.,]*'
+    r'|\b\d+(?:\.\d+)?\s*(?:-|to)?\s*\d*(?:\.\d+)?\s*(?:l|lac|lacs|lakh|lakhs|cr|crs|crore|crores|k)\b',
+    re.IGNORECASE
+)
+
+# Direct contact details or contact requests
+CONTACT_PATTERN = re.compile(
+    r'(?:\+?91[\s-]?)?[6-9]\d{4}[\s-]?\d{5}\b'
+    r'|[\w.+-]+@[\w-]+\.[\w.]+'
+    r'|\b(?:dm|inbox|call|whatsapp|contact|ping|message)\s+me\b'
+    r'|\bwhatsapp\b',
+    re.IGNORECASE
+)
+
+# Urgency/timeline
+TIMELINE_PATTERN = _compile([
+    r'urgent(?:ly)?', r'immediately', r'asap', r'this\s+month', r'next\s+month', r'within\s+\d+\s+(?:days|weeks|months)',
+    r'jaldi', r'turant', r'तुरंत', r'जल्दी'
+])
+
+# Broker/builder promotion
+PROMO_PATTERN = _compile([
+    r'for\s+sale', r'available\s+for\s+(?:sale|rent)', r'booking\s+(?:open|started)', r'book\s+now', r'call\s+now',
+    r'new\s+launch', r'pre[\s-]?launch', r'launching', r'limited\s+(?:units|inventory|period)', r'price\s+starts?',
+    r'starting\s+(?:price|from|@)', r'best\s+(?:deal|price|offer)s?', r'offer', r'site\s+visit', r'possession',
+    r'investment\s+opportunity', r'assured\s+returns?', r'channel\s+partner', r'brokerage', r'rera',
+    r'eoi', r'we\s+(?:have|are\s+offering|offer|deal\s+in)', r'contact\s+us', r'our\s+project', r'hurry',
+    r'resale', r'ready\s+to\s+move\s+(?:flats|apartments|units)', r'dm\s+for\s+(?:price|details)', r'link\s+in\s+bio'
+])
+
+HASHTAG_PATTERN = re.compile(r'#\w+')
+
+class LeadPrefilter:
+    # Signal weights
+    INTENT_WEIGHT = 3.0
+    PROPERTY_WEIGHT = 1.0
+    BUDGET_WEIGHT = 1.0
+    CONTACT_WEIGHT = 1.0
+    TIMELINE_WEIGHT = 1.0
+    PROMO_WEIGHT = -2.0
+    HASHTAG_SPAM_WEIGHT = -1.0
+    
+    def __init__(self, min_score: float = None, audit_rate: float = None):
+        """Initialize pre-filter with tunable thresholds"""
+        self.enabled = os.getenv('LEAD_PREFILTER_ENABLED', 'True').lower() == 'true'
+        self.min_score = min_score if min_score is not None else float(os.getenv('LEAD_PREFILTER_MIN_SCORE', 3))
+        self.max_hashtags = int(os.getenv('LEAD_PREFILTER_MAX_HASHTAGS', 12))
+        
+        # Share of rejected posts still sent to Gemini so recall can be measured
+        self.audit_rate = audit_rate if audit_rate is not None else float(os.getenv('LEAD_PREFILTER_AUDIT_RATE', 0.05))
+        
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.passed = 0
+        self.rejected = 0
+        self.audited = 0
+        self.confusion = {'true_positive': 0, 'false_positive': 0, 'false_negative': 0, 'true_negative': 0}
+        
+        logging.info(f"Lead Pre-filter initialized (enabled={self.enabled}, min_score={self.min_score})")
+    
+    def score(self, text: str) -> Dict:
+        """Score text for lead likelihood and list the signals that fired"""
+        signals = []
+        score = 0.0
+        
+        if INTENT_PATTERN.search(text):
+            score += self.INTENT_WEIGHT
+            signals.append('intent')
+        if PROPERTY_PATTERN.search(text):
+            score += self.PROPERTY_WEIGHT
+            signals.append('property')
+        if BUDGET_PATTERN.search(text):
+            score += self.BUDGET_WEIGHT
+            signals.append('budget')
+        if CONTACT_PATTERN.search(text):
+            score += self.CONTACT_WEIGHT
+            signals.append('contact')
+        if TIMELINE_PATTERN.search(text):
+            score += self.TIMELINE_WEIGHT
+            signals.append('timeline')
+        
+        promo_hits = len(PROMO_PATTERN.findall(text))
+        if promo_hits:
+            score += self.PROMO_WEIGHT * min(promo_hits, 3)
+            signals.append(f'promotional:{promo_hits}')
+        
+        if len(HASHTAG_PATTERN.findall(text)) > self.max_hashtags:
+            score += self.HASHTAG_SPAM_WEIGHT
+            signals.append('hashtag_spam')
+        
+        return {'score': score, 'signals': signals, 'passed': score >= self.min_score}
+    
+    def check(self, text: str) -> Tuple[bool, bool, Dict]:
+        """Decide whether text should reach the LLM; returns (analyze, passed_filter, score)"""
+        result = self.score(text)
+        
+        with self._lock:
+            self.evaluated += 1
+            if result['passed']:
+                self.passed += 1
+            else:
+                self.rejected += 1
+        
+        if not self.enabled or result['passed']:
+            return True, result['passed'], result
+        
+        if self.audit_rate > 0 and random.random() < self.audit_rate:
+            with self._lock:
+                self.audited += 1
+            return True, False, result
+        
+        return False, False, result
+    
+    def record_outcome(self, passed_filter: bool, llm_is_lead: bool):
+        """Record the LLM decision for a post the filter scored"""
+        if passed_filter and llm_is_lead:
+            key = 'true_positive'
+        elif passed_filter:
+            key = 'false_positive'
+        elif llm_is_lead:
+            key = 'false_negative'
+        else:
+            key = 'true_negative'
+        
+        with self._lock:
+            self.confusion[key] += 1
+    
+    def get_report(self) -> Dict:
+        """Precision/recall of the filter against LLM decisions"""
+        with self._lock:
+            confusion = dict(self.confusion)
+            report = {
+                'enabled': self.enabled,
+                'min_score': self.min_score,
+                'audit_rate': self.audit_rate,
+                'evaluated': self.evaluated,
+                'passed': self.passed,
+                'rejected': self.rejected,
+                'audited': self.audited,
+                'llm_calls_avoided': self.rejected - self.audited if self.enabled else 0,
+                'confusion': confusion
+            }
+        
+        tp = confusion['true_positive']
+        fp = confusion['false_positive']
+        fn = confusion['false_negative']
+        
+        report['precision'] = round(tp / (tp + fp), 3) if (tp + fp) else None
+        
+        # Only a sample of rejected posts is audited, so scale missed leads up by the audit rate
+        if self.enabled and self.audit_rate > 0:
+            estimated_fn = fn / self.audit_rate
+        else:
+            estimated_fn = fn
+        report['recall'] = round(tp / (tp + estimated_fn), 3) if (tp + estimated_fn) else None
+        
+        return report
@@ -0,0 +1,225 @@
+"""
+Near-Duplicate Detection
+SimHash fingerprints over word shingles with an LSH band index, persisted between runs
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Cross-posted captions differ mostly in hashtags, mentions and links
+_STRIP_PATTERN = re.compile(r'https?://\S+|www\.\S+|[#@][\w.]+')
+_TOKEN_PATTERN = re.compile(r'[0-9a-zऀ-ॿ]+')
+
+FINGERPRINT_BITS = 64
+
+class NearDuplicateIndex:
+    def __init__(self, path: str = None, max_distance: int = None, max_entries: int = None, shingle_size: int = 3):
+        """Initialize index and load persisted fingerprints"""
+        self.path = path or os.getenv('NEAR_DUPLICATE_INDEX_PATH', '../data/cache/near_duplicates.json')
+        self.enabled = os.getenv('NEAR_DUPLICATE_ENABLED', 'True').lower() == 'true'
+        self.max_distance = max_distance if max_distance is not None else int(os.getenv('NEAR_DUPLICATE_MAX_DISTANCE', 3))
+        self.max_entries = max_entries or int(os.getenv('NEAR_DUPLICATE_MAX_ENTRIES', 20000))
+        self.shingle_size = shingle_size
+        self.min_tokens = 5
+        
+        # The index is rewritten as a whole, so it is saved every N changes or T seconds (and at exit)
+        self.save_every = int(os.getenv('NEAR_DUPLICATE_SAVE_EVERY', 200))
+        self.save_interval = float(os.getenv('NEAR_DUPLICATE_SAVE_INTERVAL_SECONDS', 60))
+        
+        # Pigeonhole: with max_distance + 1 bands, a near-duplicate matches at least one band exactly
+        self.band_count = self.max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.band_count
+        self.band_mask = (1 << self.band_bits) - 1
+        
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.bands = {}
+        self.changes = 0
+        self.last_saved = time.time()
+        
+        # Counters for this process
+        self.lookups = 0
+        self.duplicates_found = 0
+        
+        if self.enabled:
+            self.load()
+            atexit.register(self.save)
+        
+        logging.info(f"Near-duplicate index initialized ({len(self.entries)} fingerprints, max_distance={self.max_distance})")
+    
+    def fingerprint(self, text: str) -> Optional[int]:
+        """64-bit SimHash of the text's word shingles (None if too short to be reliable)"""
+        tokens = _TOKEN_PATTERN.findall(_STRIP_PATTERN.sub(' ', (text or '').lower()))
+        if len(tokens) < self.min_tokens:
+            return None
+        
+        size = self.shingle_size
+        shingles = {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+        
+        weights = [0] * FINGERPRINT_BITS
+        for shingle in shingles:
+            value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+            for bit in range(FINGERPRINT_BITS):
+                weights[bit] += 1 if (value >> bit) & 1 else -1
+        
+        fingerprint = 0
+        for bit, weight in enumerate(weights):
+            if weight > 0:
+                fingerprint |= 1 << bit
+        return fingerprint
+    
+    def _band_keys(self, fingerprint: int) -> List[tuple]:
+        """LSH band keys of a fingerprint"""
+        return [(band, (fingerprint >> (band * self.band_bits)) & self.band_mask) for band in range(self.band_count)]
+    
+    def find(self, text: str, doc_id: str = None) -> Optional[Dict]:
+        """Find the canonical entry this text nearly duplicates, if any (its own entry wins ties)"""
+        if not self.enabled:
+            return None
+        
+        fingerprint = self.fingerprint(text)
+        if fingerprint is None:
+            return None
+        
+        with self._lock:
+            self.lookups += 1
+            
+            # A post whose text changed since it was indexed only matches itself while still near
+            best = None
+            best_rank = (self.max_distance + 1, False)
+            for band_key in self._band_keys(fingerprint):
+                for candidate_id in self.bands.get(band_key, ()):
+                    entry = self.entries[candidate_id]
+                    rank = (bin(entry['fingerprint'] ^ fingerprint).count('1'), candidate_id != doc_id)
+                    if rank < best_rank:
+                        best, best_rank = entry, rank
+            
+            if best and best['id'] != doc_id:
+                self.duplicates_found += 1
+            return dict(best) if best else None
+    
+    def add(self, doc_id: str, text: str, url: str = '', analysis_ref: Dict = None):
+        """Register a canonical post (or update where its analysis is cached)"""
+        # analysis_ref holds the cache key, prompt version and model of the canonical analysis - the
+        # analysis itself stays in the AnalysisCache so its TTL, invalidation and purges apply
+        if not self.enabled or not doc_id:
+            return
+        
+        fingerprint = self.fingerprint(text)
+        if fingerprint is None:
+            return
+        
+        with self._lock:
+            entry = self.entries.get(doc_id)
+            if entry and entry['fingerprint'] == fingerprint:
+                if analysis_ref is not None and entry.get('analysis_ref') != analysis_ref:
+                    entry['analysis_ref'] = dict(analysis_ref)
+                    self.changes += 1
+                return
+            if entry:
+                # The post was edited - re-index it under its new text
+                self._remove_locked(entry)
+            
+            self.entries[doc_id] = {
+                'id': doc_id,
+                'fingerprint': fingerprint,
+                'url': url,
+                'analysis_ref': dict(analysis_ref) if analysis_ref else None,
+                'added_at': time.time()
+            }
+            for band_key in self._band_keys(fingerprint):
+                self.bands.setdefault(band_key, set()).add(doc_id)
+            self.changes += 1
+            
+            if len(self.entries) > self.max_entries:
+                # Evict in chunks so a full index is not re-sorted on every add
+                self._evict_oldest_locked(len(self.entries) - self.max_entries + self.max_entries // 10)
+    
+    def _evict_oldest_locked(self, count: int):
+        """Drop the oldest fingerprints"""
+        oldest = sorted(self.entries.values(), key=lambda entry: entry['added_at'])[:count]
+        for entry in oldest:
+            self._remove_locked(entry)
+    
+    def _remove_locked(self, entry: Dict):
+        """Drop one fingerprint from the entries and band index"""
+        for band_key in self._band_keys(entry['fingerprint']):
+            members = self.bands.get(band_key)
+            if members:
+                members.discard(entry['id'])
+                if not members:
+                    del self.bands[band_key]
+        del self.entries[entry['id']]
+    
+    def load(self):
+        """Load fingerprints persisted by earlier runs"""
+        if not os.path.exists(self.path):
+            return
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            
+            with self._lock:
+                for entry in stored.get('entries', []):
+                    entry['fingerprint'] = int(entry['fingerprint'], 16)
+                    # Older indexes embedded whole analyses; those are not reused
+                    entry.pop('analysis', None)
+                    self.entries[entry['id']] = entry
+                    for band_key in self._band_keys(entry['fingerprint']):
+                        self.bands.setdefault(band_key, set()).add(entry['id'])
+        
+        except Exception as e:
+            logging.error(f"Error loading near-duplicate index: {e}")
+    
+    def maybe_save(self):
+        """Persist once enough changes piled up or the save interval passed"""
+        if self.changes >= self.save_every or (self.changes and time.time() - self.last_saved >= self.save_interval):
+            self.save()
+    
+    def save(self):
+        """Persist fingerprints (atomic replace) if anything changed"""
+        if not self.enabled or not self.changes:
+            return
+        
+        try:
+            with self._lock:
+                stored = {
+                    'entries': [
+                        dict(entry, fingerprint=format(entry['fingerprint'], '016x'))
+                        for entry in self.entries.values()
+                    ]
+                }
+                self.changes = 0
+                self.last_saved = time.time()
+            
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(stored, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        
+        except Exception as e:
+            logging.error(f"Error saving near-duplicate index: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Get index statistics"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'fingerprints': len(self.entries),
+                'max_distance': self.max_distance,
+                'lookups': self.lookups,
+                'duplicates_found': self.duplicates_found,
+                'unsaved_changes': self.changes
+            }